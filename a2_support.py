@@ -1,35 +1,178 @@
+from typing import Container, Iterator
 import random
-random.seed(10012023)
+
+DEFAULT_SEED = 10012023
+random.seed(DEFAULT_SEED)
+
+_MASK64 = (1 << 64) - 1
 
 ENCOUNTER_WIN_MESSAGE = '\nYou have won the encounter!\n'
 GAME_WIN_MESSAGE = '\nYou have won the game!\n'
 GAME_LOSE_MESSAGE = '\nYou have lost the game!\n'
 CARD_FAILURE_MESSAGE = '\nCard application failed.\n'
+NEW_ENCOUNTER_MESSAGE = 'New encounter!\n'
 
-def display_encounter(encounter: 'Encounter') -> None:
-    """ Displays the current state of an encounter is a user friendly format.
+class GameRandom(random.Random):
+    """ A random number generator owned by one game or encounter, so that
+        games can run side by side without sharing the global random state.
+
+        A GameRandom seeded with DEFAULT_SEED produces exactly the same
+        sequence as the global random module does after import, so single
+        games replay the same as they always have.
+    """
+
+    def __init__(self, seed: int = DEFAULT_SEED) -> None:
+        """ Parameters:
+                seed (int): The seed of this stream.
+        """
+        self._seed = seed
+        super().__init__(seed)
+
+    def get_seed(self) -> int:
+        """ (int) Returns the seed this stream was created with. """
+        return self._seed
+
+    def fork(self, stream: int) -> 'GameRandom':
+        """ Returns an independent child stream. The child depends only on
+            this stream's seed and the stream number, not on how much of this
+            stream has been used, so any game in a batch can be reproduced
+            directly from the master seed.
+
+            Parameters:
+                stream (int): The number of the child stream.
+
+            Returns:
+                GameRandom: The child stream.
+        """
+        return GameRandom(_mix_seed(self._seed, stream))
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (self._seed,), self.getstate()
+
+def _mix_seed(seed: int, stream: int) -> int:
+    """ (int) Returns a well mixed 64-bit seed for the given child stream. """
+    value = (seed ^ (seed >> 64)) + (stream + 1) * 0x9E3779B97F4A7C15
+    value &= _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+def encounter_lines(encounter: 'Encounter') -> list[str]:
+    """ Returns the lines display_encounter prints for an encounter.
     
         Parameters:
             encounter (Encounter): The encounter to display.
     """
-    print('MONSTERS')
+    lines = ['MONSTERS']
     for monster in encounter.get_monsters():
-        border = len(str(monster)) * '-'
-        print(f'{border}\nMonster {monster.get_id()}\n{monster}\n{border}')
-    print('\n\n')
-    print('PLAYER')
+        text = str(monster)
+        border = len(text) * '-'
+        lines += (border, f'Monster {monster.get_id()}', text, border)
     player = encounter.get_player()
-    border = len(f'Hand: {str(player.get_hand())}') * '-'
-    print(
-        f'{border}\n{player.get_name()}\nHP: {player.get_hp()}/' + \
-        f'{player.get_max_hp()}\nEnergy: {player.get_energy()}\n' + \
-        f'Hand: {player.get_hand()}\nBlock: {player.get_block()} ' + \
-        f'Strength: {player.get_strength()} ' + \
-        f'Vulnerable: {player.get_vulnerable()} ' + \
-        f'Weak: {player.get_weak()}\n{border}'
-    )
-
-def read_game_file(filename: str) -> list[list[tuple[str, int]]]:
+    hand = f'Hand: {player.get_hand_text()}'
+    border = len(hand) * '-'
+    lines += ('', '', '', 'PLAYER', border, player.get_name(),
+              f'HP: {player.get_hp()}/{player.get_max_hp()}',
+              f'Energy: {player.get_energy()}', hand,
+              f'Block: {player.get_block()} '
+              f'Strength: {player.get_strength()} '
+              f'Vulnerable: {player.get_vulnerable()} '
+              f'Weak: {player.get_weak()}', border)
+    return lines
+
+def format_encounter(encounter: 'Encounter') -> str:
+    """ Returns the text display_encounter prints for an encounter, without
+        the final newline.
+    
+        Parameters:
+            encounter (Encounter): The encounter to format.
+    """
+    return '\n'.join(encounter_lines(encounter))
+
+def display_encounter(encounter: 'Encounter') -> None:
+    """ Displays the current state of an encounter is a user friendly format.
+    
+        Parameters:
+            encounter (Encounter): The encounter to display.
+    """
+    print(format_encounter(encounter))
+
+class GameFileError(ValueError):
+    """ Raised when a game file is malformed. The message names the file and
+        line so that generated campaign files can be fixed.
+    """
+
+    def __init__(self, filename: str, line_number: int, message: str) -> None:
+        """ Parameters:
+                filename (str): The name of the file being read.
+                line_number (int): The line the problem is on (from 1).
+                message (str): What is wrong with the line.
+        """
+        super().__init__(f'{filename}:{line_number}: {message}')
+        self.filename = filename
+        self.line_number = line_number
+
+def iter_game_file(
+    filename: str,
+    monster_types: Container[str] | None = None
+) -> Iterator[list[tuple[str, int]]]:
+    """ Reads a game file one line at a time and yields the monsters of each
+        encounter as soon as the encounter is complete, so that very large
+        campaign files never have to be held in memory.
+
+        Lines may have extra whitespace around and between their fields.
+
+        Parameters:
+            filename (str): The name of the file to read.
+            monster_types (Container[str] | None): The monster type names
+                                                   allowed, such as the
+                                                   MONSTER_TYPES registry
+                                                   (default: any name).
+
+        Yields:
+            list[tuple[str, int]]: The monsters of each encounter (in order),
+                                   each described as (monster_type, start_hp).
+
+        Raises:
+            GameFileError: If a monster line comes before any Encounter
+                           header, doesn't have exactly a name and an hp, or
+                           has an hp that isn't a positive integer, or
+                           names a monster type not in monster_types.
+    """
+    monsters = None
+    with open(filename, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            fields = line.split()
+            if not fields:
+                continue
+            if fields[0].startswith('Encounter'):
+                if monsters is not None:
+                    yield monsters
+                monsters = []
+                continue
+            if monsters is None:
+                raise GameFileError(filename, line_number,
+                                    'monster line before any Encounter header')
+            if len(fields) != 2:
+                raise GameFileError(filename, line_number,
+                                    f'expected "<monster> <hp>", got '
+                                    f'{line.strip()!r}')
+            monster_type, start_hp = fields
+            if monster_types is not None and monster_type not in monster_types:
+                raise GameFileError(filename, line_number,
+                                    f'unknown monster type {monster_type!r}')
+            if not start_hp.isdecimal() or int(start_hp) == 0:
+                raise GameFileError(filename, line_number,
+                                    f'hp must be a positive integer, got '
+                                    f'{start_hp!r}')
+            monsters.append((monster_type, int(start_hp)))
+    if monsters is not None:
+        yield monsters
+
+def read_game_file(
+    filename: str,
+    monster_types: Container[str] | None = None
+) -> list[list[tuple[str, int]]]:
     """ Reads a game file and returns a list of information about the monsters
         in each encounter. The elements of this list are lists of tuples, where
         each tuple describes one monster in that encounter (in the format
@@ -37,34 +180,36 @@ def read_game_file(filename: str) -> list[list[tuple[str, int]]]:
     
         Parameters:
             filename (str): The name of the file to read.
+            monster_types (Container[str] | None): The monster type names
+                                                   allowed (default: any).
         
         Returns:
             list[list[tuple[str, int]]]: A list of information about the
                                          monsters in each encounter (in order).
-    """
-    encounters = []
-    with open(filename, 'r') as file:
-        for line in file:
-            if line.startswith('Encounter'):
-                encounters.append([])
-            elif line.strip() != '':
-                monster_type, start_hp = line.strip().split(' ')
-                encounters[-1].append((monster_type, int(start_hp)))
 
-    return encounters
+        Raises:
+            GameFileError: If the file is malformed (see iter_game_file).
+    """
+    return list(iter_game_file(filename, monster_types))
 
-def select_cards(cards: list, amount: int) -> list['Card']:
+def select_cards(
+    cards: list,
+    amount: int,
+    rng: random.Random | None = None
+) -> list['Card']:
     """ Selects an amount of cards from the cards list, removes those cards from
         the original cards list, and returns the selected cards.
     
         Parameters:
             cards (list): The list of cards to select from.
             amount (int): The amount of cards to select.
+            rng (random.Random | None): The random generator to use (default:
+                                        the global random module).
         
         Returns:
             list[Card]: The selected cards.
     """
-    selected_indices = random.sample(range(len(cards)), k=amount)
+    selected_indices = (rng or random).sample(range(len(cards)), k=amount)
     selected_cards = [cards[i] for i in selected_indices]
     for i in sorted(selected_indices, reverse=True):
         cards.pop(i)
@@ -73,7 +218,8 @@ def select_cards(cards: list, amount: int) -> list['Card']:
 def draw_cards(
     deck: list['Card'],
     hand: list['Card'],
-    discarded: list['Card']
+    discarded: list['Card'],
+    rng: random.Random | None = None
 ) -> None:
     """ Handles drawing cards from the deck to the hand at the beginning of a
         turn.
@@ -83,6 +229,8 @@ def draw_cards(
             hand (list[Card]): The hand to draw into.
             discard (list[Card]): The discard pile used to replenish the deck if
                                   there aren't enough cards available.
+            rng (random.Random | None): The random generator to use (default:
+                                        the global random module).
     """
     hand.clear()
     if len(deck) < 5:
@@ -90,8 +238,11 @@ def draw_cards(
         deck.clear()
         deck.extend(discarded)
         discarded.clear()
-    hand.extend(select_cards(deck, 5 - len(hand)))
+    hand.extend(select_cards(deck, 5 - len(hand), rng))
 
-def random_louse_amount() -> int:
-    """ (int) Returns a random amount of damage for a louse to give. """
-    return random.randint(5, 7)
+def random_louse_amount(rng: random.Random | None = None, low: int = 5,
+                        high: int = 7) -> int:
+    """ (int) Returns a random amount of damage for a louse to give, from low
+        to high inclusive, using rng or the global random module.
+    """
+    return (rng or random).randint(low, high)
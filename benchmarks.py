@@ -0,0 +1,710 @@
+import argparse
+import copy
+import os
+import tempfile
+import time
+import tracemalloc
+
+from monte_carlo import *
+from simulate import *
+
+"""Throughput benchmarks for the game engine"""
+
+GAME_FILES = ["games/game1.txt", "games/game2.txt", "games/game3.txt"]
+
+
+def bench_headless(count: int = 2000) -> None:
+    """
+    Prints headless games per second for each player type and game file.
+
+    Parameters:
+        count = number of games to time for each combination.
+    """
+    for player_name, player_class in PLAYER_TYPES.items():
+        for game_file in GAME_FILES:
+            for policy in (GreedyPolicy(), RandomPolicy(0)):
+                rate = games_per_second(player_class, game_file, policy, count)
+                print(f"{player_name:9} {game_file:16} "
+                      f"{policy.__class__.__name__:13} {rate:10.0f} games/s")
+
+
+def bench_scaling(games: int = 2000) -> None:
+    """
+    Prints Monte Carlo games per second against the number of worker
+    processes, with the speedup over a single worker.
+
+    Parameters:
+        games = number of games to play per game file at each worker count.
+    """
+    rates = scaling_benchmark(IronClad, GAME_FILES, GreedyPolicy(), games)
+    for workers, rate in rates.items():
+        print(f"{workers:3} workers {rate:10.0f} games/s "
+              f"{rate / rates[1]:5.2f}x")
+
+
+def bench_vector(count: int = 10000) -> None:
+    """
+    Prints object engine against NumPy engine throughput on the same seeded
+    greedy games, and checks that their results agree.
+
+    Parameters:
+        count = number of concurrent games per combination.
+    """
+    from vector_engine import compare_engines
+    for player_name, player_class in PLAYER_TYPES.items():
+        for game_file in GAME_FILES:
+            mismatches, object_rate, vector_rate = compare_engines(
+                player_class, game_file, count)
+            print(f"{player_name:9} {game_file:16} "
+                  f"object {object_rate:8.0f} games/s  "
+                  f"vector {vector_rate:8.0f} games/s  "
+                  f"{vector_rate / object_rate:5.2f}x  "
+                  f"{mismatches} mismatches")
+
+
+def bench_play_card(sizes: tuple[int, ...] = (10, 100, 1000, 10000)) -> None:
+    """
+    Prints the cost of Player.play_card and Player.has_card against hand
+    size. Every third card is a zero-cost Neutralize, which is played until
+    none are left.
+
+    Parameters:
+        sizes = hand sizes to time.
+    """
+    for size in sizes:
+        player = Player(70, [])
+        player._set_hand([(NEUTRALIZE, STRIKE, DEFEND)[i % 3]
+                          for i in range(size)])
+        plays = player.count_card("Neutralize")
+        start = time.perf_counter()
+        for _ in range(plays):
+            player.has_card("Neutralize")
+            player.play_card("Neutralize")
+        elapsed = time.perf_counter() - start
+        print(f"hand {size:6}  {elapsed / plays * 1e6:8.3f} us per play")
+
+
+def write_swarm_file(path: str, monsters: int, hp: int = 3) -> None:
+    """
+    Writes a game file with a single encounter of the given number of Louse.
+
+    Parameters:
+        path = name of the file to write.
+        monsters = number of Louse in the encounter.
+        hp = starting hp of each Louse.
+    """
+    with open(path, 'w') as file:
+        file.write("Encounter 1\n")
+        file.write(f"Louse {hp}\n" * monsters)
+
+
+def bench_swarm(
+    sizes: tuple[int, ...] = (10, 100, 500, 2000, 100000)
+) -> None:
+    """
+    Prints the cost of building a swarm encounter from a generated game file
+    and of killing every monster in it, last monster first, with zero-cost
+    Neutralize cards.
+
+    Parameters:
+        sizes = numbers of Louse to time.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"swarm{size}.txt")
+            write_swarm_file(path, size)
+            monsters = read_game_file(path)[0]
+            player = Player(1000, [Neutralize() for _ in range(5)])
+            start = time.perf_counter()
+            encounter = Encounter(player, monsters)
+            built = time.perf_counter() - start
+            player._set_hand([NEUTRALIZE] * size)
+            ids = [monster.get_id() for monster in encounter.get_monsters()]
+            start = time.perf_counter()
+            for monster_id in reversed(ids):
+                encounter.player_apply_card("Neutralize", monster_id)
+            elapsed = time.perf_counter() - start
+            print(f"{size:5} Louse  build {built * 1e3:8.3f} ms  "
+                  f"{elapsed / size * 1e6:8.3f} us per kill")
+
+
+def bench_enemy_turn(
+    sizes: tuple[int, ...] = (3, 10, 50, 200),
+    turns: int = 200
+) -> None:
+    """
+    Prints the cost of one end-turn/enemy-turn cycle against the number of
+    monsters, cycling through Louse, Cultist and JawWorm, along with the
+    number of action() calls made per monster per turn.
+
+    Parameters:
+        sizes = numbers of monsters to time.
+        turns = number of turns to time for each size.
+    """
+    calls = [0]
+    def counted(kind: type[Monster]):
+        original = kind.action
+        def wrapper(self) -> dict[str, int]:
+            calls[0] += 1
+            return original(self)
+        return wrapper
+    kinds = (Louse, Cultist, JawWorm)
+    originals = {kind: kind.action for kind in kinds}
+    for size in sizes:
+        monsters = [(kinds[i % 3].__name__, 50) for i in range(size)]
+        player = Player(10 ** 9, [Defend() for _ in range(10)])
+        encounter = Encounter(player, monsters, GameRandom())
+        for kind in kinds:
+            kind.action = counted(kind)
+        calls[0] = 0
+        start = time.perf_counter()
+        try:
+            for _ in range(turns):
+                encounter.end_player_turn()
+                encounter.enemy_turn()
+        finally:
+            for kind, original in originals.items():
+                kind.action = original
+        elapsed = time.perf_counter() - start
+        print(f"{size:4} monsters  {elapsed / turns * 1e6:9.1f} us per turn  "
+              f"{calls[0] / (turns * size):4.1f} action() calls per monster")
+
+
+def bench_memory(count: int = 5000) -> None:
+    """
+    Prints the traced bytes held by each live encounter (including its
+    player, cards and monsters) for every encounter in games/game3.txt.
+
+    Parameters:
+        count = number of encounters kept alive at once.
+    """
+    for player_name, player_class in PLAYER_TYPES.items():
+        for index, monsters in enumerate(read_game_file(GAME_FILES[2])):
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            live = [Encounter(player_class(), monsters) for _ in range(count)]
+            after = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            print(f"{player_name:9} encounter {index + 1} "
+                  f"({len(monsters)} monsters)  "
+                  f"{(after - before) / len(live):8.0f} bytes per encounter")
+
+
+def bench_snapshot(count: int = 20000) -> None:
+    """
+    Prints the cost of Encounter.snapshot() and restore(), with and without
+    the random generator state, against copy.deepcopy, for each encounter
+    in games/game3.txt played by Silent.
+
+    Parameters:
+        count = number of snapshots and restores to time.
+    """
+    for index, monsters in enumerate(read_game_file(GAME_FILES[2])):
+        encounter = Encounter(Silent(), monsters, GameRandom())
+        timings = []
+        for include_rng in (True, False):
+            start = time.perf_counter()
+            for _ in range(count):
+                state = encounter.snapshot(include_rng)
+            middle = time.perf_counter()
+            for _ in range(count):
+                encounter.restore(state)
+            end = time.perf_counter()
+            timings.append(((middle - start) / count,
+                            (end - middle) / count))
+        copies = max(count // 20, 1)
+        start = time.perf_counter()
+        for _ in range(copies):
+            copy.deepcopy(encounter)
+        deep = (time.perf_counter() - start) / copies
+        (snap, restore), (snap_no_rng, restore_no_rng) = timings
+        print(f"encounter {index + 1}  snapshot {snap * 1e6:6.1f} us  "
+              f"restore {restore * 1e6:6.1f} us  "
+              f"(no rng {snap_no_rng * 1e6:5.1f} / "
+              f"{restore_no_rng * 1e6:5.1f} us)  "
+              f"deepcopy {deep * 1e6:7.1f} us")
+
+
+def bench_mcts(
+    games: int = 3,
+    time_limit: float = 0.1,
+    workers: tuple[int, ...] = (1, 4)
+) -> None:
+    """
+    Prints MCTS simulations per second, mean decision latency and results on
+    games/game2.txt for single-process and root-parallel search.
+
+    Parameters:
+        games = number of seeded games to play per worker count.
+        time_limit = search time per decision, in seconds.
+        workers = worker process counts to try.
+    """
+    from mcts import MCTSPolicy
+    for count in workers:
+        policy = MCTSPolicy(time_limit=time_limit, workers=count)
+        try:
+            results = run_games(IronClad, GAME_FILES[1], policy, games)
+        finally:
+            policy.close()
+        wins = sum(result.won for result in results)
+        hp = sum(result.hp for result in results) / games
+        print(f"{count:3} workers  {policy.simulations_per_second():8.0f} "
+              f"simulations/s  {policy.mean_latency() * 1e3:6.1f} ms "
+              f"per decision  {wins}/{games} won  {hp:5.1f} mean hp")
+
+
+def bench_transposition(
+    decisions: int = 20,
+    capacities: tuple[int, ...] = (1000, 100000)
+) -> None:
+    """
+    Prints the cost of hashing an encounter and the hit rate, evictions and
+    memory of a transposition table shared by MCTS over the first decisions
+    of games/game2.txt.
+
+    Parameters:
+        decisions = number of moves to search for each capacity.
+        capacities = table sizes to try.
+    """
+    from mcts import MCTSPolicy
+    from zobrist import TranspositionTable, ZobristHasher
+    encounter = Encounter(Silent(), read_game_file(GAME_FILES[1])[1],
+                          GameRandom())
+    count = 200
+    for label, fresh in (("cold", True), ("cached", False)):
+        hasher = ZobristHasher()
+        start = time.perf_counter()
+        for _ in range(count):
+            if fresh:
+                hasher = ZobristHasher()
+            hasher.hash_encounter(encounter)
+        elapsed = (time.perf_counter() - start) / count
+        print(f"hash ({label:6})  {elapsed * 1e6:8.1f} us")
+    for capacity in capacities:
+        table = TranspositionTable(capacity)
+        policy = MCTSPolicy(time_limit=None, iterations=2000, table=table,
+                            seed=0)
+        encounter = Encounter(Silent(), read_game_file(GAME_FILES[1])[1],
+                              GameRandom())
+        for _ in range(decisions):
+            if not encounter.is_active():
+                break
+            move = policy.choose_move(encounter)
+            if move is None or not encounter.player_apply_card(*move):
+                encounter.end_player_turn()
+                encounter.enemy_turn()
+        print(f"capacity {capacity:7}  {table}")
+
+
+def bench_solver(hp: int = 25, games: int = 5000) -> None:
+    """
+    Prints the exact optimal outcome of a single Louse encounter for each
+    player type, with the solver's state count, time and memo memory,
+    against Monte Carlo estimates for the greedy and random policies.
+
+    Parameters:
+        hp = starting hp of the Louse.
+        games = number of games to estimate each policy with.
+    """
+    from solver import ExactSolver
+    encounters = [[("Louse", hp)]]
+    for player_name, player_class in PLAYER_TYPES.items():
+        solver = ExactSolver(player_class, encounters)
+        outcome = solver.solve()
+        stats = solver.get_stats()
+        print(f"{player_name:9} optimal  win {outcome.win_probability:7.2%}  "
+              f"hp loss {outcome.expected_hp_loss:6.2f}  "
+              f"({stats.states} states in {stats.elapsed:.1f}s, "
+              f"{solver.get_table().memory_bytes() / 2 ** 20:.0f} MiB)")
+        start_hp = player_class().get_hp()
+        for policy in (GreedyPolicy(), RandomPolicy(0)):
+            results = [play_game(player_class, encounters, policy,
+                                 rng=GameRandom(DEFAULT_SEED).fork(index))
+                       for index in range(games)]
+            wins = sum(result.won for result in results) / games
+            loss = sum(start_hp - result.hp if result.won else start_hp
+                       for result in results) / games
+            print(f"{player_name:9} {policy.__class__.__name__:13} "
+                  f"win {wins:7.2%}  hp loss {loss:6.2f}")
+
+
+def write_campaign_file(path: str, encounters: int, seed: int = 0) -> None:
+    """
+    Writes a game file of random encounters of one to three monsters.
+
+    Parameters:
+        path = name of the file to write.
+        encounters = number of encounters to write.
+        seed = seed for the monster types and hp.
+    """
+    rng = GameRandom(seed)
+    kinds = ("Louse", "Cultist", "JawWorm")
+    with open(path, 'w') as file:
+        for index in range(encounters):
+            file.write(f"Encounter {index + 1}\n")
+            for _ in range(rng.randint(1, 3)):
+                file.write(f"{rng.choice(kinds)} {rng.randint(10, 60)}\n")
+            file.write("\n")
+
+
+def bench_parse(encounters: int = 100000) -> None:
+    """
+    Prints the throughput of reading a generated campaign file as text
+    (all at once and streamed) and in the compiled format (opening only,
+    and opening and decoding every encounter).
+
+    Parameters:
+        encounters = number of encounters in the generated campaign.
+    """
+    from compiled_game import CompiledGame, compile_game_file
+    with tempfile.TemporaryDirectory() as directory:
+        text = os.path.join(directory, "campaign.txt")
+        compiled = os.path.join(directory, "campaign.cgame")
+        write_campaign_file(text, encounters)
+        start = time.perf_counter()
+        compile_game_file(text, compiled)
+        compile_time = time.perf_counter() - start
+        sizes = {text: os.path.getsize(text),
+                 compiled: os.path.getsize(compiled)}
+
+        def read_text() -> None:
+            read_game_file(text)
+
+        def stream_text() -> None:
+            for _ in iter_game_file(text):
+                pass
+
+        def open_compiled() -> None:
+            CompiledGame(compiled).close()
+
+        def iterate_compiled() -> None:
+            with CompiledGame(compiled) as game:
+                for _ in game:
+                    pass
+
+        for label, path, read in (("text read", text, read_text),
+                                  ("text stream", text, stream_text),
+                                  ("compiled open", compiled, open_compiled),
+                                  ("compiled iterate", compiled,
+                                   iterate_compiled)):
+            start = time.perf_counter()
+            read()
+            elapsed = time.perf_counter() - start
+            print(f"{label:16} {elapsed * 1e3:9.2f} ms  "
+                  f"{encounters / elapsed:12.0f} encounters/s  "
+                  f"{sizes[path] / elapsed / 2 ** 20:9.1f} MiB/s")
+        print(f"compile {compile_time * 1e3:.0f} ms, "
+              f"{sizes[text] / 2 ** 20:.1f} MiB text -> "
+              f"{sizes[compiled] / 2 ** 20:.1f} MiB compiled")
+
+
+def bench_campaign(encounters: int = 100000) -> None:
+    """
+    Prints the time to the first encounter and the peak traced memory of
+    starting every encounter of a generated campaign, with the encounters
+    read up front against streamed through a Campaign.
+
+    Parameters:
+        encounters = number of encounters in the generated campaign.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "campaign.txt")
+        write_campaign_file(path, encounters)
+        for label, source in (("eager list", read_game_file),
+                              ("streamed", iter_game)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            campaign = Campaign(Silent(), source(path), GameRandom())
+            encounter = campaign.next_encounter()
+            first = time.perf_counter() - start
+            while encounter is not None:
+                encounter.end_player_turn()
+                encounter = campaign.next_encounter()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{label:10}  first encounter {first * 1e3:9.2f} ms  "
+                  f"all {campaign.get_index()} in {elapsed:6.2f}s  "
+                  f"peak {peak / 2 ** 10:9.0f} KiB")
+
+
+def bench_event_log(games: int = 500, repeats: int = 7) -> None:
+    """
+    Prints the overhead of recording games in an event log, the size of the
+    log, and how fast the log replays and seeks.
+
+    Parameters:
+        games = number of games to play for each measurement.
+        repeats = number of timings to take the best of.
+    """
+    from replay import Replay
+    policy = GreedyPolicy()
+    game_file = GAME_FILES[1]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.log")
+        plain = logged = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run_games(Silent, game_file, policy, games)
+            plain = min(plain, time.perf_counter() - start)
+            with open(path, "w") as file:
+                start = time.perf_counter()
+                with EventLog(file) as log:
+                    run_games(Silent, game_file, policy, games, log=log)
+                logged = min(logged, time.perf_counter() - start)
+        print(f"plain   {games / plain:10.0f} games/s")
+        print(f"logged  {games / logged:10.0f} games/s  "
+              f"overhead {logged / plain - 1:6.1%}  "
+              f"{os.path.getsize(path) / games:6.0f} bytes/game")
+        with Replay(path, games - 1) as replay:
+            start = time.perf_counter()
+            events = replay.run()
+            elapsed = time.perf_counter() - start
+            print(f"replay  {events / elapsed:10.0f} events/s (verified)")
+            start = time.perf_counter()
+            for index in range(0, len(replay) + 1):
+                replay.seek(len(replay) - index)
+            elapsed = (time.perf_counter() - start) / (len(replay) + 1)
+            print(f"seek    {elapsed * 1e6:10.1f} us backwards, "
+                  f"{replay.get_keyframe_count()} keyframes")
+
+
+def bench_server(
+    sessions: int = 1000,
+    concurrencies: tuple[int, ...] = (10, 100, 1000)
+) -> None:
+    """
+    Prints the round-trip command latency and sessions per second of the
+    game server, with the load generator in the same process and event
+    loop, against the number of sessions connected at once.
+
+    Parameters:
+        sessions = number of sessions to play at each concurrency.
+        concurrencies = numbers of concurrent sessions to try.
+    """
+    import asyncio
+    from loadgen import connector, run_load
+    from server import GameServer
+
+    async def measure(path: str, concurrency: int) -> None:
+        server = GameServer(GAME_FILES)
+        async with await server.start(path=path):
+            result = await run_load(connector(path=path), "ironclad",
+                                    GAME_FILES[0], GreedyPolicy, sessions,
+                                    concurrency)
+        print(f"{concurrency:5} concurrent  {result}")
+        print(f"{'':17} server: {server.get_stats()}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for concurrency in concurrencies:
+            path = os.path.join(directory, f"server{concurrency}.sock")
+            asyncio.run(measure(path, concurrency))
+
+
+def bench_renderers(games: int = 500) -> None:
+    """
+    Prints games per second of greedy games driven through protocol.Game
+    with each renderer, against play_game, which drives Encounter directly.
+
+    Parameters:
+        games = number of games to play with each renderer.
+    """
+    import io
+    from protocol import EndTurnCommand, Game, PlayCommand, RENDERERS
+    encounters = read_game_file(GAME_FILES[1], MONSTER_TYPES)
+    policy = GreedyPolicy()
+    start = time.perf_counter()
+    for index in range(games):
+        play_game(Silent, encounters, policy, rng=GameRandom(index))
+    direct = games / (time.perf_counter() - start)
+    print(f"{'play_game':10} {direct:8.0f} games/s")
+    for name, renderer_class in RENDERERS.items():
+        buffer = io.StringIO()
+        renderer = renderer_class() if name == "none" else renderer_class(
+            buffer)
+        start = time.perf_counter()
+        for index in range(games):
+            game = Game(Silent(), encounters, GameRandom(index), renderer)
+            game.start()
+            failed = False
+            turns = 0
+            while not game.is_over() and turns < DEFAULT_MAX_TURNS:
+                move = None if failed else policy.choose_move(
+                    game.get_encounter())
+                if move is None:
+                    turns += 1
+                    failed = not game.dispatch(EndTurnCommand())
+                else:
+                    failed = not game.dispatch(PlayCommand(*move))
+            buffer.seek(0)
+            buffer.truncate()
+        rate = games / (time.perf_counter() - start)
+        print(f"{name:10} {rate:8.0f} games/s  {rate / direct:5.2f}x")
+
+
+def record_boards(games: int) -> list[tuple[Encounter, tuple]]:
+    """
+    Returns the board after every move of greedy games of games/game3.txt
+    played by Silent, as (encounter, snapshot) pairs. Restore the snapshot
+    before showing the encounter.
+
+    Parameters:
+        games = number of games to play.
+    """
+    from protocol import EndTurnCommand, Game, PlayCommand, Renderer
+
+    class Recorder(Renderer):
+        def __init__(self) -> None:
+            self.frames = []
+
+        def turn_ended(self, encounter: Encounter) -> None:
+            self.frames.append((encounter, encounter.snapshot()))
+
+        def encounter_started(self, encounter: Encounter) -> None:
+            self.turn_ended(encounter)
+
+        def card_played(self, encounter: Encounter,
+                        command: PlayCommand) -> None:
+            self.turn_ended(encounter)
+
+    recorder = Recorder()
+    policy = GreedyPolicy()
+    encounters = read_game_file(GAME_FILES[2], MONSTER_TYPES)
+    for index in range(games):
+        game = Game(Silent(), encounters, GameRandom(index), recorder)
+        game.start()
+        failed = False
+        while not game.is_over():
+            move = None if failed else policy.choose_move(
+                game.get_encounter())
+            failed = not game.dispatch(EndTurnCommand() if move is None
+                                       else PlayCommand(*move))
+    return recorder.frames
+
+
+def bench_frames(games: int = 20) -> None:
+    """
+    Prints frames per second and bytes per frame of display_encounter
+    against FrameRenderer's patch stream and ANSI modes, rendering the
+    board after every move of greedy games of games/game3.txt played by
+    Silent to a line-buffered stream, as a terminal is, and checks the
+    patch stream decodes to the same boards.
+
+    Parameters:
+        games = number of games whose boards are rendered.
+    """
+    import contextlib
+    import io
+    from protocol import FrameRenderer, read_frames
+
+    frames = record_boards(games)
+
+    def measure(render: Callable[[Encounter], None]) -> float:
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            for encounter, state in frames:
+                encounter.restore(state)
+                render(encounter)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    restore = measure(lambda encounter: None)
+    with open(os.devnull, "w", buffering=1) as devnull:
+        with contextlib.redirect_stdout(devnull):
+            baseline = measure(display_encounter)
+        results = [("display_encounter", baseline)]
+        for label, ansi in (("patch stream", False), ("ansi", True)):
+            renderer = FrameRenderer(devnull, ansi)
+            results.append((label, measure(renderer.turn_ended)))
+    sizes = {}
+    for label, ansi in (("patch stream", False), ("ansi", True)):
+        buffer = io.StringIO()
+        renderer = FrameRenderer(buffer, ansi)
+        for encounter, state in frames:
+            encounter.restore(state)
+            renderer.turn_ended(encounter)
+        sizes[label] = len(buffer.getvalue())
+        if not ansi:
+            decoded = list(read_frames(io.StringIO(buffer.getvalue())))
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        for encounter, state in frames:
+            encounter.restore(state)
+            display_encounter(encounter)
+    sizes["display_encounter"] = len(buffer.getvalue())
+    mismatches = 0
+    for (encounter, state), lines in zip(frames, decoded):
+        encounter.restore(state)
+        mismatches += encounter_lines(encounter) != lines
+    for label, elapsed in results:
+        fps = len(frames) / max(elapsed - restore, 1e-9)
+        print(f"{label:18} {fps:9.0f} frames/s  "
+              f"{fps * (baseline - restore) / len(frames):5.2f}x  "
+              f"{sizes[label] / len(frames):6.0f} bytes/frame")
+    print(f"{len(frames)} frames, {mismatches} decoded frames differ")
+
+
+def bench_strings(games: int = 20, repeats: int = 5) -> None:
+    """
+    Prints boards per second of format_encounter when every string has to
+    be built, straight after restoring the board, against showing the same
+    board again, when the entity, hand and card strings are all cached.
+    The boards are those after every move of greedy games of
+    games/game3.txt played by Silent.
+
+    Parameters:
+        games = number of games whose boards are formatted.
+        repeats = number of times the unchanged board is formatted again.
+    """
+    frames = record_boards(games)
+    cold = warm = float("inf")
+    for _ in range(5):
+        cold_time = warm_time = 0.0
+        for encounter, state in frames:
+            encounter.restore(state)
+            start = time.perf_counter()
+            format_encounter(encounter)
+            middle = time.perf_counter()
+            for _ in range(repeats):
+                format_encounter(encounter)
+            warm_time += time.perf_counter() - middle
+            cold_time += middle - start
+        cold = min(cold, cold_time)
+        warm = min(warm, warm_time / repeats)
+    for label, elapsed in (("changed", cold), ("unchanged", warm)):
+        print(f"{label:10} {len(frames) / elapsed:9.0f} boards/s  "
+              f"{cold / elapsed:5.2f}x")
+    print(f"{len(frames)} boards")
+
+
+BENCHMARKS = {"headless": bench_headless, "scaling": bench_scaling,
+              "vector": bench_vector, "play_card": bench_play_card,
+              "swarm": bench_swarm, "enemy_turn": bench_enemy_turn,
+              "memory": bench_memory, "snapshot": bench_snapshot,
+              "mcts": bench_mcts, "transposition": bench_transposition,
+              "solver": bench_solver, "parse": bench_parse,
+              "campaign": bench_campaign, "event_log": bench_event_log,
+              "server": bench_server, "renderers": bench_renderers,
+              "frames": bench_frames, "strings": bench_strings}
+
+
+def main() -> None:
+    """
+    Runs the benchmarks named on the command line, or all of them.
+    """
+    parser = argparse.ArgumentParser(description="Game engine benchmarks")
+    parser.add_argument("names", nargs="*",
+                        help=f"benchmarks to run from {list(BENCHMARKS)} "
+                             "(default: all)")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+    for name in args.names or BENCHMARKS:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
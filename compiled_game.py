@@ -0,0 +1,247 @@
+from array import array
+from typing import Container, Iterator
+import mmap
+import struct
+import sys
+
+from a2_support import *
+
+"""Compact binary "compiled game" files that load without parsing"""
+
+MAGIC = b'CGAM'
+VERSION = 1
+
+# magic, version, number of monster names, encounters, monsters
+_HEADER = struct.Struct('<4sHHII')
+
+
+class CompiledGame(object):
+    """
+    A read-only, memory-mapped compiled game file. Opening one only reads
+    the header and the monster names; encounters are decoded when they are
+    indexed or iterated, so it behaves like the list read_game_file returns
+    without parsing anything up front.
+
+    Layout (little-endian): header, then each monster name as a length byte
+    and UTF-8 bytes, padded to 4 bytes, then three uint32 arrays: the first
+    monster of each encounter (encounters + 1 entries), each monster's name
+    index and each monster's hp.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        monster_types: Container[str] | None = None
+    ) -> None:
+        """
+        Parameters:
+            filename = the compiled file to open.
+            monster_types = monster type names allowed (default: any); the
+            name table is checked on open, so unknown types fail at once.
+            names = monster type name for each name index.
+            starts, kinds, hps = views of the three arrays.
+        """
+        with open(filename, 'rb') as file:
+            try:
+                self._map = mmap.mmap(file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            except ValueError:
+                raise GameFileError(filename, 1, 'empty compiled game file'
+                                    ) from None
+        try:
+            self._read_layout(filename, monster_types)
+        except GameFileError:
+            self._map.close()
+            raise
+
+    def _read_layout(
+        self,
+        filename: str,
+        monster_types: Container[str] | None
+    ) -> None:
+        """
+        Reads the header and name table and maps the three arrays, checking
+        that every section fits in the file.
+        """
+        size = len(self._map)
+        if size < _HEADER.size:
+            raise GameFileError(filename, 1, 'truncated compiled game header')
+        magic, version, names, encounters, monsters = _HEADER.unpack_from(
+            self._map)
+        if magic != MAGIC or version != VERSION:
+            raise GameFileError(filename, 1, 'not a compiled game file '
+                                f'(version {VERSION})')
+        offset = _HEADER.size
+        self._names = []
+        for _ in range(names):
+            if offset >= size or offset + 1 + self._map[offset] > size:
+                raise GameFileError(filename, 1,
+                                    'truncated monster name table')
+            length = self._map[offset]
+            try:
+                self._names.append(
+                    self._map[offset + 1:offset + 1 + length].decode())
+            except UnicodeDecodeError:
+                raise GameFileError(filename, 1, 'monster name is not UTF-8'
+                                    ) from None
+            offset += 1 + length
+        if monster_types is not None:
+            for name in self._names:
+                if name not in monster_types:
+                    raise GameFileError(filename, 1,
+                                        f'unknown monster type {name!r}')
+        offset += -offset % 4
+        expected = offset + 4 * (encounters + 1) + 8 * monsters
+        if size < expected:
+            raise GameFileError(filename, 1, f'truncated compiled game: '
+                                f'{size} bytes, expected {expected}')
+        self._starts = self._view(offset, encounters + 1)
+        offset += 4 * (encounters + 1)
+        self._kinds = self._view(offset, monsters)
+        offset += 4 * monsters
+        self._hps = self._view(offset, monsters)
+        if self._starts[0] != 0 or self._starts[encounters] != monsters:
+            self._starts = self._kinds = self._hps = None
+            raise GameFileError(filename, 1, 'encounter table does not match '
+                                'the monster count')
+        self._length = encounters
+
+    def _view(self, offset: int, count: int):
+        """
+        Returns a uint32 view of count entries at offset, without copying
+        on little-endian machines.
+        """
+        view = memoryview(self._map)[offset:offset + 4 * count]
+        if sys.byteorder == 'little':
+            return view.cast('I')
+        values = array('I', view)
+        values.byteswap()
+        return values
+
+    def get_names(self) -> list[str]:
+        """
+        Returns the monster type names used in the file.
+        """
+        return list(self._names)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> list[tuple[str, int]]:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('encounter index out of range')
+        names, kinds, hps = self._names, self._kinds, self._hps
+        return [(names[kinds[monster]], hps[monster])
+                for monster in range(self._starts[index],
+                                     self._starts[index + 1])]
+
+    def __iter__(self) -> Iterator[list[tuple[str, int]]]:
+        for index in range(self._length):
+            yield self[index]
+
+    def close(self) -> None:
+        """
+        Releases the memory map.
+        """
+        self._starts = self._kinds = self._hps = None
+        self._map.close()
+
+    def __enter__(self) -> 'CompiledGame':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def compile_game_file(
+    source: str,
+    target: str,
+    monster_types: Container[str] | None = None
+) -> int:
+    """
+    Streams a text game file into the compiled format.
+
+    Parameters:
+        source = the text game file to read.
+        target = the compiled file to write.
+        monster_types = monster type names allowed (default: any).
+
+    Return: The number of encounters written.
+    """
+    names = {}
+    starts = array('I', [0])
+    kinds = array('I')
+    hps = array('I')
+    for monsters in iter_game_file(source, monster_types):
+        for name, hp in monsters:
+            kinds.append(names.setdefault(name, len(names)))
+            hps.append(hp)
+        starts.append(len(kinds))
+    # Validated before the target is opened, so a rejected game leaves no
+    # partly written file behind.
+    table = b''
+    for name in names:
+        encoded = name.encode()
+        if len(encoded) > 255:
+            raise ValueError(f'monster name too long to compile: {name!r}')
+        table += bytes([len(encoded)]) + encoded
+    if sys.byteorder != 'little':
+        for values in (starts, kinds, hps):
+            values.byteswap()
+    with open(target, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, len(names), len(starts) - 1,
+                                len(kinds)))
+        file.write(table)
+        written = _HEADER.size + len(table)
+        file.write(b'\0' * (-written % 4))
+        for values in (starts, kinds, hps):
+            values.tofile(file)
+    return len(starts) - 1
+
+
+def is_compiled_game(filename: str) -> bool:
+    """
+    Returns True if filename starts with the compiled game magic bytes.
+    """
+    with open(filename, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def open_game(
+    filename: str,
+    monster_types: Container[str] | None = None
+) -> 'CompiledGame | list[list[tuple[str, int]]]':
+    """
+    Opens a game file in either format: compiled files are memory-mapped,
+    text files are parsed with read_game_file.
+
+    Parameters:
+        filename = the game file to open.
+        monster_types = monster type names allowed (default: any).
+
+    Return: A sequence of encounters, each a list of (monster_type, start_hp).
+    """
+    if is_compiled_game(filename):
+        return CompiledGame(filename, monster_types)
+    return read_game_file(filename, monster_types)
+
+
+def iter_game(
+    filename: str,
+    monster_types: Container[str] | None = None
+) -> Iterator[list[tuple[str, int]]]:
+    """
+    Yields the encounters of a game file in either format one at a time,
+    so only the encounter being played is ever held in memory.
+
+    Parameters:
+        filename = the game file to read.
+        monster_types = monster type names allowed (default: any).
+    """
+    if is_compiled_game(filename):
+        with CompiledGame(filename, monster_types) as game:
+            yield from game
+    else:
+        yield from iter_game_file(filename, monster_types)
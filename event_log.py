@@ -0,0 +1,294 @@
+from typing import TextIO
+import hashlib
+import json
+
+from a2_support import *
+
+"""Compact append-only event logs of played games"""
+
+LOG_VERSION = 1
+DEFAULT_KEYFRAME_INTERVAL = 1024
+DEFAULT_BUFFER_SIZE = 1 << 16
+NO_VALUE = '-'
+
+# Status name -> letter used in the changes field.
+STATUS_LETTERS = {'weak': 'w', 'vulnerable': 'v', 'strength': 's'}
+
+
+def file_digest(filename: str) -> str:
+    """
+    Returns the SHA-1 hex digest of a file's contents, so a log can check it
+    is replayed against the same game file.
+
+    Parameters:
+        filename = the file to hash.
+    """
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_state(state: tuple) -> str:
+    """
+    Returns Encounter.snapshot() as one line of JSON, with monster types
+    stored by class name.
+    """
+    player_state, monster_states, intents, rng_state = state
+    return json.dumps(
+        [player_state,
+         [(monster_type.__name__, monster_state)
+          for monster_type, monster_state in monster_states],
+         intents, rng_state],
+        separators=(',', ':'))
+
+
+def _changes(parts: list[str]) -> str:
+    """
+    Joins status changes into a changes field.
+    """
+    return ",".join(parts) or NO_VALUE
+
+
+def _turn_line(damage: int, hp: int, intents: dict) -> str:
+    """
+    Returns the T line of an enemy turn.
+    """
+    parts = []
+    for monster_id, intent in intents.items():
+        for status, amount in intent.items():
+            letter = STATUS_LETTERS.get(status)
+            if letter is not None:
+                who = monster_id if letter == 's' else 'p'
+                parts.append(f"{who}{letter}+{amount}")
+    return f"T\t{damage}\t{hp}\t{_changes(parts)}\n"
+
+
+def _play_template(card: 'Card', targeted: bool) -> str:
+    """
+    Returns a template of the P line of playing a card, with the target and
+    the damage as format fields 0 and 1.
+    """
+    parts = [f"p{STATUS_LETTERS[status]}+{amount}"
+             for status, amount in card.get_self_modifiers().items()]
+    if targeted and card.requires_target():
+        parts.extend(f"{{0}}{STATUS_LETTERS[status]}+{amount}"
+                     for status, amount in card.get_status_modifiers().items())
+    name = card.get_name().replace("{", "{{").replace("}", "}}")
+    return f"P\t{name}\t{{0}}\t{{1}}\t{_changes(parts)}\n"
+
+
+def format_records(
+    records: list,
+    templates: tuple[dict, dict] | None = None
+) -> str:
+    """
+    Returns the log lines of records queued by an EventLog: event tuples
+    appended by an encounter (see Encounter.set_log) and finished lines.
+
+    Parameters:
+        records = the records to format.
+        templates = P line templates of cards played with and without a
+        target, reused between calls.
+    """
+    targeted, untargeted = templates if templates is not None else ({}, {})
+    lines = []
+    append = lines.append
+    for record in records:
+        if type(record) is str:
+            append(record)
+            continue
+        card = record[0]
+        if card is None:
+            append(_turn_line(*record[1:]))
+            continue
+        _, target_id, damage = record
+        if target_id is None:
+            template = untargeted.get(card)
+            if template is None:
+                template = untargeted[card] = _play_template(card, False)
+            append(template.format(NO_VALUE, damage))
+        else:
+            template = targeted.get(card)
+            if template is None:
+                template = targeted[card] = _play_template(card, True)
+            append(template.format(target_id, damage))
+    return "".join(lines)
+
+
+class EventLog(object):
+    """
+    Writes an append-only, line-delimited log of games. Each line is one
+    record of tab-separated fields, tagged by its first field:
+
+        G version seed player game_file_sha1 game_file   a game starts
+        E encounter first_monster_id                    an encounter starts
+        P card target damage changes                    a card was played
+        T damage hp changes                             the turn was ended
+        K state_json                                    keyframe
+        R won turns hp                                  the game ended
+
+    P and T lines are the game's events; a P line's target is NO_VALUE for
+    cards played without one. damage is the damage a card dealt, or the
+    total damage the enemy turn dealt to the player, and hp is the player's
+    hp after it. changes lists the statuses applied as <who><w|v|s>+<amount>,
+    where who is p for the player or a monster id. A keyframe holds the full
+    encounter snapshot, including the random generator, at the end of a
+    turn; its event number and encounter follow from the lines before it.
+
+    The encounter itself appends a small tuple for each event (see
+    Encounter.set_log) and the other records are queued as finished lines.
+    Nothing is formatted until a keyframe is due, at the end of the first
+    turn with keyframe_interval records pending, or on flush(). Even so,
+    logging a fast headless game costs about 10-25% of its time (see the
+    event_log benchmark): around 10 us per game of header, encounter and
+    result records and formatting, against 200-300 us for the game itself.
+    Logs stay text, so they can be read and diffed, rather than squeezed
+    into a binary format to reach a smaller overhead.
+
+    A line records the results of its event, not a hash of the whole state:
+    hashing every state would cost more than the step it checks. The full
+    state is recorded only in keyframes.
+    """
+
+    def __init__(
+        self,
+        file: str | TextIO,
+        keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+        buffer_size: int = DEFAULT_BUFFER_SIZE
+    ) -> None:
+        """
+        Parameters:
+            file = name of the log file to append to, or an open text file.
+            keyframe_interval = number of pending records after which the
+            next turn boundary gets a keyframe.
+            buffer_size = bytes buffered before writing to the file.
+            digests = game file digests already computed, by file name.
+            records = event tuples and finished lines not yet written.
+            templates = P line templates for format_records.
+            turns = number of turns ended in the current game.
+            encounter = the encounter being recorded.
+            seeded = True if the current game's seed was recorded.
+        """
+        if isinstance(file, str):
+            self._file = open(file, 'a', buffering=buffer_size)
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        self._keyframe_interval = keyframe_interval
+        self._digests = {}
+        self._records = []
+        self._templates = ({}, {})
+        self._turns = 0
+        self._encounter = None
+        self._seeded = False
+
+    def start_game(
+        self,
+        player_class: type,
+        game_file: str,
+        seed: int | None = None
+    ) -> None:
+        """
+        Records the start of a game.
+
+        Parameters:
+            player_class = the player type being played.
+            game_file = the name of the game file being played.
+            seed = seed of the GameRandom the game is played with. Without
+            one, the first encounter is followed by a keyframe instead.
+        """
+        digest = self._digests.get(game_file)
+        if digest is None:
+            digest = self._digests[game_file] = file_digest(game_file)
+        self._turns = 0
+        self._encounter = None
+        self._seeded = seed is not None
+        self._records.append(f"G\t{LOG_VERSION}\t"
+                             f"{NO_VALUE if seed is None else seed}\t"
+                             f"{player_class.__name__}\t{digest}\t"
+                             f"{game_file}\n")
+
+    def start_encounter(self, encounter: 'Encounter', index: int) -> None:
+        """
+        Records the start of an encounter, right after it is built, and
+        starts recording its events.
+
+        Parameters:
+            encounter = the new encounter.
+            index = index of the encounter in the game file, from 0.
+        """
+        previous = self._encounter
+        if previous is not None:
+            previous.set_log(None)
+        monsters = encounter.get_monsters()
+        first_id = monsters[0].get_id() if monsters else 0
+        self._encounter = encounter
+        self._records.append(f"E\t{index}\t{first_id}\n")
+        encounter.set_log(self._records)
+        if previous is None and not self._seeded:
+            self.keyframe()
+
+    def end_turn(self) -> None:
+        """
+        Called after each enemy turn: writes a keyframe once
+        keyframe_interval records are pending.
+        """
+        self._turns += 1
+        if len(self._records) >= self._keyframe_interval:
+            self.keyframe()
+
+    def end_game(self, won: bool) -> None:
+        """
+        Records the end of a game.
+
+        Parameter:
+            won = True if the player won.
+        """
+        hp = NO_VALUE
+        if self._encounter is not None:
+            hp = self._encounter.get_player().get_hp()
+            self._encounter.set_log(None)
+            self._encounter = None
+        self._records.append(f"R\t{int(won)}\t{self._turns}\t{hp}\n")
+
+    def keyframe(self) -> None:
+        """
+        Records the full state of the current encounter.
+        """
+        self._records.append(
+            f"K\t{encode_state(self._encounter.snapshot())}\n")
+        self._drain()
+
+    def _drain(self) -> None:
+        """
+        Formats the pending records and writes them to the file buffer.
+        """
+        if self._records:
+            self._file.write(format_records(self._records, self._templates))
+            self._records.clear()
+
+    def flush(self) -> None:
+        """
+        Writes pending records and buffered lines to the file.
+        """
+        self._drain()
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Flushes the log, closing the file if the log opened it.
+        """
+        self._drain()
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self) -> 'EventLog':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,223 @@
+from typing import Awaitable, Callable, NamedTuple
+import argparse
+import asyncio
+import time
+
+from server import *
+
+"""Load generator for the game server"""
+
+DEFAULT_SESSIONS = 1000
+DEFAULT_CONCURRENCY = 200
+
+Connect = Callable[[], Awaitable[tuple[asyncio.StreamReader,
+                                       asyncio.StreamWriter]]]
+
+
+class LoadResult(NamedTuple):
+    """
+    Outcome of a load run. Latencies are round trips, in seconds.
+
+    sessions = number of sessions played to the end.
+    abandoned = number of sessions stopped at the turn limit.
+    commands = number of commands sent.
+    mismatches = number of responses that differed from the local replica.
+    elapsed = seconds the run took.
+    p50, p99 = latency of one command.
+    sessions_per_second = sessions played to the end per second.
+    """
+    sessions: int
+    abandoned: int
+    commands: int
+    mismatches: int
+    elapsed: float
+    p50: float
+    p99: float
+    sessions_per_second: float
+
+    def __str__(self) -> str:
+        return (f"{self.sessions} sessions ({self.abandoned} abandoned)  "
+                f"{self.commands} commands in {self.elapsed:.2f}s  "
+                f"p50 {self.p50 * 1e6:.0f} us  p99 {self.p99 * 1e6:.0f} us  "
+                f"{self.sessions_per_second:.1f} sessions/s  "
+                f"{self.mismatches} mismatches")
+
+
+async def read_frame(reader: asyncio.StreamReader) -> str:
+    """
+    Returns the next response framed by server.frame().
+    """
+    header = await reader.readline()
+    if not header:
+        raise ConnectionError("the server closed the connection")
+    return (await reader.readexactly(int(header))).decode()
+
+
+async def play_session(
+    connect: Connect,
+    player_name: str,
+    game_file: str,
+    encounters: list[list[tuple[str, int]]],
+    seed: int,
+    policy: Policy,
+    latencies: list[float],
+    max_turns: int = DEFAULT_MAX_TURNS,
+    renderer_class: type[Renderer] = TextRenderer
+) -> tuple[bool, int, int]:
+    """
+    Plays one seeded session against the server. A local GameSession with
+    the same seed is played alongside, to choose each move with the policy
+    and to check every response.
+
+    Parameters:
+        connect = opens a connection to the server.
+        player_name = the player type to play as, as the server names it.
+        game_file = the game file to play, as the server names it.
+        encounters = the game file's encounters, for the local replica.
+        seed = seed of the session.
+        policy = chooses each move.
+        latencies = list the round trip of each command is appended to.
+        max_turns = number of turns after which the session is abandoned.
+        renderer_class = renders the responses the same way as the server.
+
+    Return: Whether the game finished, the number of commands sent and the
+    number of responses that differed from the replica.
+    """
+    replica = GameSession(PLAYER_TYPES[player_name], encounters,
+                          GameRandom(seed), renderer_class)
+    policy.reset(GameRandom(seed).fork(POLICY_STREAM).get_seed())
+    reader, writer = await connect()
+    commands = mismatches = turns = 0
+    try:
+        writer.write(f"start {player_name} {game_file} {seed}\n".encode())
+        mismatches += await read_frame(reader) != replica.start()
+        failed = False
+        while not replica.is_over() and turns < max_turns:
+            move = None if failed else policy.choose_move(
+                replica.get_encounter())
+            if move is None:
+                command = "end turn"
+                turns += 1
+            else:
+                card_name, target_id = move
+                command = (f"play {card_name}" if target_id is None
+                           else f"play {card_name} {target_id}")
+            expected = replica.handle(command)
+            failed = replica.failed()
+            start = time.perf_counter()
+            writer.write(command.encode() + b"\n")
+            response = await read_frame(reader)
+            latencies.append(time.perf_counter() - start)
+            commands += 1
+            mismatches += response != expected
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+    return replica.is_over(), commands, mismatches
+
+
+async def run_load(
+    connect: Connect,
+    player_name: str,
+    game_file: str,
+    policy_class: type[Policy],
+    sessions: int = DEFAULT_SESSIONS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    seed: int = DEFAULT_SEED,
+    max_turns: int = DEFAULT_MAX_TURNS,
+    renderer_class: type[Renderer] = TextRenderer
+) -> LoadResult:
+    """
+    Plays sessions against the server, at most concurrency at a time.
+    Session i is seeded with stream i forked from the master seed.
+
+    Parameters:
+        connect = opens a connection to the server.
+        player_name = the player type to play as, as the server names it.
+        game_file = the game file to play; it must be readable here too.
+        policy_class = policy each session chooses its moves with.
+        sessions = number of sessions to play.
+        concurrency = number of sessions connected at once.
+        seed = master seed of the run.
+        max_turns = number of turns after which a session is abandoned.
+        renderer_class = renders the responses the same way as the server.
+    """
+    encounters = read_game_file(game_file, MONSTER_TYPES)
+    master = GameRandom(seed)
+    latencies = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def limited(index: int) -> tuple[bool, int, int]:
+        async with limit:
+            return await play_session(
+                connect, player_name, game_file, encounters,
+                master.fork(index).get_seed(), policy_class(), latencies,
+                max_turns, renderer_class)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(limited(index)
+                                     for index in range(sessions)))
+    elapsed = time.perf_counter() - start
+    finished = sum(result[0] for result in results)
+    latencies.sort()
+    return LoadResult(
+        finished, sessions - finished,
+        sum(result[1] for result in results),
+        sum(result[2] for result in results), elapsed,
+        percentile(latencies, 50) if latencies else 0.0,
+        percentile(latencies, 99) if latencies else 0.0,
+        finished / elapsed if elapsed > 0 else 0.0)
+
+
+def connector(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    path: str | None = None
+) -> Connect:
+    """
+    Returns a function opening connections to a server over TCP, or over a
+    Unix socket if path is given.
+    """
+    if path is not None:
+        return lambda: asyncio.open_unix_connection(path)
+    return lambda: asyncio.open_connection(host, port)
+
+
+def main() -> None:
+    """
+    Command line entry point: plays sessions against a running server and
+    prints the latency and throughput seen.
+    """
+    parser = argparse.ArgumentParser(description="Game server load generator")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None,
+                        help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--game-file", default="games/game1.txt")
+    parser.add_argument("--player", choices=PLAYER_TYPES, default="ironclad")
+    parser.add_argument("--policy", choices=["greedy", "random"],
+                        default="greedy")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS)
+    parser.add_argument("--concurrency", type=int,
+                        default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--max-turns", type=int, default=DEFAULT_MAX_TURNS)
+    parser.add_argument("--format", choices=["text", "json", "frames"],
+                        default="text",
+                        help="how the server renders responses")
+    args = parser.parse_args()
+
+    load_monster_entry_points()
+    policy_class = GreedyPolicy if args.policy == "greedy" else RandomPolicy
+    result = asyncio.run(run_load(
+        connector(args.host, args.port, args.unix), args.player,
+        args.game_file, policy_class, args.sessions, args.concurrency,
+        args.seed, args.max_turns, RENDERERS[args.format]))
+    print(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,62 @@
+from importlib import import_module, metadata
+from operator import attrgetter, methodcaller
+from typing import Callable, Iterable
+import argparse
+import inspect
+import os
+import random
+import sys
+import time
+
 from a2_support import *
+from compiled_game import *
+from event_log import *
 
 """Interactive card game"""
 
 class Card(object):
     """
     Represents characteristics of a card in a card game. 
+
+    Card types are normally defined in the cards file (see load_card_file),
+    which sets the class attributes below; the getters only read them.
+
+    Cards have no per-instance state, so each card type has a single shared
+    instance: calling Strike() again returns the same object.
     
     """
-    
+    __slots__ = ()
+    _instances = {}
+    _damage = 0
+    _block = 0
+    _cost = 1
+    _status = {}
+    _self_status = {}
+    _description = "A card."
+    _requires_target = True
+    _name = "Card"
+    _text = "Card: A card."
+    _repr = "Card()"
+
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        """
+        Precomputes the name and string representations of a new card type.
+        Card types are immutable, so they never need recomputing.
+        """
+        super().__init_subclass__(**kwargs)
+        cls._name = cls.__name__
+        cls._text = f"{cls._name}: {cls._description}"
+        cls._repr = f"{cls._name}()"
+
+
+    def __new__(cls) -> 'Card':
+        instance = Card._instances.get(cls)
+        if instance is None:
+            instance = super().__new__(cls)
+            Card._instances[cls] = instance
+        return instance
+
     
     def get_damage_amount(self) -> int:
         """
@@ -16,7 +65,7 @@ class Card(object):
         Return: An integer value of damage amount.
 
         """
-        return 0
+        return self._damage
 
     
     def get_block(self) -> int:
@@ -26,7 +75,7 @@ class Card(object):
         Return: An integer value of block amount. 
 
         """
-        return 0
+        return self._block
 
     
     def get_energy_cost(self) -> int:
@@ -36,17 +85,30 @@ class Card(object):
         Return: An integer value of energy cost. 
 
         """
-        return 1
+        return self._cost
 
     
     def get_status_modifiers(self) -> dict[str, int]:
         """
-        Returns status modifiers card inflicts on target. 
+        Returns status modifiers card inflicts on target. Modifiers the
+        card gives the player who plays it are returned by
+        get_self_modifiers instead, so Survivor, whose strength this used
+        to return, now returns {} here and {'strength': 1} there.
 
         Return: A dictionary containing a string and integer value. 
 
         """
-        return {}
+        return dict(self._status)
+
+
+    def get_self_modifiers(self) -> dict[str, int]:
+        """
+        Returns status modifiers card gives the player who plays it.
+
+        Return: A dictionary containing a string and integer value.
+
+        """
+        return dict(self._self_status)
     
 
     def get_name(self) -> str:
@@ -56,7 +118,7 @@ class Card(object):
         Return: A string value of given card name. 
 
         """
-        return f"{self.__class__.__name__}"
+        return self._name
     
 
     def get_description(self) -> str:
@@ -66,7 +128,7 @@ class Card(object):
         Return: A string value of card description. 
 
         """
-        return "A card."
+        return self._description
     
 
     def requires_target(self) -> bool:
@@ -77,7 +139,7 @@ class Card(object):
         if False, doesn't require a target to be played. 
 
         """
-        return True 
+        return self._requires_target
     
 
 
@@ -89,7 +151,7 @@ class Card(object):
         and its description.
 
         """
-        return f"{self.get_name()}: {self.get_description()}"
+        return self._text
     
 
     def __repr__(self) -> str:
@@ -99,105 +161,239 @@ class Card(object):
         Return: A string value containing card instance. 
 
         """
-        return f"{self.__class__.__name__}()"
+        return self._repr
 
 
 
-class Strike(Card):
-    """
-    Represents a type of card called Strike.
-    """
-    def get_damage_amount(self) -> int:
-        return 6
-    
+CARD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'cards.txt')
 
-    def get_description(self) -> str:
-        return f"Deal {self.get_damage_amount()} damage."
+# Status name -> the Entity method that adds it.
+STATUS_METHODS = {
+    'weak': 'add_weak',
+    'vulnerable': 'add_vulnerable',
+    'strength': 'add_strength',
+    }
 
+CARD_TYPES = {}
+CARDS = []
+CARD_IDS = {}
+CARD_DAMAGE = []
+CARD_BLOCK = []
+CARD_COST = []
+CARD_TARGET = []
+CARD_STATUS = []
+CARD_SELF_STATUS = []
+CARD_TARGET_EFFECTS = []
+CARD_SELF_EFFECTS = []
+CARD_DESCRIPTION = []
+_CARD_IDS_BY_TYPE = {}
 
 
-class Defend(Card):
+def _compile_effects(status: dict[str, int]) -> tuple[Callable, ...]:
     """
-    Represents a type of card called Defend.
+    Turns {status: amount} into callables that each add one status to the
+    entity they are called with.
     """
-    def get_block(self) -> int:
-        return 5
-
+    effects = []
+    for name, amount in status.items():
+        method = STATUS_METHODS.get(name)
+        if method is None:
+            raise ValueError(f"unknown status {name!r}")
+        effects.append(methodcaller(method, amount))
+    return tuple(effects)
 
-    def requires_target(self) -> bool:
-        return False
-
-
-    def get_description(self) -> str:
-        return f"Gain {self.get_block()} block."
 
+def intern_card(card: Card) -> int:
+    """
+    Returns the small integer id of a card's type, adding the type to the
+    shared card table the first time it is seen. The table holds each card
+    type's damage, block, cost, target requirement, status modifiers and
+    description, indexed by card id, plus its status modifiers compiled
+    into effects for Encounter.player_apply_card.
 
+    Parameter:
+        card = any instance of the card type.
 
-class Bash(Card):
+    Return: An integer card id.
     """
-    Represents a type of card called Bash.
+    card_id = _CARD_IDS_BY_TYPE.get(type(card))
+    if card_id is None:
+        card = type(card)()
+        card_id = len(CARDS)
+        CARDS.append(card)
+        CARD_IDS[card.get_name()] = card_id
+        CARD_DAMAGE.append(card.get_damage_amount())
+        CARD_BLOCK.append(card.get_block())
+        CARD_COST.append(card.get_energy_cost())
+        CARD_TARGET.append(card.requires_target())
+        CARD_STATUS.append(card.get_status_modifiers())
+        CARD_SELF_STATUS.append(card.get_self_modifiers())
+        CARD_TARGET_EFFECTS.append(_compile_effects(CARD_STATUS[card_id]))
+        CARD_SELF_EFFECTS.append(_compile_effects(CARD_SELF_STATUS[card_id]))
+        CARD_DESCRIPTION.append(card.get_description())
+        _CARD_IDS_BY_TYPE[type(card)] = card_id
+    return card_id
+
+
+CARD_FIELDS = ('damage', 'block', 'cost', 'status', 'self_status')
+
+
+def update_card(card_type: type[Card], **fields) -> None:
     """
-    def get_damage_amount(self) -> int:
-        return 7
-
-
-    def get_block(self) -> int:
-        return 5
-
-
-    def get_description(self) -> str:
-        return (f"Deal {self.get_damage_amount()} damage. "
-                f"Gain {self.get_block()} block.")
-
-    
-    def get_energy_cost(self) -> int:
-        return 2
-
-
-
-class Neutralize(Card):
+    Changes the values of a card type and its entry in the card table, so
+    games played afterwards use the new values. This is meant for balance
+    testing; the description is left as it was.
+
+    Parameters:
+        card_type = the card type to change.
+        fields = new values by cards file field name (see CARD_FIELDS):
+        damage, block and cost are integers, status and self_status are
+        {status: amount} dictionaries.
+
+    Raises:
+        ValueError: If a field or status is unknown.
     """
-    Represents a type of card called Neutralize.
+    for key in fields:
+        if key not in CARD_FIELDS:
+            raise ValueError(f"unknown card field {key!r}")
+    card_id = intern_card(card_type())
+    status = dict(fields.get('status', card_type._status))
+    self_status = dict(fields.get('self_status', card_type._self_status))
+    target_effects = _compile_effects(status)
+    self_effects = _compile_effects(self_status)
+    for key in ('damage', 'block', 'cost'):
+        if key in fields:
+            setattr(card_type, '_' + key, fields[key])
+    card_type._status = status
+    card_type._self_status = self_status
+    CARD_DAMAGE[card_id] = card_type._damage
+    CARD_BLOCK[card_id] = card_type._block
+    CARD_COST[card_id] = card_type._cost
+    CARD_STATUS[card_id] = status
+    CARD_SELF_STATUS[card_id] = self_status
+    CARD_TARGET_EFFECTS[card_id] = target_effects
+    CARD_SELF_EFFECTS[card_id] = self_effects
+
+
+def _describe_card(fields: dict) -> str:
     """
-    def get_damage_amount(self) -> int:
-        return 3
-
-
-    def get_energy_cost(self) -> int:
-        return 0
-
-
-    def get_status_modifiers(self) -> dict[str, int]:
-        return {'weak': 1,'vulnerable': 2}
-
-
-    def get_description(self) -> str:
-        return (f"Deal {self.get_damage_amount()} damage. "
-                f"Apply {self.get_status_modifiers()['weak']} weak. "
-                f"Apply {self.get_status_modifiers()['vulnerable']} vulnerable.")
-
-
-
-class Survivor(Card):
+    Builds the default description of a card from its cards file fields.
     """
-    Represents a type of card called Survivor.
+    parts = []
+    if fields['_damage']:
+        parts.append(f"Deal {fields['_damage']} damage.")
+    if fields['_block']:
+        parts.append(f"Gain {fields['_block']} block.")
+    for name, amount in fields['_status'].items():
+        parts.append(f"Apply {amount} {name}.")
+    for name, amount in fields['_self_status'].items():
+        parts.append(f"Gain {amount} {name}.")
+    return " ".join(parts) or Card._description
+
+
+def load_card_file(filename: str) -> list[type[Card]]:
     """
-    def get_block(self) -> int:
-        return 8
-
-
-    def get_status_modifiers(self) -> dict[str, int]:
-        return {'strength': 1}
-
-
-    def requires_target(self) -> bool:
-        return False
+    Reads card definitions from a cards file, creates a Card subclass for
+    each one and adds it to the card table (in file order, so the first card
+    in the first file loaded gets id 0). The new types are also kept in
+    CARD_TYPES by name.
 
+    Parameters:
+        filename = the cards file to read (see cards.txt for the format).
 
-    def get_description(self) -> str:
-        return (f"Gain {self.get_block()} block and "
-                f"{self.get_status_modifiers()['strength']} strength.")
+    Return: The new card types, in file order.
 
+    Raises:
+        GameFileError: If a line is malformed, a field comes before any Card
+        header, a status or its recipient is unknown, a card without a target
+        has target statuses, or a card name is already defined.
+    """
+    definitions = []
+    names = set()
+    fields = None
+    with open(filename, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            words = line.split()
+            if not words or words[0].startswith('#'):
+                continue
+            key, values = words[0], words[1:]
+            if key == 'Card':
+                if len(values) != 1:
+                    raise GameFileError(filename, line_number,
+                                        'expected "Card <name>"')
+                name = values[0]
+                if name in CARD_IDS or name in CARD_TYPES or name in names:
+                    raise GameFileError(filename, line_number,
+                                        f'card {name!r} is already defined')
+                names.add(name)
+                fields = {'_status': {}, '_self_status': {}}
+                definitions.append((name, line_number, fields))
+            elif fields is None:
+                raise GameFileError(filename, line_number,
+                                    'card field before any Card header')
+            elif key == 'description':
+                fields['_description'] = line.strip()[len(key):].strip()
+            elif key in ('cost', 'damage', 'block'):
+                if len(values) != 1 or not values[0].isdecimal():
+                    raise GameFileError(filename, line_number,
+                                        f'{key} must be a non-negative '
+                                        f'integer, got {line.strip()!r}')
+                fields['_' + key] = int(values[0])
+            elif key == 'target':
+                if values not in (['monster'], ['none']):
+                    raise GameFileError(filename, line_number,
+                                        'expected "target monster|none"')
+                fields['_requires_target'] = values == ['monster']
+            elif key == 'status':
+                if (len(values) != 3 or values[0] not in STATUS_METHODS or
+                        not values[1].isdecimal() or
+                        values[2] not in ('target', 'self')):
+                    raise GameFileError(filename, line_number,
+                                        'expected "status <weak|vulnerable|'
+                                        'strength> <amount> <target|self>", '
+                                        f'got {line.strip()!r}')
+                recipient = '_status' if values[2] == 'target' else '_self_status'
+                fields[recipient][values[0]] = int(values[1])
+            else:
+                raise GameFileError(filename, line_number,
+                                    f'unknown card field {key!r}')
+
+    card_types = []
+    for name, line_number, fields in definitions:
+        fields.setdefault('_damage', 0)
+        fields.setdefault('_block', 0)
+        if fields['_status'] and not fields.get('_requires_target', True):
+            raise GameFileError(filename, line_number,
+                                f'card {name!r} has target statuses but no '
+                                'target')
+        fields.setdefault('_description', _describe_card(fields))
+        card_type = type(name, (Card,), dict(
+            fields, __slots__=(), __module__=__name__,
+            __doc__=f"Represents a type of card called {name}."))
+        CARD_TYPES[name] = card_type
+        intern_card(card_type())
+        card_types.append(card_type)
+    return card_types
+
+
+load_card_file(CARD_FILE)
+Strike, Defend, Bash, Neutralize, Survivor = (
+    CARD_TYPES[name]
+    for name in ("Strike", "Defend", "Bash", "Neutralize", "Survivor")
+    )
+STRIKE, DEFEND, BASH, NEUTRALIZE, SURVIVOR = [
+    intern_card(card_type())
+    for card_type in (Strike, Defend, Bash, Neutralize, Survivor)
+    ]
+
+
+
+_STATE_SLOTS = {}
+_STATE_GETTERS = {}
+_ID_INDEXES = {}
+# Slots caching text derived from an entity's state, left out of snapshots.
+_CACHE_SLOTS = frozenset(('_text', '_hand_view', '_hand_text'))
 
 
 class Entity(object):
@@ -205,6 +401,8 @@ class Entity(object):
     Represents characteristics of an entity in a card game. 
 
     """
+    __slots__ = ('_max_hp', '_hp', '_block', '_strength', '_weak',
+                 '_vulnerable', '_text')
 
 
     def __init__(self, max_hp:int) -> None:
@@ -216,6 +414,8 @@ class Entity(object):
             strength = amount of strength entity has.
             weak = amount of weakness entity has applied to them.
             vulnerable = amount of vulnerability entity has applied to them.
+            text = str() of the entity, or None if its hp has changed since
+            it was last built.
             
         """
         self._max_hp = max_hp
@@ -224,6 +424,7 @@ class Entity(object):
         self._strength = 0
         self._weak = 0
         self._vulnerable = 0
+        self._text = None
 
         
     def get_hp(self) -> int:
@@ -300,14 +501,14 @@ class Entity(object):
         Parameter:
             amount = number to reduce hp by.
         """
-        self._amount = amount
+        self._text = None
         if self._block > 0:
-            self._block -= self._amount
+            self._block -= amount
             if self._block < 0:
-                self._hp += self._block
+                self._hp = max(self._hp + self._block, 0)
                 self._block = 0
         else:
-            self._hp -= self._amount
+            self._hp -= amount
             if self._hp < 0:
                 self._hp = 0
 
@@ -331,8 +532,8 @@ class Entity(object):
         Parameter:
             amount = given number to increase block.
         """
-        self._amount = amount
         self._block += amount
+        self._text = None
 
 
     def add_strength(self, amount:int) -> None:
@@ -342,8 +543,8 @@ class Entity(object):
         Parameter:
             amount = given number to increase strength.
         """
-        self._amount = amount
         self._strength += amount
+        self._text = None
 
 
     def add_weak(self, amount:int) -> None:
@@ -353,8 +554,8 @@ class Entity(object):
         Parameter:
             amount = given number to increase weak.
         """
-        self._amount = amount
         self._weak += amount
+        self._text = None
 
 
     def add_vulnerable(self, amount:int) -> None:
@@ -364,8 +565,8 @@ class Entity(object):
         Parameter:
             amount = given number to increase vulnerable.
         """
-        self._amount = amount
         self._vulnerable += amount
+        self._text = None
 
 
     def new_turn(self) -> None:
@@ -379,16 +580,74 @@ class Entity(object):
             self._weak -= 1
         if self._vulnerable >0:
             self._vulnerable -= 1
+        self._text = None
+
+
+    @classmethod
+    def _state_slots(cls) -> tuple[str, ...]:
+        """
+        Returns the names of every slot declared by this class and its
+        bases, which together hold all of an entity's state. Slots in
+        _CACHE_SLOTS are left out.
+
+        Raises:
+            TypeError: If a class in the hierarchy doesn't declare
+            __slots__, since state kept in an instance __dict__ would be
+            missed by snapshot() and restore().
+        """
+        names = _STATE_SLOTS.get(cls)
+        if names is None:
+            names = []
+            for klass in reversed(cls.__mro__):
+                if klass is not object and '__slots__' not in klass.__dict__:
+                    raise TypeError(f"{klass.__name__} must declare __slots__"
+                                    " for its state to be snapshotted")
+                names.extend(name for name in klass.__dict__.get('__slots__', ())
+                             if name not in _CACHE_SLOTS)
+            names = _STATE_SLOTS[cls] = tuple(names)
+        return names
+
+
+    def snapshot(self) -> tuple:
+        """
+        Returns an immutable copy of the entity's state.
+
+        Return: A tuple of the entity's slot values.
+        """
+        getter = _STATE_GETTERS.get(type(self))
+        if getter is None:
+            getter = attrgetter(*self._state_slots())
+            _STATE_GETTERS[type(self)] = getter
+        return getter(self)
+
+
+    def restore(self, state: tuple) -> None:
+        """
+        Puts the entity back into a state returned by snapshot().
+
+        Parameter:
+            state = the state to restore.
+        """
+        for name, value in zip(self._state_slots(), state):
+            setattr(self, name, value)
+        self._text = None
 
         
     def __str__(self) -> str:
         """
-        Returns a current hp against maximum hp of entity. 
+        Returns a current hp against maximum hp of entity. The string is
+        kept until the entity's state next changes (every method changing
+        it clears _text), so displaying an unchanged entity again costs
+        nothing.
 
         Return: A string value of entity hp. 
 
         """
-        return f"{self.get_name()}: {self._hp}/{self._max_hp} HP"
+        text = self._text
+        if text is None:
+            text = self._text = (f"{self.get_name()}: "
+                                 f"{self._hp}/{self._max_hp} HP")
+        return text
 
 
     def __repr__(self) -> str:
@@ -407,6 +666,8 @@ class Player(Entity):
     Represents characteristics of a player in a card game. 
 
     """
+    __slots__ = ('_energy', '_card_deck', '_card_discarded', '_card_hand',
+                 '_hand_index', '_hand_size', '_hand_view', '_hand_text')
     def __init__(self, max_hp: int, cards: list[Card] | None = None) -> None:
         super().__init__(max_hp)
         """
@@ -414,14 +675,16 @@ class Player(Entity):
             cards = set of cards specific to each player.
             energy = set energy of player.
             card_deck = player's card deck.
-            card_hand = available cards for olay in player's hand.
+            card_hand = available cards for olay in player's hand, indexed
+            by card id so plays don't scan the hand.
             card_discarded = used cards.
+        Cards are kept as integer card ids from the shared card table.
         """
-        self._cards = cards
         self._energy = 3
-        self._card_deck = cards if cards is not None else None
-        self._card_hand = []
+        self._card_deck = ([intern_card(card) for card in cards]
+                           if cards is not None else None)
         self._card_discarded = []
+        self._set_hand([])
 
         
     def get_energy(self) -> int:
@@ -439,15 +702,66 @@ class Player(Entity):
 
         Returns: List of cards. 
         """
-        return self._card_hand 
+        #played cards leave a gap in the hand slots until the hand is rebuilt
+        if self._hand_view is None:
+            self._hand_view = [CARDS[card_id] for card_id in self._card_hand
+                               if card_id is not None]
+        return self._hand_view
+
+
+    def get_hand_text(self) -> str:
+        """
+        Returns the hand as it is displayed, the same as str(get_hand()).
+        The string is kept until the hand next changes.
+        Returns: A string listing the cards in hand.
+        """
+        if self._hand_text is None:
+            self._hand_text = str(self.get_hand())
+        return self._hand_text
+
+
+    def hand_size(self) -> int:
+        """
+        Returns the number of cards in the player's hand.
+        Returns: An integer value of hand size.
+        """
+        return self._hand_size
+
+
+    def has_card(self, card_name: str) -> bool:
+        """
+        Identifies if a card with the given name is in the player's hand.
+        Returns: A boolean value, True if the card is in hand.
+        """
+        return bool(self._hand_index.get(CARD_IDS.get(card_name)))
+
+
+    def count_card(self, card_name: str) -> int:
+        """
+        Returns the number of copies of the named card in the player's hand.
+        Returns: An integer value of copies in hand.
+        """
+        positions = self._hand_index.get(CARD_IDS.get(card_name))
+        return len(positions) if positions else 0
+
+
+    def find_card(self, card_name: str) -> Card | None:
+        """
+        Returns the card in hand with the given name.
+        Returns: A card if in hand, otherwise returns none.
+        """
+        card_id = CARD_IDS.get(card_name)
+        return CARDS[card_id] if self._hand_index.get(card_id) else None
 
 
     def get_deck(self) -> list[Card]:
         """
         Returns the card deck of all cards of player.
-        Returns: List of cards.
+        Returns: List of cards, or None if the player was made without one.
         """
-        return self._card_deck 
+        if self._card_deck is None:
+            return None
+        return [CARDS[card_id] for card_id in self._card_deck]
 
 
     def get_discarded(self) -> list[Card]:
@@ -455,14 +769,55 @@ class Player(Entity):
         Returns discarded deck containing used cards.
         Returns: List of cards.
         """
+        return [CARDS[card_id] for card_id in self._card_discarded]
+
+
+    def get_deck_ids(self) -> list[int]:
+        """
+        Returns the card ids of the player's deck, in deck order.
+        Returns: List of card ids.
+        """
+        return self._card_deck
+
+
+    def get_hand_ids(self) -> list[int]:
+        """
+        Returns the card ids of the player's hand, in hand order.
+        Returns: List of card ids.
+        """
+        return [card_id for card_id in self._card_hand if card_id is not None]
+
+
+    def get_discarded_ids(self) -> list[int]:
+        """
+        Returns the card ids of the discard pile, in discard order.
+        Returns: List of card ids.
+        """
         return self._card_discarded
 
+    def _set_hand(self, hand: list[int]) -> None:
+        """
+        Replaces the hand and indexes it by card id.
+        hand_index = positions in hand of each card id, last position
+        first so the first copy in hand can be popped off the end.
+        """
+        self._card_hand = hand
+        self._hand_index = {}
+        for position in range(len(hand) - 1, -1, -1):
+            card_id = hand[position]
+            if card_id not in self._hand_index:
+                self._hand_index[card_id] = []
+            self._hand_index[card_id].append(position)
+        self._hand_size = len(hand)
+        self._hand_view = None
+        self._hand_text = None
+
     def start_new_encounter(self) -> None:
         """
         A new encounter is started for the player.
         """
         #When the length of card hand is 0, a new encounter is triggered. 
-        if len(self._card_hand) == 0:
+        if self._hand_size == 0:
             self._card_deck.extend(self._card_discarded)
             self._card_discarded = []
 
@@ -470,13 +825,21 @@ class Player(Entity):
         """
         Ends the player's turn.
         """
-        self._card_discarded += self._card_hand
-        self._card_hand = []
+        self._card_discarded += self.get_hand_ids()
+        self._set_hand([])
 
-    def new_turn(self) -> None:
+    def new_turn(self, rng: random.Random | None = None) -> None:
+        """
+        Starts the player's turn and draws a new hand.
+
+        Parameter:
+            rng = random generator used to draw cards (default: the global
+            random module).
+        """
         super().new_turn()
-        self._card_hand = []
-        draw_cards(self._card_deck, self._card_hand, self._card_discarded)
+        hand = []
+        draw_cards(self._card_deck, hand, self._card_discarded, rng)
+        self._set_hand(hand)
         self._energy = 3
 
     def play_card(self, card_name: str) -> Card | None:
@@ -485,32 +848,57 @@ class Player(Entity):
         Returns: A card if played, otherwise returns none. 
         """
         #identifies if given card is in card hand
-        play_card_names = [card.get_name() for card in self._card_hand]
-        played = False
-        for index, name in enumerate(play_card_names):
-            if name == card_name and not played:
-                card = self._card_hand[index]
-                #if so, card is played
-                #removes energy from player and adds card to discard pile
-                if self._energy >= card.get_energy_cost():
-                    self._energy -= card.get_energy_cost()
-                    removed_item = self._card_hand.pop(index)
-                    self._card_discarded.append(removed_item)
-                    played = True
-                    return card
-                else:
-                    return None
-        if not played:
+        card_id = CARD_IDS.get(card_name)
+        positions = self._hand_index.get(card_id)
+        if not positions:
             return None
+        #if so, card is played
+        #removes energy from player and adds card to discard pile
+        cost = CARD_COST[card_id]
+        if self._energy < cost:
+            return None
+        self._energy -= cost
+        self._card_hand[positions.pop()] = None
+        self._hand_size -= 1
+        self._hand_view = None
+        self._hand_text = None
+        self._card_discarded.append(card_id)
+        return CARDS[card_id]
+
+    def snapshot(self) -> tuple:
+        """
+        Returns an immutable copy of the player's state, with the deck, hand
+        and discard pile as tuples of card ids.
+        """
+        deck = self._card_deck
+        return (self._max_hp, self._hp, self._block, self._strength,
+                self._weak, self._vulnerable, self._energy,
+                tuple(deck) if deck is not None else None,
+                tuple(self.get_hand_ids()), tuple(self._card_discarded))
+
+    def restore(self, state: tuple) -> None:
+        """
+        Puts the player back into a state returned by snapshot().
+
+        Parameter:
+            state = the state to restore.
+        """
+        (self._max_hp, self._hp, self._block, self._strength, self._weak,
+         self._vulnerable, self._energy, deck, hand, discarded) = state
+        self._text = None
+        self._card_deck = list(deck) if deck is not None else None
+        self._card_discarded = list(discarded)
+        self._set_hand(list(hand))
 
     def __repr__(self) -> str:
-        return f"{self.get_name()}{self._max_hp, self._card_deck}"
+        return f"{self.get_name()}{self._max_hp, self.get_deck()}"
 
 
 class IronClad(Player):
     """
     A type of player called IronClad.
     """
+    __slots__ = ()
     def __init__(self):
         max_hp = 80
         cards = [
@@ -534,6 +922,7 @@ class Silent(Player):
     """
     A type of player called Silent.
     """
+    __slots__ = ()
     def __init__(self) -> None:
         max_hp = 70
         cards = [
@@ -562,6 +951,7 @@ class Monster(Entity):
     Represents characteristics of a monster in a card game. 
 
     """
+    __slots__ = ('_id',)
     monster_count = 0
     def __init__(self, max_hp: int) -> None:
         super().__init__(max_hp)
@@ -601,14 +991,21 @@ class Monster(Entity):
 class Louse(Monster):
     """
     A type of monster called Louse.
+    Its damage is rolled once, from _min_damage to _max_damage.
     """
-    def __init__(self, max_hp: int) -> None:
+    __slots__ = ('_dmg_amount',)
+    _min_damage = 5
+    _max_damage = 7
+    def __init__(self, max_hp: int, rng: random.Random | None = None) -> None:
         """
         Parameter:
             dmg_amount = amount of damage Louse inflicts.
+            rng = random generator used to pick the damage amount (default:
+            the global random module).
         """
         super().__init__(max_hp)
-        self._dmg_amount = random_louse_amount()
+        self._dmg_amount = random_louse_amount(rng, self._min_damage,
+                                               self._max_damage)
  
     def action(self) -> dict[str, int]:
         return {'damage': self._dmg_amount}
@@ -619,7 +1016,12 @@ class Louse(Monster):
 class Cultist(Monster):
     """
     A type of monster called Cultist.
+    After a first turn without damage, it deals _base_damage plus
+    _damage_ramp for each turn it has taken.
     """
+    __slots__ = ('_dmg_amount', '_num_calls', '_first_call', '_weak_amount')
+    _base_damage = 6
+    _damage_ramp = 1
     def __init__(self, max_hp:int):
         """
         Parameter:
@@ -636,7 +1038,8 @@ class Cultist(Monster):
         if self._first_call:
             self._first_call = False
         else:
-            self._dmg_amount = 6 + self._num_calls
+            self._dmg_amount = (self._base_damage +
+                                self._damage_ramp * self._num_calls)
         self._num_calls += 1
         self._weak_amount = (self._num_calls - 1) % 2
         return {'damage': self._dmg_amount, 'weak': self._weak_amount}
@@ -649,6 +1052,7 @@ class JawWorm(Monster):
     """
     A type of monster called JawWorm.
     """
+    __slots__ = ('_dmg_taken', '_dmg_amount')
     def __init__(self, max_hp:int):
         """
         Parameter:
@@ -656,10 +1060,12 @@ class JawWorm(Monster):
         """
         super().__init__(max_hp)
         self._dmg_taken = 0
+        self._dmg_amount = 0
 
     def action(self) -> dict[str, int]:
         dmg_taken_so_far = self._max_hp - self._hp
         self._block = ((dmg_taken_so_far + 1)//2)
+        self._text = None
         self._dmg_amount = (dmg_taken_so_far//2)    
         return {'damage': self._dmg_amount}
 
@@ -667,54 +1073,168 @@ class JawWorm(Monster):
         return f"JawWorm({self._max_hp})"
 
         
+MONSTER_ENTRY_POINT_GROUP = 'card_game.monsters'
+
+# Monster type name -> constructor taking (max_hp, rng).
+MONSTER_TYPES = {}
+
+
+def register_monster(
+    name: str,
+    monster_type: Callable[..., Monster]
+) -> None:
+    """
+    Adds a monster type that game files can name. The constructor is
+    adapted once here, so building an encounter is a single call per
+    monster whether or not the type takes a random generator.
+
+    Snapshots copy an entity's slots only, so the monster class and each of
+    its bases must declare __slots__ naming all of its state (an empty
+    tuple if it adds none), e.g.
+
+        class Slime(Monster):
+            __slots__ = ('_phase',)
+
+    Parameters:
+        name = the name used for the monster in game files.
+        monster_type = a Monster subclass, or any callable returning a
+        Monster, taking max_hp and optionally an rng keyword.
+
+    Raises:
+        TypeError: If monster_type is a class without __slots__ somewhere
+        in its hierarchy. Monsters from other callables are checked when
+        they are first snapshotted.
+    """
+    if isinstance(monster_type, type):
+        monster_type._state_slots()
+    try:
+        takes_rng = 'rng' in inspect.signature(monster_type).parameters
+    except (TypeError, ValueError):
+        takes_rng = False
+    if takes_rng:
+        MONSTER_TYPES[name] = monster_type
+    else:
+        MONSTER_TYPES[name] = lambda max_hp, rng: monster_type(max_hp)
+
+
+def _load_object(reference: str) -> object:
+    """
+    Imports the object named by a 'module:attribute' reference.
+    """
+    module_name, _, attribute = reference.partition(':')
+    target = import_module(module_name)
+    for part in attribute.split('.'):
+        target = getattr(target, part)
+    return target
+
+
+def load_monster_file(filename: str) -> list[str]:
+    """
+    Registers the monster types listed in a data file, one per line as
+    '<name> <module>:<attribute>'. Blank lines and lines starting with #
+    are ignored.
+
+    Parameters:
+        filename = the file to read.
+
+    Return: The names registered.
+    """
+    names = []
+    with open(filename, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            if len(fields) != 2 or ':' not in fields[1]:
+                raise GameFileError(filename, line_number,
+                                    'expected "<name> <module>:<attribute>"')
+            register_monster(fields[0], _load_object(fields[1]))
+            names.append(fields[0])
+    return names
+
+
+def load_monster_entry_points(
+    group: str = MONSTER_ENTRY_POINT_GROUP
+) -> list[str]:
+    """
+    Registers every monster type installed packages publish under the given
+    entry point group, using each entry point's name as the monster name.
+
+    Parameters:
+        group = the entry point group to load.
+
+    Return: The names registered.
+    """
+    names = []
+    for entry_point in metadata.entry_points(group=group):
+        register_monster(entry_point.name, entry_point.load())
+        names.append(entry_point.name)
+    return names
+
+
+register_monster('Louse', Louse)
+register_monster('Cultist', Cultist)
+register_monster('JawWorm', JawWorm)
+
+
 class Encounter(object):
     """
     Represents characteristics of an encounter in a card game. 
 
     """
-    def __init__(self, player: Player, monsters: list[tuple[str, int]]) -> None:
+    __slots__ = ('_player', '_rng', '_monsters', '_monster_view', '_intents',
+                 '_roster', '_log')
+    def __init__(
+        self,
+        player: Player,
+        monsters: list[tuple[str, int]],
+        rng: random.Random | None = None
+    ) -> None:
         """
         Parameters:
             player = chosen player by user.
-            monsters = monsters present in encounter for battle.
+            monsters = monsters present in encounter for battle, kept by
+            id in display order.
+            intents = each monster's action in the latest enemy turn.
+            roster = every monster the encounter has held, by id, including
+            defeated ones, so restore() can bring back the same objects.
+            rng = random generator owned by this encounter's game (default:
+            the global random module).
+            log = list the results of card plays and enemy turns are
+            appended to (see set_log), or None.
         """
         self._player = player
-        self._monsters = monsters
-        encounter_monsters = []
-        for monster_tuple in self._monsters:
-            name, max_hp = monster_tuple
-            if name == 'Louse':
-                monster = Louse(max_hp)
-            elif name == 'Cultist':
-                monster = Cultist(max_hp)
-            elif name == 'JawWorm':
-                monster = JawWorm(max_hp)
-            else:
-                pass
-        
-            encounter_monsters.append(monster)
-        self._monsters = encounter_monsters
+        self._rng = rng
+        self._log = None
+        types = MONSTER_TYPES
+        try:
+            encounter_monsters = [types[name](max_hp, rng)
+                                  for name, max_hp in monsters]
+        except KeyError:
+            unknown = [name for name, _ in monsters if name not in types]
+            if not unknown:
+                raise
+            raise ValueError(f"unknown monster type {unknown[0]!r}") from None
+        self._monsters = {monster.get_id(): monster
+                          for monster in encounter_monsters}
+        self._monster_view = encounter_monsters
+        self._intents = {}
+        self._roster = dict(self._monsters)
         self._player.start_new_encounter()
-        
-        print("New encounter!\n")
         self.start_new_turn()
-        card_names = {"Strike": Strike(), "Defend": Defend(),
-                      "Bash": Bash(), "Neutralize": Neutralize(),
-                      "Survivor": Survivor()}
-        self._card_names = card_names
 
     def start_new_turn(self) -> None:
         """
         Initiates a new turn.
         """
-        self._player.new_turn()
+        self._player.new_turn(self._rng)
 
     def end_player_turn(self) -> None:
         """
         Ends player turn.
         """
         self._player.end_turn()
-        for monster in self._monsters:
+        for monster in self._monsters.values():
             monster.new_turn()
 
     def get_player(self) -> Player:
@@ -723,23 +1243,53 @@ class Encounter(object):
         """
         return self._player
 
+    def get_rng(self) -> random.Random | None:
+        """
+        Returns the random generator of this encounter, or None if it uses
+        the global random module.
+        """
+        return self._rng
+
+    def set_rng(self, rng: random.Random | None) -> None:
+        """
+        Replaces the random generator used for the rest of this encounter.
+        Parameters:
+            rng = the new generator, or None for the global random module.
+        """
+        self._rng = rng
+
+    def set_log(self, log: list | None) -> None:
+        """
+        Starts appending the result of every successful card play, as
+        (card, target_id, damage), and of every enemy turn, as
+        (None, damage, player_hp, intents), to log. EventLog formats them.
+        Parameters:
+            log = the list to append to, or None to stop recording.
+        """
+        self._log = log
+
     def get_monsters(self) -> list[Monster]:
         """
         Gets monsters in encounter phase.
         Returns: List of monster/s in encounter.
         """
-        return self._monsters
+        if self._monster_view is None:
+            self._monster_view = list(self._monsters.values())
+        return self._monster_view
+
+    def get_monster(self, monster_id: int) -> Monster | None:
+        """
+        Gets the monster with the given id.
+        Returns: The monster, or None if no such monster remains.
+        """
+        return self._monsters.get(monster_id)
 
     def is_active(self) -> bool:
         """
         Determines whether monster is still alive.
         Returns: A boolean value, False if dead, True if alive.
         """
-        empty = []
-        if self._monsters == []:
-            return False
-        else:
-            return True
+        return len(self._monsters) > 0
 
     def player_apply_card(self, card_name: str, target_id: int | None = None) -> bool:
         """
@@ -748,129 +1298,178 @@ class Encounter(object):
             card_name = card name used against target or used in battle.
             target_id = chosen target to use card against.
         """
-        self._card_name = card_name
-        self._target_id = target_id
-        empty = []
-
         #check if it's the player's turn
-        if self._player._card_hand == empty:
+        if self._player.hand_size() == 0:
             return False
         else:
             pass
 
         #if card with given name requires a target bu no target was given
-        if self._card_name in ["Strike", "Bash", "Defend",
-                               "Neutralize", "Survivor"]:
-            if self._card_names[self._card_name].requires_target() == True:
-                if self._target_id is None:
-                    return False
-                else:
-                    pass
-        else:
+        card_id = CARD_IDS.get(card_name)
+        if card_id is None:
+            return False
+        if CARD_TARGET[card_id] and target_id is None:
             return False
 
-        
-        #if a target was given but no monster remains
-        if self._target_id is not None: 
-            for monster in self._monsters:
-                x = monster.get_id()
-                if x != self._target_id:
-                    return False
-                else:
-                    pass
-        
+        #if a target was given but no monster with that id remains
+        monster = None
+        if target_id is not None:
+            monster = self._monsters.get(target_id)
+            if monster is None:
+                return False
 
         #attempts to play card
-        if self._player.play_card(self._card_name) == None:
+        if self._player.play_card(card_name) == None:
             return False
         else:
             pass
         
-    
-        if self._card_names[self._card_name].get_block() > 0:
-            self._player.add_block(self._card_names[self._card_name].get_block()
-        )
+        if CARD_BLOCK[card_id] > 0:
+            self._player.add_block(CARD_BLOCK[card_id])
         else:
             pass
-                
 
+        #statuses the card gives the player, then the target
+        for effect in CARD_SELF_EFFECTS[card_id]:
+            effect(self._player)
 
-        #any vulnerable or weak from card should be applied:
-        for monster in self._monsters:
-            x = monster.get_id()
-            if self._target_id != None:
-                if self._card_name == "Neutralize":
-                    monster.add_weak(
-                        self._card_names[self._card_name]
-                        .get_status_modifiers()['weak']
-                        )
-                    monster.add_vulnerable(
-                        self._card_names[self._card_name]
-                        .get_status_modifiers()['vulnerable']
-                        )
-                elif self._card_name == "Survivor":
-                    monster.add_strength(
-                        self._card_names[self._card_name]
-                        .get_status_modifiers()['strength']
-                        )
-                else:
-                    pass
+        if monster is None or not CARD_TARGET[card_id]:
+            if self._log is not None:
+                self._log.append((CARDS[card_id], target_id, 0))
+            return True
 
-                #damage calculation 
-                calc_dmg = (self._card_names[self._card_name]
-                            .get_damage_amount()) + (self._player.get_strength()
-                            )
-                if monster.get_vulnerable() > 0:
-                    calc_dmg *= 1.5
-                else:
-                    pass
-                
-                if self._player.get_weak() > 0:
-                    calc_dmg *= 0.75
-                else:
-                    pass
-                final_calc_dmg = int(calc_dmg)
-                monster.reduce_hp(final_calc_dmg)
-                if monster.is_defeated() == True:
-                    self._monsters.remove(monster)
-            else:
-                pass
+        for effect in CARD_TARGET_EFFECTS[card_id]:
+            effect(monster)
 
+        #damage calculation 
+        calc_dmg = CARD_DAMAGE[card_id] + self._player.get_strength()
+        if monster.get_vulnerable() > 0:
+            calc_dmg *= 1.5
+        else:
+            pass
+        
+        if self._player.get_weak() > 0:
+            calc_dmg *= 0.75
+        else:
+            pass
+        final_calc_dmg = int(calc_dmg)
+        monster.reduce_hp(final_calc_dmg)
+        if monster.is_defeated() == True:
+            del self._monsters[target_id]
+            self._monster_view = None
+
+        if self._log is not None:
+            self._log.append((CARDS[card_id], target_id, final_calc_dmg))
         return True
 
+    def snapshot(self, include_rng: bool = True) -> tuple:
+        """
+        Returns an immutable copy of the whole encounter: the player, every
+        remaining monster (including counters such as Cultist's call count),
+        the latest intents and the state of the random generator, so that
+        a restored branch replays identically.
+        Parameters:
+            include_rng = False leaves out the random generator state, which
+            is most of the cost; restoring such a snapshot keeps the
+            generator where it is. Card plays never draw random numbers, so
+            searches within one turn can skip it.
+        Returns: A tuple that can be passed to restore().
+        """
+        rng = self._rng if self._rng is not None else random
+        return (self._player.snapshot(),
+                tuple((type(monster), monster.snapshot())
+                      for monster in self._monsters.values()),
+                tuple((monster_id, tuple(intent.items()))
+                      for monster_id, intent in self._intents.items()),
+                rng.getstate() if include_rng else None)
+
+    def restore(self, state: tuple) -> None:
+        """
+        Puts the encounter back into a state returned by snapshot().
+        Monsters the encounter has held keep their identity: each is put
+        back into its saved state, and monsters that were defeated after the
+        snapshot come back as the same objects. Monsters from another
+        encounter's snapshot are built anew.
+        Parameters:
+            state = the state to restore.
+        """
+        player_state, monster_states, intents, rng_state = state
+        self._player.restore(player_state)
+        roster = self._roster
+        monsters = {}
+        for monster_type, monster_state in monster_states:
+            index = _ID_INDEXES.get(monster_type)
+            if index is None:
+                index = _ID_INDEXES[monster_type] = \
+                    monster_type._state_slots().index('_id')
+            monster_id = monster_state[index]
+            monster = roster.get(monster_id)
+            if type(monster) is not monster_type:
+                monster = roster[monster_id] = \
+                    monster_type.__new__(monster_type)
+            monster.restore(monster_state)
+            monsters[monster_id] = monster
+        self._monsters = monsters
+        self._monster_view = None
+        self._intents = {monster_id: dict(intent)
+                         for monster_id, intent in intents}
+        if rng_state is not None:
+            rng = self._rng if self._rng is not None else random
+            rng.setstate(rng_state)
+
+    def get_intents(self) -> dict[int, dict[str, int]]:
+        """
+        Returns the actions the monsters chose in the latest enemy turn.
+        Returns: A dictionary of monster id to that monster's action.
+        """
+        return self._intents
+
+    def plan_intents(self) -> dict[int, dict[str, int]]:
+        """
+        Intent phase of the enemy turn: asks each monster for its action
+        exactly once, since action() advances state such as Cultist's call
+        count and JawWorm's block.
+        Returns: A dictionary of monster id to that monster's action.
+        """
+        self._intents = {monster_id: monster.action()
+                         for monster_id, monster in self._monsters.items()}
+        return self._intents
+
     def enemy_turn(self) -> None:
         """
         Starts enemy's turn. 
         """
-        empty = []
-        if self._player.get_hand() == []:
-            for monster in self._monsters:
-                monster.action()
-                if ('weak' in monster.action() and
-                    monster.action()['weak'] is not None):
-                    self._player.add_weak(monster.action()['weak'])
-                elif ('vulnerable' in monster.action() and
-                      monster.action()['vulnerable'] is not None):
-                    self._player.add_vulnerable(monster.action()['vulnerable'])
-                elif ('strength' in monster.action() and
-                      monster.action()['strength'] is not None):
-                    monster.add_strength(monster.action()['strength'])
+        if self._player.hand_size() == 0:
+            intents = self.plan_intents()
+            for monster_id, monster in self._monsters.items():
+                intent = intents[monster_id]
+                if intent.get('weak') is not None:
+                    self._player.add_weak(intent['weak'])
+                if intent.get('vulnerable') is not None:
+                    self._player.add_vulnerable(intent['vulnerable'])
+                if intent.get('strength') is not None:
+                    monster.add_strength(intent['strength'])
+
+            #damage calculation:
+            total_dmg = 0
+            for monster_id, monster in self._monsters.items():
+                calc_dmg = (intents[monster_id]['damage'] +
+                            monster.get_strength())
+                if self._player.get_vulnerable() > 0:
+                    calc_dmg *= 1.5
                 else:
                     pass
-                
-            #damage calculation:
-            calc_dmg = (monster.action()['damage']) + (monster.get_strength())
-            if self._player.get_vulnerable() > 0:
-                calc_dmg *= 1.5
-            else:
-                pass
-                    
-            if monster.get_weak() > 0:
-                calc_dmg *= 0.75
-            else:
-                pass
-            final_calc_dmg = int(calc_dmg)
-            self._player.reduce_hp(final_calc_dmg)         
+                        
+                if monster.get_weak() > 0:
+                    calc_dmg *= 0.75
+                else:
+                    pass
+                final_calc_dmg = int(calc_dmg)
+                self._player.reduce_hp(final_calc_dmg)
+                total_dmg += final_calc_dmg
+            if self._log is not None:
+                self._log.append((None, total_dmg, self._player.get_hp(),
+                                  intents))
             self.start_new_turn()
         else:
             return None
@@ -879,9 +1478,81 @@ class Encounter(object):
 
 
 
-def main():
+class Campaign(object):
+    """
+    Plays through the encounters of a game one at a time. Encounters are
+    pulled from an iterable, such as iter_game, and their monsters are only
+    built when the encounter starts, so campaigns of any length start at
+    once and use flat memory.
+    """
+
+    def __init__(
+        self,
+        player: Player,
+        encounters: Iterable[list[tuple[str, int]]],
+        rng: random.Random | None = None,
+        progress: Callable[[int, float], None] | None = None
+    ) -> None:
+        """
+        Parameters:
+            player = the player playing the campaign.
+            encounters = the monsters of each encounter, in order.
+            rng = random generator for every encounter (default: the global
+            random module).
+            progress = called with the encounter index (from 1) and the
+            seconds elapsed whenever an encounter starts.
+            index = number of encounters started so far.
+            started = time the campaign was created.
+        """
+        self._player = player
+        self._encounters = iter(encounters)
+        self._rng = rng
+        self._progress = progress
+        self._index = 0
+        self._started = time.perf_counter()
+
+    def next_encounter(self) -> Encounter | None:
+        """
+        Starts the next encounter.
+
+        Return: The new encounter, or None when the campaign is over.
+        """
+        monsters = next(self._encounters, None)
+        if monsters is None:
+            return None
+        self._index += 1
+        if self._progress is not None:
+            self._progress(self._index, self.get_elapsed())
+        return Encounter(self._player, monsters, self._rng)
+
+    def get_index(self) -> int:
+        """
+        Returns the number of the current encounter, from 1 (0 before the
+        first encounter starts).
+        """
+        return self._index
+
+    def get_elapsed(self) -> float:
+        """
+        Returns the seconds since the campaign was created.
+        """
+        return time.perf_counter() - self._started
+
+
+def main(
+    log_file: str | None = None,
+    ansi: bool = False,
+    progress: bool = False
+):
     """
     The main code which user interacts with.
+    Parameters:
+        log_file = file to append an event log of the game to (see
+        EventLog), or None for no log.
+        ansi = redraw the board in place on the terminal instead of
+        printing it after every move.
+        progress = report each encounter's index and the time elapsed on
+        standard error as it starts.
     """
     player = None  
     while not player:
@@ -895,98 +1566,61 @@ def main():
                   " or 'silent' player types.")
 
     file_name = input("Enter a game file: ")
-          
-    encounters = read_game_file(file_name)
-    monster_info = encounters[0]
-    monsters = monster_info 
-    encounter = Encounter(player, monsters)
-    display_encounter(encounter)
-
-
-    while True:
-        empty = []
-        if encounter.get_monsters() == empty:
-            encounters.pop(0)
-            if encounters == empty:
-                encounter.end_player_turn()
-                print(GAME_WIN_MESSAGE)
-                break
-            else:
-                monster_info = encounters[0]
-                monsters = monster_info
-                encounter = Encounter(player, monsters)
-                display_encounter(encounter)                        
-                         
+
+    from protocol import FrameRenderer, Game, TextRenderer
+    load_monster_entry_points()
+    log = EventLog(log_file) if log_file is not None else None
+    if log is not None:
+        log.start_game(type(player), file_name)
+    renderer = FrameRenderer(ansi=True) if ansi else TextRenderer()
+    report = None
+    if progress:
+        def report(index: int, elapsed: float) -> None:
+            print(f"[encounter {index} after {elapsed:.1f}s]", file=sys.stderr)
+    game = Game(player, iter_game(file_name, MONSTER_TYPES),
+                renderer=renderer, log=log, progress=report)
+    game.start()
+
+    while not game.is_over():
+        #the log is complete up to here even if input ends the program
+        if log is not None:
+            log.flush()
         command = input("Enter a move: ")
-        
-        if command.lower().startswith('inspect'):
-            command_cards = command.split()
-            second_word = command_cards[1]
-            if second_word == "deck":
-                print("\n", player.get_deck(), "\n", sep="")
-            elif second_word == "discard":
-                print("\n", player.get_discarded(), "\n", sep="")
-     
-        elif command.lower().startswith('describe'):
-            command_cards = command.split()
-            second_word = command_cards[1]
-            if second_word == "Strike":
-                print("\n", Strike().get_description(), "\n", sep="")
-            elif second_word == "Defend":
-                print("\n", Defend().get_description(), "\n", sep="")
-            elif second_word == "Bash":
-                print("\n", Bash().get_description(), "\n", sep="")
-            elif second_word == "Neutralize":
-                print("\n", Neutralize().get_description(), "\n", sep="")
-            elif second_word == "Survivor":
-                print("\n", Survivor().get_description(), "\n", sep="")
-
-        elif command.lower().startswith('play'):
-            command_cards = command.split()
-            empty = []
-            if encounter.get_monsters() != empty: 
-                if len(command_cards) == 3:
-                    card_name = command_cards[1]
-                    target_id = int(command_cards[2])
-                    if (encounter.player_apply_card(card_name, target_id) ==
-                        False):
-                        print(CARD_FAILURE_MESSAGE)
-                    else:
-                        display_encounter(encounter)
-                        if encounter.get_monsters() == []:
-                            encounter.end_player_turn()
-                            print(ENCOUNTER_WIN_MESSAGE)
-                        
-                elif len(command_cards) == 2:
-                    card_name = command_cards[1]
-                    if encounter.player_apply_card(card_name) == False:
-                        print(CARD_FAILURE_MESSAGE)
-                    else:
-                        display_encounter(encounter)
-                        print(encounter.get_monsters())
-                        if encounter.get_monsters() == []:
-                            encounter.end_player_turn()
-                            print(ENCOUNTER_WIN_MESSAGE)
-            else:
-                pass
-            
-            
-        elif command == "end turn":
-            empty = []
-            encounter.end_player_turn()
-            encounter.enemy_turn()
-            if player.is_defeated() == True:
-                print(GAME_LOSE_MESSAGE)
-                break
-            else:
-                display_encounter(encounter)
+        if ansi:
+            renderer.add_external_lines(1)
+        game.handle(command)
+
+    if log is not None:
+        log.close()
 
-            
-    
     # Implement this only once you've finished and tested ALL of the required
     # classes.
     
     pass
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Interactive card game")
+    parser.add_argument("--log", default=None,
+                        help="append an event log of the game to this file")
+    parser.add_argument("--profile", default=None,
+                        help="time the engine's hot paths and write the "
+                             "profile to this file (collapsed stacks for "
+                             ".folded or .txt, otherwise JSON)")
+    parser.add_argument("--ansi", action="store_true",
+                        help="redraw the board in place on the terminal")
+    parser.add_argument("--progress", action="store_true",
+                        help="report each encounter and the time elapsed "
+                             "on standard error")
+    args = parser.parse_args()
+    #modules importing main share this module instead of loading a copy
+    sys.modules.setdefault('main', sys.modules[__name__])
+    if args.profile is None:
+        main(args.log, args.ansi, args.progress)
+    else:
+        from profiler import Profiler
+        profiler = Profiler(sys.modules[__name__])
+        try:
+            with profiler:
+                main(args.log, args.ansi, args.progress)
+        finally:
+            profiler.save(args.profile)
\ No newline at end of file
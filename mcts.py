@@ -0,0 +1,370 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+import math
+import random
+import time
+
+from simulate import *
+from zobrist import *
+
+"""Monte Carlo Tree Search policy for automated play"""
+
+END_TURN = None
+
+
+class SearchStats(NamedTuple):
+    """
+    Measurements of one decision.
+
+    iterations = number of simulations (tree descents plus rollouts) run.
+    seconds = wall-clock time taken to decide.
+    simulations_per_second = iterations divided by seconds.
+    """
+    iterations: int
+    seconds: float
+    simulations_per_second: float
+
+
+class _Node(object):
+    """
+    Open-loop search tree node: one per sequence of moves from the root.
+    Nodes are reached by moves rather than states, so the random draws after
+    ending a turn are averaged over instead of branched on.
+    """
+    __slots__ = ('children', 'visits', 'value')
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.visits = 0
+        self.value = 0.0
+
+
+def _apply_move(encounter: Encounter, move: tuple[str, int | None] | None) -> None:
+    """
+    Plays a move the way play_game does.
+    """
+    if move is END_TURN or not encounter.player_apply_card(*move):
+        encounter.end_player_turn()
+        encounter.enemy_turn()
+
+
+def _evaluate(encounter: Encounter, start_monster_hp: int) -> float:
+    """
+    Scores a position between 0 (player defeated) and 1 (encounter won at
+    full hp): half for the player's remaining hp and half for the share of
+    monster hp removed since the root.
+    """
+    player = encounter.get_player()
+    if player.is_defeated():
+        return 0.0
+    left = sum(max(monster.get_hp(), 0)
+               for monster in encounter.get_monsters())
+    removed = 1.0 - min(left / start_monster_hp, 1.0)
+    return 0.5 * player.get_hp() / player.get_max_hp() + 0.5 * removed
+
+
+def _run_search(
+    encounter: Encounter,
+    root: _Node,
+    chooser: random.Random,
+    deadline: float,
+    max_iterations: int,
+    exploration: float,
+    rollout_turns: int,
+    table: TranspositionTable | None = None,
+    hasher: ZobristHasher | None = None
+) -> int:
+    """
+    Runs MCTS iterations from the encounter's current state into root until
+    the deadline or iteration limit, but always at least one, so the root
+    has a child to choose. The encounter is left in an arbitrary state;
+    callers restore it. Restoring keeps the encounter's monster objects, so
+    references the caller holds stay valid.
+
+    With a transposition table, a card play that reaches a state already in
+    the table shares that state's node, so orderings that end in the same
+    state (two Strikes on one monster in either order) share statistics.
+    Ending the turn is random, so it always gets its own node.
+
+    Return: The number of iterations run.
+    """
+    root_state = encounter.snapshot(include_rng=False)
+    player = encounter.get_player()
+    start_monster_hp = sum(max(monster.get_hp(), 0)
+                           for monster in encounter.get_monsters()) or 1
+    perf_counter = time.perf_counter
+    sqrt, log = math.sqrt, math.log
+    iterations = 0
+    while not iterations or (iterations < max_iterations and
+                             perf_counter() < deadline):
+        # Restoring without the rng state lets every iteration see new draws.
+        encounter.restore(root_state)
+        node = root
+        path = [root]
+        while encounter.is_active() and not player.is_defeated():
+            moves = playable_moves(encounter)
+            moves.append(END_TURN)
+            children = node.children
+            untried = [move for move in moves if move not in children]
+            if untried:
+                move = chooser.choice(untried)
+                _apply_move(encounter, move)
+                node = _Node()
+                if table is not None and move is not END_TURN:
+                    key = hasher.hash_encounter(encounter)
+                    shared = table.get(key)
+                    if shared is None:
+                        table.put(key, node)
+                    else:
+                        node = shared
+                children[move] = node
+                path.append(node)
+                break
+            scale = exploration * sqrt(log(node.visits))
+            best = None
+            best_score = -1.0
+            for move in moves:
+                child = children[move]
+                score = (child.value / child.visits +
+                         scale / sqrt(child.visits))
+                if score > best_score:
+                    best, best_score = move, score
+            node = children[best]
+            _apply_move(encounter, best)
+            path.append(node)
+
+        turns = 0
+        while (turns < rollout_turns and encounter.is_active() and
+               not player.is_defeated()):
+            moves = playable_moves(encounter)
+            if moves:
+                encounter.player_apply_card(*chooser.choice(moves))
+            else:
+                _apply_move(encounter, END_TURN)
+                turns += 1
+
+        value = _evaluate(encounter, start_monster_hp)
+        for visited in path:
+            visited.visits += 1
+            visited.value += value
+        iterations += 1
+    return iterations
+
+
+def _search_worker(
+    encounter: Encounter,
+    seed: int,
+    time_limit: float | None,
+    max_iterations: int,
+    exploration: float,
+    rollout_turns: int
+) -> tuple[dict, int]:
+    """
+    Process pool entry point for root-parallel search: searches a private
+    copy of the encounter with its own random streams.
+
+    Return: A tuple of (root child statistics as move -> (visits, value),
+    iterations run).
+    """
+    rng = GameRandom(seed)
+    encounter.set_rng(rng.fork(0))
+    deadline = (time.perf_counter() + time_limit
+                if time_limit is not None else math.inf)
+    root = _Node()
+    iterations = _run_search(encounter, root, rng.fork(1), deadline,
+                             max_iterations, exploration, rollout_turns)
+    stats = {move: (child.visits, child.value)
+             for move, child in root.children.items()}
+    return stats, iterations
+
+
+class MCTSPolicy(Policy):
+    """
+    Chooses moves with open-loop Monte Carlo Tree Search (UCT) over
+    Encounter.player_apply_card and Encounter.enemy_turn, using
+    snapshot()/restore() to rewind the encounter between simulations.
+
+    Each simulation plays real engine moves, so a single process runs
+    roughly 5-8 thousand simulations per second (under a thousand per
+    0.1 second decision). Profiled, a third of the time goes to enemy_turn
+    and its card draws, a quarter to playable_moves and an eighth to
+    player_apply_card; rewinding with restore() is about 6%, since it puts
+    the existing monsters back in place rather than rebuilding them. Use
+    workers to search on more cores.
+    """
+
+    def __init__(
+        self,
+        time_limit: float | None = 0.1,
+        iterations: int | None = None,
+        exploration: float = 0.7,
+        rollout_turns: int = 2,
+        workers: int = 1,
+        reuse_tree: bool = True,
+        table: TranspositionTable | None = None,
+        seed: int | None = None
+    ) -> None:
+        """
+        Parameters:
+            time_limit = seconds to search per decision (None for no limit).
+            iterations = simulations per decision (None for no limit); at
+            least one of time_limit and iterations must be set.
+            exploration = UCT exploration constant.
+            rollout_turns = number of turns each random rollout plays before
+            the position is scored.
+            workers = number of processes for root-parallel search; each
+            searches its own tree and the root statistics are merged.
+            reuse_tree = keep the subtree below the chosen move for the next
+            decision in the same encounter (single-process search only).
+            table = transposition table merging nodes that reach the same
+            state; may be shared with other policies (single-process search
+            only).
+            seed = seed for the search's own random choices.
+        """
+        if time_limit is None and iterations is None:
+            raise ValueError("MCTSPolicy needs a time_limit or iterations")
+        self._time_limit = time_limit
+        self._iterations = iterations
+        self._exploration = exploration
+        self._rollout_turns = rollout_turns
+        self._workers = workers
+        self._reuse_tree = reuse_tree
+        self._table = table
+        self._hasher = ZobristHasher() if table is not None else None
+        self._random = random.Random(seed)
+        self._pool = None
+        self._root = None
+        self._encounter = None
+        self._last_stats = None
+        self._decisions = 0
+        self._total_iterations = 0
+        self._total_seconds = 0.0
+
+    def choose_move(self, encounter: Encounter) -> tuple[str, int | None] | None:
+        start = time.perf_counter()
+        moves = playable_moves(encounter)
+        if not moves:
+            self._root = None
+            return END_TURN
+        if self._workers > 1:
+            stats, iterations = self._parallel_search(encounter)
+        else:
+            stats, iterations = self._serial_search(encounter, start)
+        legal = set(moves)
+        legal.add(END_TURN)
+        searched = [move for move in stats if move in legal]
+        if searched:
+            move = max(searched, key=lambda move: stats[move][0])
+        else:
+            move = moves[0]
+        if self._root is not None:
+            self._root = self._root.children.get(move)
+        seconds = time.perf_counter() - start
+        self._record(iterations, seconds)
+        return move
+
+    def _serial_search(
+        self,
+        encounter: Encounter,
+        start: float
+    ) -> tuple[dict, int]:
+        """
+        Searches in this process, reusing the subtree kept from the previous
+        decision when it belongs to the same encounter.
+        """
+        root = self._root
+        if root is None or encounter is not self._encounter:
+            root = _Node()
+        self._encounter = encounter
+        deadline = (start + self._time_limit
+                    if self._time_limit is not None else math.inf)
+        max_iterations = (self._iterations if self._iterations is not None
+                          else math.inf)
+        state = encounter.snapshot()
+        try:
+            iterations = _run_search(encounter, root, self._random, deadline,
+                                     max_iterations, self._exploration,
+                                     self._rollout_turns, self._table,
+                                     self._hasher)
+        finally:
+            encounter.restore(state)
+        self._root = root if self._reuse_tree else None
+        stats = {move: (child.visits, child.value)
+                 for move, child in root.children.items()}
+        return stats, iterations
+
+    def _parallel_search(self, encounter: Encounter) -> tuple[dict, int]:
+        """
+        Root-parallel search: every worker searches a copy of the encounter
+        with a different seed and the root child statistics are summed.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self._workers)
+        max_iterations = (self._iterations // self._workers + 1
+                          if self._iterations is not None else math.inf)
+        futures = [self._pool.submit(
+                       _search_worker, encounter,
+                       self._random.getrandbits(64), self._time_limit,
+                       max_iterations, self._exploration, self._rollout_turns)
+                   for _ in range(self._workers)]
+        merged = {}
+        iterations = 0
+        for future in futures:
+            stats, count = future.result()
+            iterations += count
+            for move, (visits, value) in stats.items():
+                total_visits, total_value = merged.get(move, (0, 0.0))
+                merged[move] = (total_visits + visits, total_value + value)
+        self._root = None
+        return merged, iterations
+
+    def _record(self, iterations: int, seconds: float) -> None:
+        """
+        Stores the measurements of a decision.
+        """
+        rate = iterations / seconds if seconds > 0 else 0.0
+        self._last_stats = SearchStats(iterations, seconds, rate)
+        self._decisions += 1
+        self._total_iterations += iterations
+        self._total_seconds += seconds
+
+    def get_last_stats(self) -> SearchStats | None:
+        """
+        Returns the measurements of the latest searched decision, or None if
+        no search has run yet.
+        """
+        return self._last_stats
+
+    def mean_latency(self) -> float:
+        """
+        Returns the mean seconds per searched decision.
+        """
+        return self._total_seconds / self._decisions if self._decisions else 0.0
+
+    def simulations_per_second(self) -> float:
+        """
+        Returns simulations per second over every searched decision.
+        """
+        if not self._total_seconds:
+            return 0.0
+        return self._total_iterations / self._total_seconds
+
+    def reset(self, seed: int) -> None:
+        self._random.seed(seed)
+        self._root = None
+        self._encounter = None
+
+    def close(self) -> None:
+        """
+        Shuts down the worker processes used for root-parallel search.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_root'] = None
+        state['_encounter'] = None
+        return state
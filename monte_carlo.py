@@ -0,0 +1,259 @@
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import glob
+import math
+import os
+import time
+
+from simulate import *
+
+"""Multi-process Monte Carlo estimation of win rates"""
+
+DEFAULT_CHUNK_SIZE = 250
+
+
+class OutcomeStats(object):
+    """
+    Running win/loss, turns-to-win and hp-remaining statistics for a set of
+    games. Stats from different workers are combined with merge().
+    """
+
+    def __init__(self) -> None:
+        """
+        Parameters:
+            games = number of games recorded.
+            wins = number of games won.
+            timeouts = number of games stopped by the turn limit.
+            win_turns = total turns taken in won games.
+            win_turns_sq = total squared turns taken in won games.
+            hp = total hp remaining at the end of won games.
+            hp_sq = total squared hp remaining at the end of won games.
+        """
+        self._games = 0
+        self._wins = 0
+        self._timeouts = 0
+        self._win_turns = 0
+        self._win_turns_sq = 0
+        self._hp = 0
+        self._hp_sq = 0
+
+    def add(self, result: GameResult) -> None:
+        """
+        Records the result of one game.
+
+        Parameter:
+            result = the game to record.
+        """
+        self._games += 1
+        self._timeouts += result.timed_out
+        if result.won:
+            self._wins += 1
+            self._win_turns += result.turns
+            self._win_turns_sq += result.turns * result.turns
+            self._hp += result.hp
+            self._hp_sq += result.hp * result.hp
+
+    def merge(self, other: 'OutcomeStats') -> None:
+        """
+        Adds every game recorded by other into these stats.
+
+        Parameter:
+            other = stats to merge in.
+        """
+        self._games += other._games
+        self._wins += other._wins
+        self._timeouts += other._timeouts
+        self._win_turns += other._win_turns
+        self._win_turns_sq += other._win_turns_sq
+        self._hp += other._hp
+        self._hp_sq += other._hp_sq
+
+    def get_games(self) -> int:
+        """
+        Returns the number of games recorded.
+        """
+        return self._games
+
+    def get_wins(self) -> int:
+        """
+        Returns the number of games won.
+        """
+        return self._wins
+
+    def get_timeouts(self) -> int:
+        """
+        Returns the number of games stopped by the turn limit.
+        """
+        return self._timeouts
+
+    def win_rate(self) -> float:
+        """
+        Returns the fraction of recorded games that were won.
+        """
+        return self._wins / self._games if self._games else 0.0
+
+    def win_rate_error(self) -> float:
+        """
+        Returns the standard error of win_rate().
+        """
+        if not self._games:
+            return 0.0
+        rate = self.win_rate()
+        return math.sqrt(rate * (1 - rate) / self._games)
+
+    def mean_turns_to_win(self) -> float:
+        """
+        Returns the mean number of turns taken in won games.
+        """
+        return self._win_turns / self._wins if self._wins else 0.0
+
+    def mean_hp_remaining(self) -> float:
+        """
+        Returns the mean player hp left at the end of won games.
+        """
+        return self._hp / self._wins if self._wins else 0.0
+
+    def hp_remaining_stddev(self) -> float:
+        """
+        Returns the standard deviation of hp left at the end of won games.
+        """
+        if not self._wins:
+            return 0.0
+        mean = self.mean_hp_remaining()
+        return math.sqrt(max(self._hp_sq / self._wins - mean * mean, 0.0))
+
+    def __str__(self) -> str:
+        return (f"{self._games} games, win rate {self.win_rate():.2%} "
+                f"(+/- {self.win_rate_error():.2%}), "
+                f"{self.mean_turns_to_win():.1f} turns to win, "
+                f"{self.mean_hp_remaining():.1f} hp remaining")
+
+
+def _run_chunk(
+    player_class: type[Player],
+    game_file: str,
+    policy: Policy,
+    file_seed: int,
+    start: int,
+    stop: int,
+    max_turns: int
+) -> OutcomeStats:
+    """
+    Worker entry point: plays games start to stop of a batch in this process.
+    Game i always uses stream i forked from file_seed, so results don't
+    depend on how games are split between workers.
+    """
+    encounters = open_game(game_file, MONSTER_TYPES)
+    file_rng = GameRandom(file_seed)
+    stats = OutcomeStats()
+    for index in range(start, stop):
+        rng = file_rng.fork(index)
+        policy.reset(rng.fork(POLICY_STREAM).get_seed())
+        stats.add(play_game(player_class, encounters, policy, max_turns, rng))
+    return stats
+
+
+def run_monte_carlo(
+    player_class: type[Player],
+    game_files: list[str],
+    policy: Policy,
+    games: int,
+    seed: int = DEFAULT_SEED,
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_turns: int = DEFAULT_MAX_TURNS
+) -> dict[str, OutcomeStats]:
+    """
+    Plays games simulated games of each game file across a process pool.
+
+    Parameters:
+        player_class = the player type to play as (IronClad or Silent).
+        game_files = names of the game files to estimate.
+        policy = chooses each move; each worker gets its own copy.
+        games = number of games to play per game file.
+        seed = master seed; the same seed always gives the same stats.
+        workers = number of worker processes (default: one per core).
+        chunk_size = number of games each task plays.
+        max_turns = number of player turns after which a game is lost.
+
+    Return: A dictionary mapping each game file to its merged OutcomeStats.
+    """
+    results = {game_file: OutcomeStats() for game_file in game_files}
+    master = GameRandom(seed)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for file_index, game_file in enumerate(game_files):
+            file_seed = master.fork(file_index).get_seed()
+            for start in range(0, games, chunk_size):
+                stop = min(start + chunk_size, games)
+                futures.append((game_file, pool.submit(
+                    _run_chunk, player_class, game_file, policy, file_seed,
+                    start, stop, max_turns)))
+        for game_file, future in futures:
+            results[game_file].merge(future.result())
+    return results
+
+
+def scaling_benchmark(
+    player_class: type[Player],
+    game_files: list[str],
+    policy: Policy,
+    games: int,
+    max_workers: int | None = None
+) -> dict[int, float]:
+    """
+    Measures games per second for 1, 2, 4, ... worker processes.
+
+    Parameters:
+        player_class = the player type to play as (IronClad or Silent).
+        game_files = names of the game files to play.
+        policy = chooses each move.
+        games = number of games to play per game file at each worker count.
+        max_workers = largest worker count to try (default: core count).
+
+    Return: A dictionary mapping worker count to games per second.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+    rates = {}
+    for workers in counts:
+        start = time.perf_counter()
+        run_monte_carlo(player_class, game_files, policy, games,
+                        workers=workers)
+        elapsed = time.perf_counter() - start
+        rates[workers] = games * len(game_files) / elapsed
+    return rates
+
+
+def main() -> None:
+    """
+    Command line entry point: prints win-rate estimates per game file.
+    """
+    parser = argparse.ArgumentParser(description="Monte Carlo win rates")
+    parser.add_argument("game_files", nargs="*",
+                        default=sorted(glob.glob("games/*.txt")))
+    parser.add_argument("--player", choices=PLAYER_TYPES, default="ironclad")
+    parser.add_argument("--policy", choices=["greedy", "random"],
+                        default="greedy")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    policy = GreedyPolicy() if args.policy == "greedy" else RandomPolicy()
+    start = time.perf_counter()
+    results = run_monte_carlo(PLAYER_TYPES[args.player], args.game_files,
+                              policy, args.games, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    for game_file, stats in results.items():
+        print(f"{game_file}: {stats}")
+    total = args.games * len(args.game_files)
+    print(f"{total} games in {elapsed:.2f}s ({total / elapsed:.0f} games/s)")
+
+
+if __name__ == '__main__':
+    main()
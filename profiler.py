@@ -0,0 +1,357 @@
+from importlib import import_module
+from types import ModuleType
+from typing import Callable, NamedTuple
+import argparse
+import functools
+import json
+import sys
+import time
+
+"""Optional call-level profiling of the engine's hot paths"""
+
+PERCENTILES = (50, 90, 99)
+# Latencies are counted in log-linear buckets: exact below 2 * SUB_BUCKETS
+# nanoseconds, then SUB_BUCKETS buckets per power of two, so a percentile is
+# within 1 / SUB_BUCKETS of the true latency however many calls are timed.
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# (class, attribute, breakdown key) of each instrumented function. A class of
+# None is a function of the engine module. The key function receives the
+# call's arguments and names the card or entity type the call is counted
+# under, or is None for no breakdown.
+HOOKS = (
+    ("Player", "new_turn", lambda player, *args, **kwargs:
+        type(player).__name__),
+    (None, "draw_cards", None),
+    ("Encounter", "player_apply_card", lambda encounter, card_name, *args,
+        **kwargs: card_name),
+    ("Encounter", "enemy_turn", None),
+    ("Entity", "reduce_hp", lambda entity, *args, **kwargs:
+        type(entity).__name__),
+)
+
+
+class CallStats(NamedTuple):
+    """
+    Timings of one instrumented function, or of one card or entity type of
+    it. Times are in seconds.
+
+    name = the function's name.
+    key = the card or entity type, or None for the function as a whole.
+    calls = number of calls.
+    total = time spent in the calls, including the functions they called.
+    own = time spent in the calls, less instrumented functions they called.
+    mean, p50, p90, p99, max = latency of a single call.
+    """
+    name: str
+    key: str | None
+    calls: int
+    total: float
+    own: float
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+    def label(self) -> str:
+        """
+        Returns the name, with the key in brackets if there is one.
+        """
+        return self.name if self.key is None else f"{self.name}[{self.key}]"
+
+
+def percentile(ordered: list[float], percent: int) -> float:
+    """
+    Returns the nearest-rank percentile of sorted samples.
+    """
+    rank = max(-(-len(ordered) * percent // 100), 1)
+    return ordered[rank - 1]
+
+
+def bucket_index(nanoseconds: int) -> int:
+    """
+    Returns the histogram bucket counting a latency.
+    """
+    if nanoseconds < 2 * SUB_BUCKETS:
+        return nanoseconds
+    exponent = nanoseconds.bit_length() - SUB_BUCKET_BITS - 1
+    return exponent * SUB_BUCKETS + (nanoseconds >> exponent)
+
+
+def bucket_limit(index: int) -> int:
+    """
+    Returns the largest latency, in nanoseconds, counted in a bucket.
+    """
+    if index < 2 * SUB_BUCKETS:
+        return index
+    exponent = index // SUB_BUCKETS - 1
+    return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << exponent) - 1
+
+
+def histogram_percentile(counts: dict[int, int], calls: int,
+                         percent: int) -> int:
+    """
+    Returns the nearest-rank percentile of a latency histogram, as the
+    upper limit of the bucket holding that rank.
+
+    Parameters:
+        counts = number of calls by bucket index.
+        calls = total number of calls in counts.
+        percent = the percentile to find.
+    """
+    rank = max(-(-calls * percent // 100), 1)
+    seen = 0
+    for index in sorted(counts):
+        seen += counts[index]
+        if seen >= rank:
+            return bucket_limit(index)
+    raise ValueError("percentile of an empty histogram")
+
+
+class Profiler(object):
+    """
+    Times calls to the engine functions in HOOKS. While enabled each one is
+    replaced on its class by a timing wrapper; disabling puts the original
+    back, so a profiler that is not enabled costs nothing at all, not even a
+    branch per call.
+
+    Every call's latency is counted in a fixed-size histogram (see
+    SUB_BUCKETS), for percentiles, under the function and under its
+    breakdown key (the card played or the type of entity hit), so memory
+    stays bounded however long the profiler runs.
+    Time is also accumulated per call stack of instrumented functions, so
+    the profile can be exported as collapsed stacks for flame graph tools.
+    """
+
+    def __init__(self, engine: ModuleType | None = None) -> None:
+        """
+        Parameters:
+            engine = the module defining the game classes (default: main).
+            records = [calls, total, own, max, counts] by (name, key):
+            total and own time and the longest call in nanoseconds, and the
+            latency histogram (number of calls by bucket_index).
+            stacks = own time in nanoseconds, by call stack of frame labels.
+            frames = labels of the instrumented calls in progress.
+            child_times = time spent in instrumented callees of each call
+            in progress.
+            originals = (owner, attribute, function) of each function
+            replaced while enabled.
+            elapsed = seconds spent enabled.
+        """
+        if engine is None:
+            engine = sys.modules.get("main") or import_module("main")
+        self._engine = engine
+        self._records = {}
+        self._stacks = {}
+        self._frames = []
+        self._child_times = []
+        self._originals = []
+        self._elapsed = 0.0
+        self._started = None
+
+    def _wrap(self, name: str, function: Callable,
+              key: Callable | None) -> Callable:
+        """
+        Returns a wrapper of function that records its calls under name.
+        """
+        records = self._records
+        stacks = self._stacks
+        frames = self._frames
+        child_times = self._child_times
+        clock = time.perf_counter_ns
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            entry = (name, None if key is None else key(*args, **kwargs))
+            frames.append(name if entry[1] is None
+                          else f"{name}[{entry[1]}]")
+            child_times.append(0)
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                own = elapsed - child_times.pop()
+                stack = ";".join(frames)
+                frames.pop()
+                if child_times:
+                    child_times[-1] += elapsed
+                stacks[stack] = stacks.get(stack, 0) + own
+                for counted in (((name, None), entry) if entry[1] is not None
+                                else (entry,)):
+                    record = records.get(counted)
+                    if record is None:
+                        record = records[counted] = [0, 0, 0, 0, {}]
+                    record[0] += 1
+                    record[1] += elapsed
+                    record[2] += own
+                    if elapsed > record[3]:
+                        record[3] = elapsed
+                    counts = record[4]
+                    index = bucket_index(elapsed)
+                    counts[index] = counts.get(index, 0) + 1
+        return wrapper
+
+    def enable(self) -> None:
+        """
+        Starts timing the engine functions in HOOKS.
+        """
+        if self._originals:
+            return
+        for class_name, attribute, key in HOOKS:
+            owner = (self._engine if class_name is None
+                     else getattr(self._engine, class_name))
+            function = getattr(owner, attribute)
+            self._originals.append((owner, attribute, function))
+            setattr(owner, attribute, self._wrap(attribute, function, key))
+        self._started = time.perf_counter()
+
+    def disable(self) -> None:
+        """
+        Stops timing, restoring the original functions.
+        """
+        for owner, attribute, function in reversed(self._originals):
+            setattr(owner, attribute, function)
+        self._originals.clear()
+        if self._started is not None:
+            self._elapsed += time.perf_counter() - self._started
+            self._started = None
+
+    def is_enabled(self) -> bool:
+        """
+        Returns True while the engine functions are being timed.
+        """
+        return bool(self._originals)
+
+    def reset(self) -> None:
+        """
+        Discards everything recorded so far.
+        """
+        self._records.clear()
+        self._stacks.clear()
+        self._elapsed = 0.0
+        if self._started is not None:
+            self._started = time.perf_counter()
+
+    def get_elapsed(self) -> float:
+        """
+        Returns the number of seconds the profiler has been enabled.
+        """
+        if self._started is None:
+            return self._elapsed
+        return self._elapsed + time.perf_counter() - self._started
+
+    def get_stats(self) -> list[CallStats]:
+        """
+        Returns the timings of each function, followed by its breakdown by
+        card or entity type, with the most total time first.
+        """
+        stats = []
+        for (name, key), record in self._records.items():
+            calls, total, own, longest, counts = record
+            stats.append(CallStats(
+                name, key, calls, total / 1e9, own / 1e9,
+                total / calls / 1e9,
+                *(min(histogram_percentile(counts, calls, percent),
+                      longest) / 1e9
+                  for percent in PERCENTILES),
+                longest / 1e9))
+        totals = {stat.name: stat.total for stat in stats if stat.key is None}
+        stats.sort(key=lambda stat: (-totals[stat.name], stat.name,
+                                     stat.key is not None, -stat.total))
+        return stats
+
+    def report(self) -> str:
+        """
+        Returns the timings as a table, with latencies in microseconds.
+        """
+        lines = [f"{'function':34} {'calls':>9} {'total s':>9} "
+                 f"{'own s':>9} {'mean':>8} {'p50':>8} {'p90':>8} "
+                 f"{'p99':>8} {'max':>9}"]
+        for stat in self.get_stats():
+            label = stat.label() if stat.key is None else f"  {stat.key}"
+            lines.append(
+                f"{label[:34]:34} {stat.calls:9} {stat.total:9.3f} "
+                f"{stat.own:9.3f} {stat.mean * 1e6:8.2f} "
+                f"{stat.p50 * 1e6:8.2f} {stat.p90 * 1e6:8.2f} "
+                f"{stat.p99 * 1e6:8.2f} {stat.max * 1e6:9.1f}")
+        lines.append(f"profiled for {self.get_elapsed():.3f}s")
+        return "\n".join(lines)
+
+    def to_json(self) -> dict:
+        """
+        Returns the timings as a JSON-serialisable dictionary, with times in
+        seconds.
+        """
+        return {"elapsed": self.get_elapsed(),
+                "percentiles": list(PERCENTILES),
+                "functions": [stat._asdict() for stat in self.get_stats()],
+                "stacks": dict(self._stacks)}
+
+    def write_json(self, filename: str) -> None:
+        """
+        Writes to_json() to a file.
+        """
+        with open(filename, 'w') as file:
+            json.dump(self.to_json(), file, indent=1)
+
+    def write_collapsed(self, filename: str) -> None:
+        """
+        Writes the own time of each call stack, in microseconds, in the
+        collapsed stack format read by flamegraph.pl, speedscope and
+        similar tools.
+        """
+        with open(filename, 'w') as file:
+            for stack, own in sorted(self._stacks.items()):
+                file.write(f"{stack} {own // 1000}\n")
+
+    def save(self, filename: str) -> None:
+        """
+        Writes the profile as collapsed stacks if filename ends in
+        .folded or .txt, otherwise as JSON.
+        """
+        if filename.endswith((".folded", ".txt")):
+            self.write_collapsed(filename)
+        else:
+            self.write_json(filename)
+
+    def __enter__(self) -> 'Profiler':
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.disable()
+
+
+def main() -> None:
+    """
+    Command line entry point: plays headless games under the profiler and
+    prints where the time went.
+    """
+    from simulate import GreedyPolicy, PLAYER_TYPES, RandomPolicy, run_games
+    parser = argparse.ArgumentParser(description="Profile headless games")
+    parser.add_argument("game_files", nargs="*",
+                        default=["games/game1.txt"])
+    parser.add_argument("--player", choices=PLAYER_TYPES, default="ironclad")
+    parser.add_argument("--policy", choices=["greedy", "random"],
+                        default="greedy")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--output", default=None,
+                        help="write the profile to this file: collapsed "
+                             "stacks for .folded or .txt, otherwise JSON")
+    args = parser.parse_args()
+
+    policy = GreedyPolicy() if args.policy == "greedy" else RandomPolicy()
+    with Profiler() as profiler:
+        for game_file in args.game_files:
+            run_games(PLAYER_TYPES[args.player], game_file, policy,
+                      args.games)
+    print(profiler.report())
+    if args.output is not None:
+        profiler.save(args.output)
+
+
+if __name__ == '__main__':
+    main()
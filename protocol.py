@@ -0,0 +1,599 @@
+from typing import Callable, Iterable, Iterator, NamedTuple, TextIO
+import json
+import sys
+
+from main import *
+
+"""Typed game commands, a dispatcher into Encounter, and renderers"""
+
+
+class PlayCommand(NamedTuple):
+    """
+    play <card> [target]: plays a card from the hand.
+    """
+    card_name: str
+    target_id: int | None
+
+
+class EndTurnCommand(NamedTuple):
+    """
+    end turn: ends the player's turn and runs the enemy turn.
+    """
+
+
+class InspectCommand(NamedTuple):
+    """
+    inspect deck|discard: shows a pile of the player's cards.
+    """
+    pile: str
+
+
+class DescribeCommand(NamedTuple):
+    """
+    describe <card>: shows a card's description.
+    """
+    card_name: str
+
+
+class InvalidCommand(NamedTuple):
+    """
+    A play command that can't be carried out as typed.
+    """
+    text: str
+    reason: str
+
+
+Command = (PlayCommand | EndTurnCommand | InspectCommand | DescribeCommand
+           | InvalidCommand)
+
+PILES = ("deck", "discard")
+
+
+def parse_command(text: str) -> Command | None:
+    """
+    Parses a move as typed at the prompt.
+
+    Parameter:
+        text = the move.
+
+    Return: The command, or None for text the game ignores.
+    """
+    words = text.split()
+    lowered = text.lower()
+    if lowered.startswith('inspect'):
+        if len(words) > 1 and words[1] in PILES:
+            return InspectCommand(words[1])
+    elif lowered.startswith('describe'):
+        if len(words) > 1:
+            return DescribeCommand(words[1])
+    elif lowered.startswith('play'):
+        if len(words) == 2:
+            return PlayCommand(words[1], None)
+        if len(words) == 3:
+            try:
+                return PlayCommand(words[1], int(words[2]))
+            except ValueError:
+                return InvalidCommand(text, f"{words[2]!r} is not a monster "
+                                            "id")
+    elif text == "end turn":
+        return EndTurnCommand()
+    return None
+
+
+class Renderer(object):
+    """
+    Shows what happens in a game. Every method does nothing here, so a
+    plain Renderer is the no-op renderer for simulations and bots;
+    TextRenderer and JsonRenderer override them.
+    """
+
+    def encounter_started(self, encounter: Encounter) -> None:
+        """
+        Called when an encounter starts.
+        """
+
+    def card_played(self, encounter: Encounter,
+                    command: PlayCommand) -> None:
+        """
+        Called after a card is played.
+        """
+
+    def card_failed(self, command: PlayCommand | InvalidCommand) -> None:
+        """
+        Called when a card can't be played.
+        """
+
+    def encounter_won(self, encounter: Encounter) -> None:
+        """
+        Called when the last monster of an encounter is defeated.
+        """
+
+    def turn_ended(self, encounter: Encounter) -> None:
+        """
+        Called after the enemy turn, if the player survived it.
+        """
+
+    def pile_shown(self, pile: str, cards: list[Card]) -> None:
+        """
+        Called for an inspect command.
+        """
+
+    def card_described(self, card_name: str, description: str) -> None:
+        """
+        Called for a describe command of a known card.
+        """
+
+    def game_over(self, won: bool) -> None:
+        """
+        Called when the game is won or lost.
+        """
+
+
+class TextRenderer(Renderer):
+    """
+    Prints the game as the terminal game always has.
+    """
+
+    def __init__(self, file: TextIO | None = None) -> None:
+        """
+        Parameters:
+            file = where to print (default: sys.stdout at the time of each
+            print).
+        """
+        self._file = file
+
+    def encounter_started(self, encounter: Encounter) -> None:
+        print(NEW_ENCOUNTER_MESSAGE, file=self._file)
+        print(format_encounter(encounter), file=self._file)
+
+    def card_played(self, encounter: Encounter,
+                    command: PlayCommand) -> None:
+        print(format_encounter(encounter), file=self._file)
+        if command.target_id is None:
+            print(encounter.get_monsters(), file=self._file)
+
+    def card_failed(self, command: PlayCommand | InvalidCommand) -> None:
+        print(CARD_FAILURE_MESSAGE, file=self._file)
+
+    def encounter_won(self, encounter: Encounter) -> None:
+        print(ENCOUNTER_WIN_MESSAGE, file=self._file)
+
+    def turn_ended(self, encounter: Encounter) -> None:
+        print(format_encounter(encounter), file=self._file)
+
+    def pile_shown(self, pile: str, cards: list[Card]) -> None:
+        print("\n", cards, "\n", sep="", file=self._file)
+
+    def card_described(self, card_name: str, description: str) -> None:
+        print("\n", description, "\n", sep="", file=self._file)
+
+    def game_over(self, won: bool) -> None:
+        print(GAME_WIN_MESSAGE if won else GAME_LOSE_MESSAGE,
+              file=self._file)
+
+
+def encounter_state(encounter: Encounter) -> dict:
+    """
+    Returns the visible state of an encounter as JSON-serialisable data.
+    """
+    player = encounter.get_player()
+    intents = encounter.get_intents()
+    return {
+        "player": {"name": player.get_name(), "hp": player.get_hp(),
+                   "max_hp": player.get_max_hp(),
+                   "energy": player.get_energy(),
+                   "block": player.get_block(),
+                   "strength": player.get_strength(),
+                   "weak": player.get_weak(),
+                   "vulnerable": player.get_vulnerable(),
+                   "hand": [card.get_name() for card in player.get_hand()]},
+        "monsters": [{"id": monster.get_id(), "name": monster.get_name(),
+                      "hp": monster.get_hp(),
+                      "max_hp": monster.get_max_hp(),
+                      "block": monster.get_block(),
+                      "strength": monster.get_strength(),
+                      "weak": monster.get_weak(),
+                      "vulnerable": monster.get_vulnerable(),
+                      "intent": intents.get(monster.get_id())}
+                     for monster in encounter.get_monsters()]}
+
+
+class JsonRenderer(Renderer):
+    """
+    Writes each event as one line of JSON, with an "event" field naming it.
+    """
+
+    def __init__(self, file: TextIO | None = None) -> None:
+        """
+        Parameters:
+            file = where to write (default: sys.stdout at the time of each
+            write).
+        """
+        self._file = file
+
+    def _write(self, event: str, **fields) -> None:
+        """
+        Writes one event.
+        """
+        file = self._file if self._file is not None else sys.stdout
+        file.write(json.dumps({"event": event, **fields},
+                              separators=(',', ':')) + "\n")
+
+    def encounter_started(self, encounter: Encounter) -> None:
+        self._write("encounter_started", state=encounter_state(encounter))
+
+    def card_played(self, encounter: Encounter,
+                    command: PlayCommand) -> None:
+        self._write("card_played", card=command.card_name,
+                    target=command.target_id,
+                    state=encounter_state(encounter))
+
+    def card_failed(self, command: PlayCommand | InvalidCommand) -> None:
+        if isinstance(command, InvalidCommand):
+            self._write("card_failed", command=command.text,
+                        reason=command.reason)
+        else:
+            self._write("card_failed", card=command.card_name,
+                        target=command.target_id)
+
+    def encounter_won(self, encounter: Encounter) -> None:
+        self._write("encounter_won")
+
+    def turn_ended(self, encounter: Encounter) -> None:
+        self._write("turn_ended", state=encounter_state(encounter))
+
+    def pile_shown(self, pile: str, cards: list[Card]) -> None:
+        self._write("pile_shown", pile=pile,
+                    cards=[card.get_name() for card in cards])
+
+    def card_described(self, card_name: str, description: str) -> None:
+        self._write("card_described", card=card_name,
+                    description=description)
+
+    def game_over(self, won: bool) -> None:
+        self._write("game_over", won=won)
+
+
+class FrameRenderer(Renderer):
+    """
+    Shows the board incrementally: each frame is compared with the one
+    before it and only the lines that changed are written, in a single
+    write per frame.
+
+    This saves bandwidth, not CPU. The patch stream is about a third
+    smaller than display_encounter's output (benchmarks.py frames), which
+    pays off on a terminal or a socket. Building and diffing the lines
+    costs about as much as printing them, though: against a fast sink it
+    renders 0.7-1.0x as many frames per second.
+
+    By default the output is a patch stream that read_frames() turns back
+    into whole frames:
+
+        F <lines>                a whole frame follows
+        D <lines> <changed>      <changed> "<index> <text>" lines follow,
+                                 and the frame now has <lines> lines
+        M <lines>                a message of <lines> lines follows
+
+    With ansi set, the frame is instead redrawn in place on a terminal:
+    the cursor moves back to the top of the previous frame, rewrites the
+    changed lines, skips the others and clears whatever was printed below
+    it. Messages appear under the frame until the next one. Anything else
+    printed below the frame must be reported with add_external_lines(),
+    and a frame taller than the terminal can't be redrawn in place.
+    """
+
+    def __init__(self, file: TextIO | None = None, ansi: bool = False) -> None:
+        """
+        Parameters:
+            file = where to write (default: sys.stdout at the time of each
+            write).
+            ansi = redraw in place with ANSI escape codes.
+            frame = lines of the last frame written, or None before the
+            first.
+            below = number of lines shown under the last frame.
+        """
+        self._file = file
+        self._ansi = ansi
+        self._frame = None
+        self._below = 0
+
+    def _write(self, text: str) -> None:
+        """
+        Writes text to the file in one call.
+        """
+        (self._file if self._file is not None else sys.stdout).write(text)
+
+    def _render(self, encounter: Encounter) -> None:
+        """
+        Writes the encounter's board as a frame.
+        """
+        lines = encounter_lines(encounter)
+        previous = self._frame
+        self._frame = lines
+        if previous is None:
+            if self._ansi:
+                self._write("\n".join(lines) + "\n")
+            else:
+                self._write(f"F {len(lines)}\n" + "\n".join(lines) + "\n")
+            self._below = 0
+            return
+        changed = [index for index, (line, old) in
+                   enumerate(zip(lines, previous)) if line != old]
+        changed.extend(range(len(previous), len(lines)))
+        if not self._ansi:
+            self._write(f"D {len(lines)} {len(changed)}\n" + "".join(
+                [f"{index} {lines[index]}\n" for index in changed]))
+            return
+        parts = [f"\x1b[{len(previous) + self._below}F"]
+        row = 0
+        for index in changed:
+            if index > row:
+                parts.append(f"\x1b[{index - row}E")
+            parts.append(f"\x1b[2K{lines[index]}\n")
+            row = index + 1
+        if len(lines) > row:
+            parts.append(f"\x1b[{len(lines) - row}E")
+        parts.append("\x1b[J")
+        self._write("".join(parts))
+        self._below = 0
+
+    def _message(self, text: str) -> None:
+        """
+        Writes a message, as TextRenderer would print it.
+        """
+        count = text.count("\n") + 1
+        self._below += count
+        if self._ansi:
+            self._write(text + "\n")
+        else:
+            self._write(f"M {count}\n{text}\n")
+
+    def add_external_lines(self, count: int) -> None:
+        """
+        Tells an ANSI renderer that count lines were printed under the
+        frame by something else, such as an input prompt.
+        """
+        self._below += count
+
+    def encounter_started(self, encounter: Encounter) -> None:
+        self._render(encounter)
+        self._message(NEW_ENCOUNTER_MESSAGE)
+
+    def card_played(self, encounter: Encounter,
+                    command: PlayCommand) -> None:
+        self._render(encounter)
+
+    def card_failed(self, command: PlayCommand | InvalidCommand) -> None:
+        self._message(CARD_FAILURE_MESSAGE)
+
+    def encounter_won(self, encounter: Encounter) -> None:
+        self._message(ENCOUNTER_WIN_MESSAGE)
+
+    def turn_ended(self, encounter: Encounter) -> None:
+        self._render(encounter)
+
+    def pile_shown(self, pile: str, cards: list[Card]) -> None:
+        self._message(f"\n{cards}\n")
+
+    def card_described(self, card_name: str, description: str) -> None:
+        self._message(f"\n{description}\n")
+
+    def game_over(self, won: bool) -> None:
+        self._message(GAME_WIN_MESSAGE if won else GAME_LOSE_MESSAGE)
+
+
+def read_frames(lines: Iterable[str]) -> Iterator[list[str]]:
+    """
+    Yields every frame of a FrameRenderer patch stream as its whole list of
+    lines. Messages are skipped.
+
+    Parameter:
+        lines = the stream's lines, with or without their newlines.
+    """
+    lines = iter(lines)
+    frame = []
+    for header in lines:
+        kind, *counts = header.split()
+        if kind == "M":
+            for _ in range(int(counts[0])):
+                next(lines)
+            continue
+        if kind == "F":
+            frame = [next(lines).rstrip("\n") for _ in range(int(counts[0]))]
+        else:
+            del frame[int(counts[0]):]
+            frame.extend([""] * (int(counts[0]) - len(frame)))
+            for _ in range(int(counts[1])):
+                index, _, text = next(lines).rstrip("\n").partition(" ")
+                frame[int(index)] = text
+        yield list(frame)
+
+
+RENDERERS = {"text": TextRenderer, "json": JsonRenderer,
+             "frames": FrameRenderer, "none": Renderer}
+
+
+class Game(object):
+    """
+    A game driven by commands: a player working through a campaign, with
+    each command dispatched into the current Encounter and every outcome
+    passed to a renderer. The terminal game, the server and scripted
+    drivers all play through this class.
+
+    A game numbers its monsters from 0 with its own counter, so games
+    played side by side in one process never affect one another's ids.
+    """
+
+    def __init__(
+        self,
+        player: Player,
+        encounters: Iterable[list[tuple[str, int]]],
+        rng: random.Random | None = None,
+        renderer: Renderer | None = None,
+        log: EventLog | None = None,
+        progress: Callable[[int, float], None] | None = None
+    ) -> None:
+        """
+        Parameters:
+            player = the player playing the game.
+            encounters = the monsters of each encounter, in order, such as
+            iter_game returns them.
+            rng = random generator for the game (default: the global random
+            module).
+            renderer = shows the game (default: nothing is shown).
+            log = event log to record the game's encounters and turns in;
+            the caller records the start of the game.
+            progress = called with the encounter index (from 1) and the
+            seconds elapsed whenever an encounter starts (see Campaign).
+            campaign = the encounters still to come.
+            next_monster_id = id the game's next monster will get.
+            encounter = the encounter being played, or None before start().
+            over = True once the game is won or lost.
+            won = True if the game was won.
+        """
+        self._player = player
+        self._campaign = Campaign(player, encounters, rng, progress)
+        self._renderer = renderer if renderer is not None else Renderer()
+        self._log = log
+        self._next_monster_id = 0
+        self._encounter = None
+        self._over = False
+        self._won = False
+
+    def _end(self, won: bool) -> None:
+        """
+        Ends the game.
+        """
+        self._over = True
+        self._won = won
+        if self._log is not None:
+            self._log.end_game(won)
+        self._renderer.game_over(won)
+
+    def _next_encounter(self) -> None:
+        """
+        Starts the next encounter, or wins the game if there are none left.
+        """
+        shared_count = Monster.monster_count
+        Monster.monster_count = self._next_monster_id
+        try:
+            encounter = self._campaign.next_encounter()
+        finally:
+            self._next_monster_id = Monster.monster_count
+            Monster.monster_count = shared_count
+        if encounter is None:
+            if self._encounter is not None:
+                self._encounter.end_player_turn()
+            self._end(True)
+            return
+        self._encounter = encounter
+        if self._log is not None:
+            self._log.start_encounter(encounter,
+                                      self._campaign.get_index() - 1)
+        self._renderer.encounter_started(encounter)
+
+    def start(self) -> None:
+        """
+        Starts the first encounter.
+        """
+        self._next_encounter()
+
+    def _play(self, command: PlayCommand) -> bool:
+        encounter = self._encounter
+        if not encounter.get_monsters():
+            return True
+        if not encounter.player_apply_card(command.card_name,
+                                           command.target_id):
+            self._renderer.card_failed(command)
+            return False
+        self._renderer.card_played(encounter, command)
+        if not encounter.get_monsters():
+            encounter.end_player_turn()
+            self._renderer.encounter_won(encounter)
+        return True
+
+    def _end_turn(self, command: EndTurnCommand) -> bool:
+        encounter = self._encounter
+        encounter.end_player_turn()
+        encounter.enemy_turn()
+        if self._log is not None:
+            self._log.end_turn()
+        if self._player.is_defeated():
+            self._end(False)
+        else:
+            self._renderer.turn_ended(encounter)
+        return True
+
+    def _inspect(self, command: InspectCommand) -> bool:
+        cards = (self._player.get_deck() if command.pile == "deck"
+                 else self._player.get_discarded())
+        self._renderer.pile_shown(command.pile, cards)
+        return True
+
+    def _describe(self, command: DescribeCommand) -> bool:
+        card_id = CARD_IDS.get(command.card_name)
+        if card_id is not None:
+            self._renderer.card_described(command.card_name,
+                                          CARD_DESCRIPTION[card_id])
+        return True
+
+    def _invalid(self, command: InvalidCommand) -> bool:
+        self._renderer.card_failed(command)
+        return False
+
+    _HANDLERS = {PlayCommand: _play, EndTurnCommand: _end_turn,
+                 InspectCommand: _inspect, DescribeCommand: _describe,
+                 InvalidCommand: _invalid}
+
+    def dispatch(self, command: Command | None) -> bool:
+        """
+        Carries out a command, then starts the next encounter if it cleared
+        the current one. None, and any command once the game is over, is
+        ignored.
+
+        Return: False if a card could not be played, otherwise True.
+        """
+        if command is None or self._over:
+            return True
+        done = self._HANDLERS[type(command)](self, command)
+        if not self._over and not self._encounter.get_monsters():
+            self._next_encounter()
+        return done
+
+    def handle(self, text: str) -> bool:
+        """
+        Parses and carries out a move as typed at the prompt.
+
+        Return: False if a card could not be played, otherwise True.
+        """
+        return self.dispatch(parse_command(text))
+
+    def get_encounter(self) -> Encounter | None:
+        """
+        Returns the encounter being played, or None before start().
+        """
+        return self._encounter
+
+    def get_player(self) -> Player:
+        """
+        Returns the player.
+        """
+        return self._player
+
+    def get_renderer(self) -> Renderer:
+        """
+        Returns the renderer the game is shown with.
+        """
+        return self._renderer
+
+    def is_over(self) -> bool:
+        """
+        Returns True once the game is won or lost.
+        """
+        return self._over
+
+    def is_won(self) -> bool:
+        """
+        Returns True if the game was won.
+        """
+        return self._won
@@ -0,0 +1,399 @@
+from typing import NamedTuple
+import argparse
+import bisect
+import json
+import time
+
+from simulate import *
+
+"""Deterministic replay of event logs, with keyframe seeking"""
+
+
+class LogEvent(NamedTuple):
+    """
+    One event of a logged game.
+
+    index = number of the event in its game, from 0.
+    command = 'play' or 'end turn'.
+    card_name = name of the card played, or None for 'end turn'.
+    target_id = id of the monster targeted, or None.
+    damage = damage the card dealt, or the enemy turn dealt to the player.
+    hp = player hp after an 'end turn', or None for 'play'.
+    changes = statuses applied, as written in the log.
+    """
+    index: int
+    command: str
+    card_name: str | None
+    target_id: int | None
+    damage: int
+    hp: int | None
+    changes: str
+
+
+class ReplayError(GameFileError):
+    """
+    Raised when a log can't be replayed, or replaying it doesn't reproduce
+    what it recorded. The message names the log file and line.
+    """
+
+
+class _Keyframe(NamedTuple):
+    """
+    A point a replay can start from: the event it comes after, where its
+    line starts, the encounter and the turns ended so far. encounter is None
+    for the start of a seeded game, which is rebuilt from the seed.
+    """
+    event: int
+    offset: int
+    line_number: int
+    encounter: int | None
+    turns: int
+
+
+def _monster_classes(base: type = Monster) -> dict[str, type]:
+    """
+    Returns every subclass of base, including registered plugin monsters,
+    by class name.
+    """
+    classes = {}
+    for subclass in base.__subclasses__():
+        classes[subclass.__name__] = subclass
+        classes.update(_monster_classes(subclass))
+    return classes
+
+
+def decode_state(text: str) -> tuple:
+    """
+    Returns the Encounter.snapshot() that encode_state wrote as text.
+    """
+    player_state, monster_states, intents, rng_state = json.loads(text)
+    classes = _monster_classes()
+    return (tuple(player_state),
+            tuple((classes[name], tuple(state))
+                  for name, state in monster_states),
+            tuple((monster_id, tuple(map(tuple, intent)))
+                  for monster_id, intent in intents),
+            (rng_state[0], tuple(rng_state[1]), rng_state[2])
+            if rng_state is not None else None)
+
+
+class Replay(object):
+    """
+    Re-executes one game of an event log against Encounter, checking every
+    event's logged result (damage, player hp and statuses applied) and the
+    full state at every keyframe; between keyframes, a state that differs
+    without changing any logged result is only caught at the next one.
+    seek() jumps to any event by restoring the nearest keyframe before it
+    and replaying from there.
+    """
+
+    def __init__(
+        self,
+        log_file: str,
+        game: int = 0,
+        game_file: str | None = None,
+        verify: bool = True
+    ) -> None:
+        """
+        Parameters:
+            log_file = the event log to read.
+            game = index of the game in the log, from 0.
+            game_file = the game file to play (default: the one named in
+            the log); its contents must match the log's digest.
+            verify = check results and keyframes while replaying.
+            keyframes = the points the game can be restored from, in order.
+            events = number of events in the game.
+            position = number of events replayed so far.
+        """
+        self._log_file = log_file
+        self._verify = verify
+        self._file = open(log_file, 'rb')
+        self._index(game)
+        self._game_file = game_file or self._header[5]
+        if file_digest(self._game_file) != self._header[4]:
+            raise ReplayError(log_file, self._header_line,
+                              f'{self._game_file} is not the game file this '
+                              'log was recorded with')
+        self._encounters = open_game(self._game_file, MONSTER_TYPES)
+        self._records = []
+        self._templates = ({}, {})
+        self._player = None
+        self._rng = None
+        self._encounter = None
+        self._position = 0
+        self._turns = 0
+        self._line_number = 0
+        self._done = False
+        self._load(self._keyframes[0])
+
+    def _index(self, game: int) -> None:
+        """
+        Finds the game's header and keyframes and counts its events.
+        """
+        file = self._file
+        offset = 0
+        line_number = 0
+        games = -1
+        self._header = None
+        self._keyframes = []
+        events = turns = 0
+        encounter = None
+        for line in file:
+            line_number += 1
+            kind = line[:1]
+            if kind == b'G':
+                games += 1
+                if games > game:
+                    break
+                if games == game:
+                    self._header = line.decode().rstrip('\n').split('\t')
+                    self._header_line = line_number
+                    if self._header[1] != str(LOG_VERSION):
+                        raise ReplayError(self._log_file, line_number,
+                                          f'unsupported log version '
+                                          f'{self._header[1]}')
+                    if self._header[2] != NO_VALUE:
+                        self._keyframes.append(_Keyframe(
+                            0, offset + len(line), line_number + 1, None, 0))
+            elif games == game:
+                if kind == b'P':
+                    events += 1
+                elif kind == b'T':
+                    events += 1
+                    turns += 1
+                elif kind == b'E':
+                    encounter = int(line.split(b'\t')[1])
+                elif kind == b'K':
+                    self._keyframes.append(_Keyframe(
+                        events, offset, line_number, encounter, turns))
+            offset += len(line)
+        if self._header is None:
+            raise ReplayError(self._log_file, line_number,
+                              f'the log has no game {game}')
+        if not self._keyframes:
+            raise ReplayError(self._log_file, line_number,
+                              f'game {game} has no seed or keyframe to '
+                              'start from')
+        player_types = {player_class.__name__: player_class
+                        for player_class in PLAYER_TYPES.values()}
+        self._player_class = player_types.get(self._header[3])
+        if self._player_class is None:
+            raise ReplayError(self._log_file, self._header_line,
+                              f'unknown player type {self._header[3]!r}')
+        self._events = events
+
+    def _load(self, keyframe: _Keyframe) -> None:
+        """
+        Puts the replay in the state of a keyframe.
+        """
+        self._file.seek(keyframe.offset)
+        self._line_number = keyframe.line_number - 1
+        self._position = keyframe.event
+        self._turns = keyframe.turns
+        self._done = False
+        self._records.clear()
+        self._player = self._player_class()
+        if keyframe.encounter is None:
+            self._rng = GameRandom(int(self._header[2]))
+            self._encounter = None
+            return
+        line = self._readline()
+        self._rng = GameRandom()
+        self._start_encounter(keyframe.encounter, None)
+        self._encounter.restore(decode_state(line[2:]))
+
+    def _start_encounter(self, index: int, first_id: int | None) -> None:
+        """
+        Builds encounter index of the game file, numbering its monsters from
+        first_id (default: wherever the count is). The shared monster count
+        is put back afterwards, so replaying doesn't change the ids of
+        monsters built elsewhere in the process.
+        """
+        shared_count = Monster.monster_count
+        if first_id is not None:
+            Monster.monster_count = first_id
+        try:
+            self._encounter = Encounter(self._player,
+                                        self._encounters[index], self._rng)
+        finally:
+            Monster.monster_count = shared_count
+        self._encounter.set_log(self._records)
+
+    def _readline(self) -> str:
+        """
+        Returns the next line of the log without its newline.
+        """
+        self._line_number += 1
+        return self._file.readline().decode().rstrip('\n')
+
+    def _fail(self, message: str) -> None:
+        """
+        Raises a ReplayError for the line just read.
+        """
+        raise ReplayError(self._log_file, self._line_number, message)
+
+    def step(self) -> LogEvent | None:
+        """
+        Replays the next event.
+
+        Return: The event, or None at the end of the game.
+        """
+        while not self._done:
+            start = self._file.tell()
+            line = self._readline()
+            fields = line.split('\t')
+            kind = fields[0]
+            if kind == 'P':
+                target_id = None if fields[2] == NO_VALUE else int(fields[2])
+                if not self._encounter.player_apply_card(fields[1], target_id):
+                    self._fail(f'{fields[1]} could not be played')
+                event = LogEvent(self._position, 'play', fields[1], target_id,
+                                 int(fields[3]), None, fields[4])
+            elif kind == 'T':
+                self._encounter.end_player_turn()
+                self._encounter.enemy_turn()
+                self._turns += 1
+                event = LogEvent(self._position, 'end turn', None, None,
+                                 int(fields[1]), int(fields[2]), fields[3])
+            elif kind == 'E':
+                if self._encounter is not None:
+                    self._encounter.end_player_turn()
+                    self._encounter.set_log(None)
+                self._start_encounter(int(fields[1]), int(fields[2]))
+                continue
+            elif kind == 'K':
+                if (self._verify and encode_state(self._encounter.snapshot())
+                        != line[2:]):
+                    self._fail('state differs from the keyframe')
+                continue
+            else:
+                if kind == 'R' and self._verify:
+                    hp = self._player.get_hp()
+                    if fields[2:] != [str(self._turns), str(hp)]:
+                        self._fail(f'game ended after {self._turns} turns '
+                                   f'with {hp} hp, not as logged')
+                self._file.seek(start)
+                self._line_number -= 1
+                self._done = True
+                break
+            if self._verify:
+                replayed = format_records(self._records, self._templates)
+                if replayed != line + '\n':
+                    self._fail(f'replayed {replayed.rstrip()!r}')
+            self._records.clear()
+            self._position += 1
+            return event
+        return None
+
+    def run(self) -> int:
+        """
+        Replays the rest of the game.
+
+        Return: The number of events replayed.
+        """
+        start = self._position
+        while self.step() is not None:
+            pass
+        return self._position - start
+
+    def seek(self, index: int) -> Encounter | None:
+        """
+        Puts the game in its state after the first index events, replaying
+        from the current position or from the nearest keyframe before.
+
+        Parameter:
+            index = number of events to have replayed, from 0 to len(self).
+
+        Return: The encounter being played, or None before the first.
+        """
+        if not 0 <= index <= self._events:
+            raise IndexError('event index out of range')
+        keyframes = self._keyframes
+        keyframe = keyframes[max(bisect.bisect_right(
+            keyframes, index, key=lambda keyframe: keyframe.event) - 1, 0)]
+        if not keyframe.event <= self._position <= index:
+            self._load(keyframe)
+        while self._position < index:
+            self.step()
+        return self._encounter
+
+    def get_encounter(self) -> Encounter | None:
+        """
+        Returns the encounter being played, or None before the first.
+        """
+        return self._encounter
+
+    def get_player(self) -> Player:
+        """
+        Returns the player being replayed.
+        """
+        return self._player
+
+    def get_position(self) -> int:
+        """
+        Returns the number of events replayed so far.
+        """
+        return self._position
+
+    def get_keyframe_count(self) -> int:
+        """
+        Returns the number of points seek() can restore from.
+        """
+        return len(self._keyframes)
+
+    def __len__(self) -> int:
+        return self._events
+
+    def close(self) -> None:
+        """
+        Closes the log and the game file.
+        """
+        self._file.close()
+        if isinstance(self._encounters, CompiledGame):
+            self._encounters.close()
+
+    def __enter__(self) -> 'Replay':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main() -> None:
+    """
+    Command line entry point: replays and verifies a logged game, or shows
+    the encounter after a given event.
+    """
+    parser = argparse.ArgumentParser(description="Replay an event log")
+    parser.add_argument("log_file")
+    parser.add_argument("--game", type=int, default=0,
+                        help="index of the game in the log")
+    parser.add_argument("--game-file", default=None,
+                        help="game file to use instead of the logged name")
+    parser.add_argument("--seek", type=int, default=None,
+                        help="show the encounter after this many events")
+    parser.add_argument("--no-verify", action="store_true")
+    args = parser.parse_args()
+
+    load_monster_entry_points()
+    with Replay(args.log_file, args.game, args.game_file,
+                not args.no_verify) as replay:
+        start = time.perf_counter()
+        if args.seek is not None:
+            encounter = replay.seek(args.seek)
+            elapsed = time.perf_counter() - start
+            print(f"event {replay.get_position()} of {len(replay)} "
+                  f"({elapsed * 1e3:.2f} ms)")
+            if encounter is not None:
+                display_encounter(encounter)
+            return
+        events = replay.run()
+        elapsed = time.perf_counter() - start
+        rate = events / elapsed if elapsed > 0 else 0.0
+        verified = "verified" if not args.no_verify else "not verified"
+        print(f"game {args.game}: {events} events replayed in "
+              f"{elapsed:.3f}s ({rate:.0f} events/s), {verified}")
+
+
+if __name__ == '__main__':
+    main()
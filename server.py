@@ -0,0 +1,373 @@
+from collections import deque
+from typing import NamedTuple
+import argparse
+import asyncio
+import glob
+import io
+import os
+import time
+
+from profiler import percentile
+from protocol import *
+from simulate import *
+
+"""Asyncio server hosting many concurrent game sessions"""
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BACKLOG = 4096
+DEFAULT_REPORT_INTERVAL = 10.0
+LATENCY_WINDOW = 100000
+
+
+class GameSession(object):
+    """
+    One game hosted by the server: a protocol.Game whose renderer writes
+    into a buffer, so what main() would print for each command is returned
+    as text. Each session has its own random generator, and its monsters
+    are numbered from 0 like an interactive game.
+    """
+
+    def __init__(
+        self,
+        player_class: type[Player],
+        encounters: list[list[tuple[str, int]]],
+        rng: GameRandom,
+        renderer_class: type[Renderer] = TextRenderer
+    ) -> None:
+        """
+        Parameters:
+            player_class = the player type to play as (IronClad or Silent).
+            encounters = the monsters in each encounter, as read_game_file
+            returns them.
+            rng = random generator owned by this session.
+            renderer_class = renders the responses (TextRenderer or
+            JsonRenderer).
+            buffer = output of the command being handled.
+            game = the game being played.
+            failed = True if the last card played could not be played.
+        """
+        self._buffer = io.StringIO()
+        self._game = Game(player_class(), encounters, rng,
+                          renderer_class(self._buffer))
+        self._failed = False
+
+    def _output(self) -> str:
+        """
+        Returns and clears the buffered output.
+        """
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text
+
+    def start(self) -> str:
+        """
+        Starts the first encounter.
+
+        Return: What main() prints before the first move.
+        """
+        self._game.start()
+        return self._output()
+
+    def handle(self, command: str) -> str:
+        """
+        Carries out one command.
+
+        Parameter:
+            command = the move, as typed at main()'s prompt.
+
+        Return: What main() prints in response.
+        """
+        self._failed = not self._game.handle(command)
+        return self._output()
+
+    def failed(self) -> bool:
+        """
+        Returns True if the last command was a card that could not be
+        played.
+        """
+        return self._failed
+
+    def get_encounter(self) -> Encounter | None:
+        """
+        Returns the encounter being played, or None before start().
+        """
+        return self._game.get_encounter()
+
+    def get_player(self) -> Player:
+        """
+        Returns the session's player.
+        """
+        return self._game.get_player()
+
+    def is_over(self) -> bool:
+        """
+        Returns True once the game is won or lost.
+        """
+        return self._game.is_over()
+
+    def is_won(self) -> bool:
+        """
+        Returns True if the game was won.
+        """
+        return self._game.is_won()
+
+
+class ServerStats(NamedTuple):
+    """
+    Load served so far. Latencies are in seconds, over the most recent
+    commands.
+
+    sessions = number of sessions started.
+    active = number of sessions connected now.
+    finished = number of sessions played to a win or a loss.
+    commands = number of commands handled.
+    p50, p99 = latency of handling one command.
+    sessions_per_second = finished sessions per second of uptime.
+    """
+    sessions: int
+    active: int
+    finished: int
+    commands: int
+    p50: float
+    p99: float
+    sessions_per_second: float
+
+    def __str__(self) -> str:
+        return (f"{self.sessions} sessions ({self.active} active, "
+                f"{self.finished} finished)  {self.commands} commands  "
+                f"p50 {self.p50 * 1e6:.0f} us  p99 {self.p99 * 1e6:.0f} us  "
+                f"{self.sessions_per_second:.1f} sessions/s")
+
+
+def frame(text: str) -> bytes:
+    """
+    Returns a response as sent on the wire: its length in bytes on a line
+    of its own, then the text.
+    """
+    payload = text.encode()
+    return b"%d\n%s" % (len(payload), payload)
+
+
+class GameServer(object):
+    """
+    Hosts game sessions over TCP or a Unix socket, one per connection. The
+    protocol is line based:
+
+        client: start <player> <game_file> [seed]
+        server: the opening display
+        client: a command, as typed at main()'s prompt
+        server: what main() prints in response
+        ...
+
+    Every response is framed by frame(). The server closes the connection
+    once the game is won or lost, or after an error response to a bad start
+    line. Sessions without a seed get one forked from the server's master
+    seed, so a server run is reproducible from its seed.
+    """
+
+    def __init__(
+        self,
+        game_files: list[str],
+        seed: int = DEFAULT_SEED,
+        latency_window: int = LATENCY_WINDOW,
+        renderer_class: type[Renderer] = TextRenderer
+    ) -> None:
+        """
+        Parameters:
+            game_files = the game files sessions may play, named by path or
+            by file name.
+            seed = master seed of sessions started without one.
+            latency_window = number of recent commands latencies are
+            measured over.
+            renderer_class = renders every session's responses.
+            games = the encounters of each game file, by name.
+            master = random generator forked for each unseeded session.
+            latencies = seconds taken by the most recent commands.
+            sessions = number of sessions started.
+            active = number of sessions connected now.
+            finished = number of sessions played to the end.
+            commands = number of commands handled.
+            started = time the server was created.
+        """
+        self._games = {}
+        for game_file in game_files:
+            encounters = read_game_file(game_file, MONSTER_TYPES)
+            self._games[game_file] = encounters
+            self._games.setdefault(os.path.basename(game_file), encounters)
+        self._master = GameRandom(seed)
+        self._renderer_class = renderer_class
+        self._latencies = deque(maxlen=latency_window)
+        self._sessions = 0
+        self._active = 0
+        self._finished = 0
+        self._commands = 0
+        self._started = time.perf_counter()
+
+    def open_session(self, line: str) -> GameSession:
+        """
+        Returns a new session for a start line.
+
+        Parameter:
+            line = start <player> <game_file> [seed]
+        """
+        words = line.split()
+        if len(words) not in (3, 4) or words[0] != "start":
+            raise ValueError("expected: start <player> <game_file> [seed]")
+        player_class = PLAYER_TYPES.get(words[1])
+        if player_class is None:
+            raise ValueError(f"unknown player type {words[1]!r}")
+        encounters = self._games.get(words[2])
+        if encounters is None:
+            raise ValueError(f"unknown game file {words[2]!r}")
+        if len(words) == 4:
+            try:
+                rng = GameRandom(int(words[3]))
+            except ValueError:
+                raise ValueError(f"invalid seed {words[3]!r}") from None
+        else:
+            rng = self._master.fork(self._sessions)
+        self._sessions += 1
+        return GameSession(player_class, encounters, rng,
+                           self._renderer_class)
+
+    @staticmethod
+    async def _read_line(reader: asyncio.StreamReader) -> bytes | None:
+        """
+        Returns the next line from a client, or None if the line is longer
+        than the stream limit (StreamReader.readline raises ValueError for
+        it), in which case the client is dropped.
+        """
+        try:
+            return await reader.readline()
+        except ValueError:
+            return None
+
+    async def serve_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Plays one session with a connected client.
+        """
+        try:
+            line = await self._read_line(reader)
+            if line is None:
+                return
+            try:
+                session = self.open_session(line.decode())
+            except (ValueError, UnicodeDecodeError) as error:
+                writer.write(frame(f"error: {error}\n"))
+                await writer.drain()
+                return
+            self._active += 1
+            try:
+                writer.write(frame(session.start()))
+                await writer.drain()
+                while not session.is_over():
+                    line = await self._read_line(reader)
+                    if not line:
+                        break
+                    start = time.perf_counter()
+                    output = session.handle(
+                        line.decode(errors="replace").rstrip("\r\n"))
+                    self._latencies.append(time.perf_counter() - start)
+                    self._commands += 1
+                    writer.write(frame(output))
+                    await writer.drain()
+                if session.is_over():
+                    self._finished += 1
+            finally:
+                self._active -= 1
+        except (ConnectionError, asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        path: str | None = None,
+        backlog: int = DEFAULT_BACKLOG
+    ) -> asyncio.AbstractServer:
+        """
+        Starts accepting connections.
+
+        Parameters:
+            host, port = address to listen on over TCP.
+            path = Unix socket to listen on instead.
+            backlog = number of connections waiting to be accepted.
+
+        Return: The listening asyncio server.
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(
+                self.serve_connection, path, backlog=backlog)
+        return await asyncio.start_server(
+            self.serve_connection, host, port, backlog=backlog)
+
+    def get_stats(self) -> ServerStats:
+        """
+        Returns the load served so far.
+        """
+        ordered = sorted(self._latencies)
+        elapsed = time.perf_counter() - self._started
+        return ServerStats(
+            self._sessions, self._active, self._finished, self._commands,
+            percentile(ordered, 50) if ordered else 0.0,
+            percentile(ordered, 99) if ordered else 0.0,
+            self._finished / elapsed if elapsed > 0 else 0.0)
+
+
+async def _serve(server: GameServer, args: argparse.Namespace) -> None:
+    """
+    Runs the server until cancelled, reporting its stats periodically.
+    """
+    listener = await server.start(args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"serving {len(args.game_files)} game files on {where}")
+    async with listener:
+        while True:
+            await asyncio.sleep(args.report_interval)
+            print(server.get_stats(), flush=True)
+
+
+def main() -> None:
+    """
+    Command line entry point: hosts game sessions until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Game session server")
+    parser.add_argument("game_files", nargs="*",
+                        default=sorted(glob.glob("games/*.txt")))
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None,
+                        help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--format", choices=["text", "json", "frames"],
+                        default="text", help="how responses are rendered")
+    parser.add_argument("--report-interval", type=float,
+                        default=DEFAULT_REPORT_INTERVAL,
+                        help="seconds between stats reports")
+    args = parser.parse_args()
+
+    load_monster_entry_points()
+    server = GameServer(args.game_files, args.seed,
+                        renderer_class=RENDERERS[args.format])
+    try:
+        asyncio.run(_serve(server, args))
+    except KeyboardInterrupt:
+        pass
+    print(server.get_stats())
+
+
+if __name__ == '__main__':
+    main()
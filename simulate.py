@@ -0,0 +1,276 @@
+from typing import NamedTuple
+import random
+import time
+
+from compiled_game import *
+from event_log import *
+from main import *
+
+"""Headless game engine for running whole games without a terminal"""
+
+DEFAULT_MAX_TURNS = 200
+PLAYER_TYPES = {"ironclad": IronClad, "silent": Silent}
+# Stream forked from a game's GameRandom to seed its policy, so that the
+# policy's choices don't share a sequence with the game's shuffles and draws.
+POLICY_STREAM = 1
+
+
+class GameResult(NamedTuple):
+    """
+    Outcome of one headless game.
+
+    won = True if every encounter in the game file was won.
+    turns = number of player turns taken across all encounters.
+    hp = player hp remaining when the game ended.
+    encounters_won = number of encounters the player won.
+    timed_out = True if the game was stopped by the turn limit.
+    """
+    won: bool
+    turns: int
+    hp: int
+    encounters_won: int
+    timed_out: bool
+
+
+class Policy(object):
+    """
+    Chooses the moves a player makes in a headless game.
+    """
+
+    def choose_move(self, encounter: Encounter) -> tuple[str, int | None] | None:
+        """
+        Returns the next move to make in the given encounter.
+
+        Parameters:
+            encounter = the encounter currently being played.
+
+        Return: A (card_name, target_id) tuple to play a card, where target_id
+        is None for cards that don't require a target, or None to end the turn.
+        """
+        raise NotImplementedError
+
+    def reset(self, seed: int) -> None:
+        """
+        Called before each game of a seeded batch so that policies with their
+        own randomness replay identically for the same game seed.
+
+        Parameters:
+            seed = seed for the policy in the game about to be played: stream
+            POLICY_STREAM forked from the game's seed, never the game's seed
+            itself.
+        """
+        pass
+
+
+class RandomPolicy(Policy):
+    """
+    Plays a uniformly random playable move, ending the turn when none is left.
+    """
+
+    def __init__(self, seed: int | None = None) -> None:
+        """
+        Parameters:
+            seed = seed for the policy's own random generator, kept separate
+            from the game's random state so the policy can't change the
+            cards that are drawn.
+        """
+        self._random = random.Random(seed)
+
+    def choose_move(self, encounter: Encounter) -> tuple[str, int | None] | None:
+        moves = playable_moves(encounter)
+        if moves == []:
+            return None
+        return self._random.choice(moves)
+
+    def reset(self, seed: int) -> None:
+        self._random.seed(seed)
+
+
+class GreedyPolicy(Policy):
+    """
+    Plays the most valuable affordable card in a fixed priority order against
+    the first monster, ending the turn when nothing else can be played.
+    """
+    priority = ("Neutralize", "Bash", "Strike", "Survivor", "Defend")
+
+    def choose_move(self, encounter: Encounter) -> tuple[str, int | None] | None:
+        player = encounter.get_player()
+        monsters = encounter.get_monsters()
+        for name in self.priority:
+            card = player.find_card(name)
+            if card is None or card.get_energy_cost() > player.get_energy():
+                continue
+            if card.requires_target():
+                return (name, monsters[0].get_id())
+            return (name, None)
+        return None
+
+
+def playable_moves(encounter: Encounter) -> list[tuple[str, int | None]]:
+    """
+    Returns every move the player can currently afford, one per distinct card
+    name in hand and target.
+
+    Parameters:
+        encounter = the encounter currently being played.
+
+    Return: A list of (card_name, target_id) tuples.
+    """
+    player = encounter.get_player()
+    moves = []
+    seen = set()
+    for card in player.get_hand():
+        name = card.get_name()
+        if name in seen or card.get_energy_cost() > player.get_energy():
+            continue
+        seen.add(name)
+        if card.requires_target():
+            for monster in encounter.get_monsters():
+                moves.append((name, monster.get_id()))
+        else:
+            moves.append((name, None))
+    return moves
+
+
+def play_game(
+    player_class: type[Player],
+    encounters: list[list[tuple[str, int]]],
+    policy: Policy,
+    max_turns: int = DEFAULT_MAX_TURNS,
+    rng: random.Random | None = None,
+    log: EventLog | None = None
+) -> GameResult:
+    """
+    Plays a whole game to completion without printing anything.
+
+    Encounters, turns and card plays run as in main(), except that a failed
+    card application ends the turn instead of being reprompted, so a policy
+    can never stall a game.
+
+    Parameters:
+        player_class = the player type to play as (IronClad or Silent).
+        encounters = the monsters in each encounter, as read_game_file
+        returns them.
+        policy = chooses each move.
+        max_turns = number of player turns after which the game is lost.
+        rng = random generator owned by this game (default: the global
+        random module).
+        log = event log to record the game's encounters and moves in; the
+        caller records the start of the game.
+
+    Return: The GameResult of the game.
+    """
+    player = player_class()
+    turns = 0
+    encounters_won = 0
+    for index, monsters in enumerate(encounters):
+        encounter = Encounter(player, monsters, rng)
+        if log is not None:
+            log.start_encounter(encounter, index)
+        while encounter.is_active():
+            move = policy.choose_move(encounter)
+            if move is not None and encounter.player_apply_card(*move):
+                continue
+            encounter.end_player_turn()
+            encounter.enemy_turn()
+            if log is not None:
+                log.end_turn()
+            turns += 1
+            if player.is_defeated() or turns >= max_turns:
+                if log is not None:
+                    log.end_game(False)
+                return GameResult(False, turns, player.get_hp(),
+                                  encounters_won, not player.is_defeated())
+        encounter.end_player_turn()
+        encounters_won += 1
+    if log is not None:
+        log.end_game(True)
+    return GameResult(True, turns, player.get_hp(), encounters_won, False)
+
+
+def run_game(
+    player_class: type[Player],
+    game_file: str,
+    policy: Policy,
+    max_turns: int = DEFAULT_MAX_TURNS,
+    rng: random.Random | None = None,
+    log: EventLog | None = None
+) -> GameResult:
+    """
+    Reads a game file and plays it to completion without printing anything.
+
+    Parameters:
+        player_class = the player type to play as (IronClad or Silent).
+        game_file = the name of the game file to play, as text or compiled.
+        policy = chooses each move.
+        max_turns = number of player turns after which the game is lost.
+        rng = random generator owned by this game (default: the global
+        random module).
+        log = event log to record the game in.
+
+    Return: The GameResult of the game.
+    """
+    if log is not None:
+        log.start_game(player_class, game_file,
+                       rng.get_seed() if isinstance(rng, GameRandom) else None)
+    return play_game(player_class, open_game(game_file, MONSTER_TYPES),
+                     policy, max_turns, rng, log)
+
+
+def run_games(
+    player_class: type[Player],
+    game_file: str,
+    policy: Policy,
+    count: int,
+    max_turns: int = DEFAULT_MAX_TURNS,
+    seed: int = DEFAULT_SEED,
+    log: EventLog | None = None
+) -> list[GameResult]:
+    """
+    Plays the same game file count times, opening the file only once. Game i
+    is played with stream i forked from the master seed.
+
+    Parameters:
+        player_class = the player type to play as (IronClad or Silent).
+        game_file = the name of the game file to play, as text or compiled.
+        policy = chooses each move.
+        count = number of games to play.
+        max_turns = number of player turns after which a game is lost.
+        seed = master seed of the batch.
+        log = event log to record every game in, one after another.
+
+    Return: A list of the GameResult of each game, in the order played.
+    """
+    encounters = open_game(game_file, MONSTER_TYPES)
+    master = GameRandom(seed)
+    results = []
+    for index in range(count):
+        rng = master.fork(index)
+        policy.reset(rng.fork(POLICY_STREAM).get_seed())
+        if log is not None:
+            log.start_game(player_class, game_file, rng.get_seed())
+        results.append(play_game(player_class, encounters, policy,
+                                 max_turns, rng, log))
+    return results
+
+
+def games_per_second(
+    player_class: type[Player],
+    game_file: str,
+    policy: Policy,
+    count: int = 1000
+) -> float:
+    """
+    Measures headless throughput by playing count games back to back.
+
+    Parameters:
+        player_class = the player type to play as (IronClad or Silent).
+        game_file = the name of the game file to play.
+        policy = chooses each move.
+        count = number of games to time.
+
+    Return: The number of games completed per second.
+    """
+    start = time.perf_counter()
+    run_games(player_class, game_file, policy, count)
+    return count / (time.perf_counter() - start)
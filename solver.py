@@ -0,0 +1,563 @@
+from collections import Counter
+from itertools import product
+from math import comb
+from typing import Callable, NamedTuple
+import time
+
+from simulate import *
+from zobrist import TranspositionTable
+
+"""Exact expected-outcome solver for small games"""
+
+DEFAULT_MAX_STATES = 2000000
+DEFAULT_PROGRESS_INTERVAL = 10000
+HAND_SIZE = 5
+END_TURN = None
+
+# Tolerance when comparing win probabilities of different moves, and when
+# deciding that value iteration over a cycle has converged.
+_EPSILON = 1e-12
+_MAX_SWEEPS = 100000
+# Position of the monster id within a monster snapshot.
+_ID_SLOT = len(Entity._state_slots())
+
+_game_ids = {}
+
+
+def _rules() -> tuple:
+    """
+    Returns the current card values and monster damage parameters (see
+    sweep.py), which a solved game depends on along with its encounters.
+    """
+    return (tuple(CARD_DAMAGE), tuple(CARD_BLOCK), tuple(CARD_COST),
+            tuple(tuple(sorted(status.items())) for status in CARD_STATUS),
+            tuple(tuple(sorted(status.items()))
+                  for status in CARD_SELF_STATUS),
+            Louse._min_damage, Louse._max_damage,
+            Cultist._base_damage, Cultist._damage_ramp)
+
+
+class Outcome(NamedTuple):
+    """
+    Expected result of optimal play from a state.
+
+    win_probability = chance of winning every remaining encounter.
+    expected_hp_loss = expected hp lost from the start of the game, counting
+    a defeat as losing all of it.
+    """
+    win_probability: float
+    expected_hp_loss: float
+
+
+class SolverStats(NamedTuple):
+    """
+    Instrumentation passed to the progress hook.
+
+    states = number of states solved so far.
+    memo_hits = number of times a solved state was looked up again.
+    memo_size = number of states currently held in the memo.
+    elapsed = seconds spent solving.
+    """
+    states: int
+    memo_hits: int
+    memo_size: int
+    elapsed: float
+
+
+def draw_outcomes(
+    deck: tuple[int, ...],
+    discarded: tuple[int, ...]
+) -> list[tuple[float, tuple[int, ...], tuple[int, ...], tuple[int, ...]]]:
+    """
+    Returns every distinct result of draw_cards from the given piles, with
+    its probability. Cards with the same id are interchangeable, so results
+    are multisets and the probabilities are multivariate hypergeometric.
+
+    Parameters:
+        deck = card ids in the deck.
+        discarded = card ids in the discard pile.
+
+    Return: A list of (probability, deck, hand, discarded) tuples, each pile
+    given as a sorted tuple of card ids.
+    """
+    hand = ()
+    if len(deck) < HAND_SIZE:
+        hand, deck, discarded = tuple(deck), tuple(discarded), ()
+    need = HAND_SIZE - len(hand)
+    counts = sorted(Counter(deck).items())
+    total = comb(len(deck), need)
+    outcomes = []
+    for taken in product(*(range(min(count, need) + 1)
+                           for _, count in counts)):
+        if sum(taken) != need:
+            continue
+        ways = 1
+        drawn = []
+        left = []
+        for (card_id, count), take in zip(counts, taken):
+            ways *= comb(count, take)
+            drawn.extend([card_id] * take)
+            left.extend([card_id] * (count - take))
+        outcomes.append((ways / total, tuple(left),
+                         tuple(sorted(hand + tuple(drawn))),
+                         tuple(sorted(discarded))))
+    return outcomes
+
+
+def _better(first: Outcome, second: Outcome | None) -> bool:
+    """
+    Returns True if first is preferable to second: a higher win probability,
+    then a lower expected hp loss.
+    """
+    if second is None:
+        return True
+    if first[0] > second[0] + _EPSILON:
+        return True
+    return abs(first[0] - second[0]) <= _EPSILON and first[1] < second[1]
+
+
+def _option_value(option: list[tuple[float, tuple]]) -> Outcome | None:
+    """
+    Returns the outcome of an option, or None if it leads to states that
+    aren't solved yet.
+    """
+    win = loss = 0.0
+    for chance, child in option:
+        if not isinstance(child, Outcome):
+            return None
+        win += chance * child[0]
+        loss += chance * child[1]
+    return Outcome(win, loss)
+
+
+def _best(
+    options: list[list[tuple[float, tuple]]],
+    values: dict[tuple, Outcome] | None
+) -> Outcome:
+    """
+    Returns the outcome of the best option, reading states that aren't
+    solved yet from values.
+    """
+    best = None
+    for option in options:
+        win = loss = 0.0
+        for chance, child in option:
+            if not isinstance(child, Outcome):
+                child = values[child]
+            win += chance * child[0]
+            loss += chance * child[1]
+        value = Outcome(win, loss)
+        if _better(value, best):
+            best = value
+    return best
+
+
+class ExactSolver(object):
+    """
+    Computes the win probability and expected hp loss of optimal play by
+    dynamic programming over game states, using the engine itself for every
+    card play and enemy turn.
+
+    A state is the encounter index, the player's snapshot (with deck, hand
+    and discard as sorted multisets) and each monster's snapshot. Decision
+    states take the best move; ending the turn and starting an encounter
+    are chance nodes that average over every possible draw and every Louse
+    damage roll.
+
+    There is no turn limit, so a player who blocks every attack can return
+    to a state already seen. States are therefore solved one strongly
+    connected component at a time (Tarjan's algorithm): acyclic states
+    directly, cycles by value iteration, with a game that never ends
+    counting as lost.
+
+    Hp never increases, so no move can do better than winning without
+    losing more hp; a move whose bound is no better than a move already
+    solved is not searched. With this, one Louse at 25 hp solves in well
+    under a second for either player, and games/game1.txt in about half a
+    minute for IronClad, but games of several large encounters can still
+    take far longer.
+
+    Encounter starts only keep what carries over between encounters, and
+    their outcomes are kept outside the bounded memo, so every later
+    encounter is solved once per distinct starting player. Other states
+    evicted from the memo are solved again when they are reached again.
+
+    Card values and monster damage parameters (see sweep.py) are read when
+    the solver is built, and solvers built under different values never
+    share memo entries.
+    """
+
+    def __init__(
+        self,
+        player_class: type[Player],
+        encounters: list[list[tuple[str, int]]],
+        max_states: int = DEFAULT_MAX_STATES,
+        table: TranspositionTable | None = None,
+        progress: Callable[[SolverStats], None] | None = None,
+        progress_interval: int = DEFAULT_PROGRESS_INTERVAL
+    ) -> None:
+        """
+        Parameters:
+            player_class = the player type to play as (IronClad or Silent).
+            encounters = the monsters in each encounter, as read_game_file
+            returns them.
+            max_states = bound on the number of solved states kept in the
+            memo; the least recently used are evicted and solved again if
+            needed.
+            table = memo to use instead of a new one, so that solvers of the
+            same game can share results.
+            progress = called with SolverStats every progress_interval
+            solved states.
+            progress_interval = number of solved states between progress
+            calls.
+            index, lowlink, stack, edges = Tarjan's bookkeeping for states
+            whose component isn't solved yet.
+        """
+        self._encounters = [list(monsters) for monsters in encounters]
+        game = (tuple(tuple(monsters) for monsters in self._encounters),
+                _rules())
+        self._game_id = _game_ids.setdefault(game, len(_game_ids))
+        self._louse_amounts = range(Louse._min_damage, Louse._max_damage + 1)
+        self._table = table if table is not None else TranspositionTable(
+            max_states)
+        self._progress = progress
+        self._progress_interval = progress_interval
+        self._start_player = player_class()
+        self._start_hp = self._start_player.get_hp()
+        self._player = player_class()
+        self._encounter = None
+        self._draws = {}
+        self._starts = {}
+        self._index = {}
+        self._lowlink = {}
+        self._stack = []
+        self._edges = {}
+        self._visits = 0
+        self._states = 0
+        self._started = 0.0
+
+    def get_table(self) -> TranspositionTable:
+        """
+        Returns the memo of solved states.
+        """
+        return self._table
+
+    def get_stats(self) -> SolverStats:
+        """
+        Returns the current instrumentation counters.
+        """
+        return SolverStats(self._states, self._table.get_hits(),
+                           len(self._table),
+                           time.perf_counter() - self._started)
+
+    def solve(self) -> Outcome:
+        """
+        Returns the outcome of optimal play from the start of the game.
+        Results are kept, so repeated calls are cheap.
+        """
+        player = self._canonical_player(self._start_player.snapshot())
+        key = (self._game_id, 0, self._carried_over(player), None)
+        value = self._lookup(key)
+        if value is not None:
+            return value
+        self._started = time.perf_counter()
+        return self._visit(key)
+
+    def _canonical_player(self, state: tuple) -> tuple:
+        """
+        Returns a player snapshot with its piles sorted, so that states that
+        differ only in card order are the same.
+        """
+        deck, hand, discarded = state[-3:]
+        return state[:-3] + (tuple(sorted(deck)), tuple(sorted(hand)),
+                             tuple(sorted(discarded)))
+
+    def _carried_over(self, state: tuple) -> tuple:
+        """
+        Returns the part of a player snapshot that carries into the next
+        encounter. Starting an encounter clears block, refills energy and
+        shuffles the hand and discard pile back into the deck, so states
+        that differ only in those start the next encounter the same way.
+        """
+        (max_hp, hp, _, strength, weak, vulnerable, _,
+         deck, hand, discarded) = state
+        return (max_hp, hp, 0, strength, weak, vulnerable, 0,
+                tuple(sorted(deck + hand + discarded)), (), ())
+
+    def _lookup(self, key: tuple) -> Outcome | None:
+        """
+        Returns the solved outcome of a state, or None if it isn't solved or
+        was evicted from the memo. Encounter starts are also kept outside
+        the memo, so a later encounter is never solved twice.
+        """
+        value = self._table.get(key)
+        if value is None and key[3] is None:
+            value = self._starts.get(key)
+        return value
+
+    def _draw_outcomes(self, deck: tuple, discarded: tuple) -> list:
+        """
+        Returns draw_outcomes(deck, discarded), cached by pile contents.
+        """
+        key = (deck, discarded)
+        outcomes = self._draws.get(key)
+        if outcomes is None:
+            outcomes = self._draws[key] = draw_outcomes(deck, discarded)
+        return outcomes
+
+    def _load(self, player_state: tuple, monsters: tuple) -> Encounter:
+        """
+        Puts the working encounter into a state.
+        """
+        self._encounter.restore((player_state, monsters, (), None))
+        return self._encounter
+
+    def _terminal(self, player_state: tuple, won: bool) -> Outcome:
+        """
+        Returns the outcome of a finished game.
+        """
+        if not won:
+            return Outcome(0.0, self._start_hp)
+        return Outcome(1.0, self._start_hp - player_state[1])
+
+    def _expand(self, key: tuple) -> list[list[tuple[float, tuple]]]:
+        """
+        Returns the options of a state: a list with one entry per move, each
+        a list of (probability, next state key or final Outcome) pairs.
+        """
+        _, index, player_state, monsters = key
+        if monsters is None:
+            return [self._start_encounter(index, player_state)]
+        if not monsters:
+            if index + 1 == len(self._encounters):
+                return [[(1.0, self._terminal(player_state, True))]]
+            return [[(1.0, (self._game_id, index + 1,
+                            self._carried_over(player_state), None))]]
+        encounter = self._load(player_state, monsters)
+        moves = playable_moves(encounter)
+        options = []
+        for number, move in enumerate(moves):
+            if number:
+                encounter = self._load(player_state, monsters)
+            encounter.player_apply_card(*move)
+            player, monster_states, _, _ = encounter.snapshot(False)
+            options.append([(1.0, (self._game_id, index,
+                                   self._canonical_player(player),
+                                   monster_states))])
+        options.append(self._end_turn(index, player_state, monsters))
+        return options
+
+    def _end_turn(
+        self,
+        index: int,
+        player_state: tuple,
+        monsters: tuple
+    ) -> list[tuple[float, tuple]]:
+        """
+        Chance node: ends the turn, plays the enemy turn and returns every
+        hand the player could draw with its probability.
+        """
+        encounter = self._load(player_state, monsters)
+        encounter.end_player_turn()
+        player = encounter.get_player()
+        deck = tuple(player.get_deck_ids())
+        discarded = tuple(player.get_discarded_ids())
+        encounter.enemy_turn()
+        after, monster_states, _, _ = encounter.snapshot(False)
+        if player.is_defeated():
+            return [(1.0, self._terminal(after, False))]
+        return [(chance, (self._game_id, index,
+                          after[:-3] + (new_deck, hand, new_discarded),
+                          monster_states))
+                for chance, new_deck, hand, new_discarded
+                in self._draw_outcomes(deck, discarded)]
+
+    def _start_encounter(
+        self,
+        index: int,
+        player_state: tuple
+    ) -> list[tuple[float, tuple]]:
+        """
+        Chance node: starts encounter index the way play_game does and
+        returns every Louse damage roll and opening hand with its
+        probability. Monster ids are renumbered from 0 so that equal states
+        of different encounter objects share memo entries.
+        """
+        self._player.restore(player_state)
+        self._player.end_turn()
+        self._encounter = Encounter(self._player, self._encounters[index],
+                                    GameRandom())
+        after, monster_states, _, _ = self._encounter.snapshot(False)
+        deck = tuple(sorted(player_state[-3] + player_state[-2] +
+                            player_state[-1]))
+        rolls = []
+        for number, (kind, state) in enumerate(monster_states):
+            state = state[:_ID_SLOT] + (number,) + state[_ID_SLOT + 1:]
+            if kind is Louse:
+                rolls.append([(kind, state[:-1] + (amount,))
+                              for amount in self._louse_amounts])
+            else:
+                rolls.append([(kind, state)])
+        monster_rolls = list(product(*rolls))
+        draws = self._draw_outcomes(deck, ())
+        return [(chance / len(monster_rolls),
+                 (self._game_id, index,
+                  after[:-3] + (new_deck, hand, new_discarded), monsters))
+                for monsters in monster_rolls
+                for chance, new_deck, hand, new_discarded in draws]
+
+    def _visit(self, root: tuple) -> Outcome:
+        """
+        Tarjan's depth-first search from an unsolved state, with an explicit
+        stack of [key, options, option, position, best] frames so that long
+        games don't hit the recursion limit. Edges to solved states are
+        replaced by their outcomes as they are found, so the edges left when
+        a component is complete all point inside it.
+
+        best is the best outcome among the state's options solved so far; an
+        option whose bound (see _bound) is no better is dropped without
+        being searched, which leaves the state's outcome unchanged.
+
+        Return: The outcome of root.
+        """
+        index = self._index
+        lowlink = self._lowlink
+        frames = [self._open(root)]
+        while frames:
+            frame = frames[-1]
+            key, options = frame[0], frame[1]
+            child_frame = None
+            while frame[2] < len(options) and child_frame is None:
+                option = options[frame[2]]
+                if (not frame[3] and frame[4] is not None and
+                        not _better(self._bound(option), frame[4])):
+                    # Not searched: it can't beat an option already solved.
+                    del options[frame[2]]
+                    continue
+                while frame[3] < len(option):
+                    chance, child = option[frame[3]]
+                    if not isinstance(child, Outcome):
+                        value = self._lookup(child)
+                        if value is None:
+                            if child not in index:
+                                child_frame = self._open(child)
+                                break
+                            lowlink[key] = min(lowlink[key], index[child])
+                        else:
+                            option[frame[3]] = (chance, value)
+                    frame[3] += 1
+                else:
+                    value = _option_value(option)
+                    if value is not None and _better(value, frame[4]):
+                        frame[4] = value
+                    frame[2] += 1
+                    frame[3] = 0
+            if child_frame is not None:
+                frames.append(child_frame)
+                continue
+            frames.pop()
+            value = None
+            if lowlink[key] == index[key]:
+                component = []
+                while True:
+                    member = self._stack.pop()
+                    component.append(member)
+                    if member == key:
+                        break
+                value = self._solve_component(component)[key]
+            if frames:
+                parent = frames[-1]
+                if value is None:
+                    lowlink[parent[0]] = min(lowlink[parent[0]], lowlink[key])
+                else:
+                    option = parent[1][parent[2]]
+                    option[parent[3]] = (option[parent[3]][0], value)
+                parent[3] += 1
+        return value
+
+    def _bound(self, option: list[tuple[float, tuple]]) -> Outcome:
+        """
+        Returns the best outcome an option could have: hp never increases,
+        so a state can at best be won without losing any more hp.
+        """
+        win = loss = 0.0
+        for chance, child in option:
+            if isinstance(child, Outcome):
+                win += chance * child[0]
+                loss += chance * child[1]
+            else:
+                win += chance
+                loss += chance * (self._start_hp - child[2][1])
+        return Outcome(win, loss)
+
+    def _open(self, key: tuple) -> list:
+        """
+        Numbers a newly reached state, pushes it on Tarjan's stack and
+        returns its search frame.
+        """
+        self._visits += 1
+        self._index[key] = self._lowlink[key] = self._visits
+        self._stack.append(key)
+        options = self._edges[key] = self._expand(key)
+        return [key, options, 0, 0, None]
+
+    def _solve_component(self, component: list[tuple]) -> dict[tuple, Outcome]:
+        """
+        Solves a complete strongly connected component and stores its
+        outcomes in the memo.
+
+        Return: The outcome of every state in the component, which the
+        search reads instead of the memo since the memo may already have
+        evicted some of them.
+        """
+        edges = [self._edges.pop(member) for member in component]
+        for member in component:
+            del self._index[member]
+            del self._lowlink[member]
+        if len(component) == 1 and all(
+                isinstance(child, Outcome)
+                for option in edges[0] for _, child in option):
+            values = {component[0]: _best(edges[0], None)}
+        else:
+            values = dict.fromkeys(component, self._terminal(None, False))
+            for _ in range(_MAX_SWEEPS):
+                change = 0.0
+                for member, options in zip(component, edges):
+                    value = _best(options, values)
+                    old = values[member]
+                    change = max(change, abs(value[0] - old[0]),
+                                 abs(value[1] - old[1]))
+                    values[member] = value
+                if change < _EPSILON:
+                    break
+        for member, value in values.items():
+            self._table.put(member, value)
+            if member[3] is None:
+                self._starts[member] = value
+            self._states += 1
+            if (self._progress is not None and
+                    self._states % self._progress_interval == 0):
+                self._progress(self.get_stats())
+        return values
+
+
+def solve_game(
+    player_class: type[Player],
+    game_file: str,
+    max_states: int = DEFAULT_MAX_STATES,
+    progress: Callable[[SolverStats], None] | None = None
+) -> Outcome:
+    """
+    Reads a game file and returns the outcome of optimal play.
+
+    Parameters:
+        player_class = the player type to play as (IronClad or Silent).
+        game_file = the name of the game file to solve, as text or compiled.
+        max_states = bound on the number of solved states kept.
+        progress = called with SolverStats as the solve goes.
+
+    Return: The Outcome of optimal play.
+    """
+    solver = ExactSolver(player_class, open_game(game_file, MONSTER_TYPES),
+                         max_states, progress=progress)
+    return solver.solve()
@@ -0,0 +1,415 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, NamedTuple
+import argparse
+import csv
+import itertools
+import math
+
+from monte_carlo import *
+
+"""Balance sweeps: win rates over grids of card and monster values"""
+
+DEFAULT_GAME_FILE = "games/game3.txt"
+DEFAULT_ROUND_SIZE = 500
+DEFAULT_MAX_GAMES = 20000
+DEFAULT_TOLERANCE = 0.01
+DEFAULT_Z = 1.96
+
+# Monster parameter name -> (monster type, class attribute).
+MONSTER_PARAMETERS = {
+    "Louse.min_damage": (Louse, "_min_damage"),
+    "Louse.max_damage": (Louse, "_max_damage"),
+    "Cultist.base_damage": (Cultist, "_base_damage"),
+    "Cultist.damage_ramp": (Cultist, "_damage_ramp"),
+}
+
+# Pairs of parameters whose first value may not be above the second.
+ORDERED_PARAMETERS = (("Louse.min_damage", "Louse.max_damage"),)
+
+Point = tuple[tuple[str, int], ...]
+
+
+def _accessors(name: str) -> tuple[Callable[[], int], Callable[[int], None]]:
+    """
+    Returns functions reading and setting a parameter. Card parameters are
+    named <Card>.<field>, where field is damage, block, cost, a status the
+    card applies to its target (weak, vulnerable, strength) or self_ and a
+    status it gives the player. Monster parameters are in
+    MONSTER_PARAMETERS.
+    """
+    if name in MONSTER_PARAMETERS:
+        owner, attribute = MONSTER_PARAMETERS[name]
+        return (lambda: getattr(owner, attribute),
+                lambda value: setattr(owner, attribute, value))
+    card_name, _, field = name.partition(".")
+    card_type = CARD_TYPES.get(card_name)
+    if card_type is not None and field in ("damage", "block", "cost"):
+        return (lambda: getattr(card_type, "_" + field),
+                lambda value: update_card(card_type, **{field: value}))
+    key, status = (("self_status", field[5:]) if field.startswith("self_")
+                   else ("status", field))
+    if card_type is None or status not in STATUS_METHODS:
+        raise ValueError(f"unknown parameter {name!r}")
+
+    def set_status(value: int) -> None:
+        modifiers = dict(getattr(card_type, "_" + key))
+        if value:
+            modifiers[status] = value
+        else:
+            modifiers.pop(status, None)
+        update_card(card_type, **{key: modifiers})
+    return (lambda: getattr(card_type, "_" + key).get(status, 0),
+            set_status)
+
+
+def get_parameter(name: str) -> int:
+    """
+    Returns the current value of a parameter (see _accessors for names).
+    """
+    return _accessors(name)[0]()
+
+
+def set_parameter(name: str, value: int) -> None:
+    """
+    Sets a parameter for every game played afterwards in this process.
+    """
+    _accessors(name)[1](value)
+
+
+def parse_grid(spec: str) -> tuple[str, list[int]]:
+    """
+    Parses one axis of a grid.
+
+    Parameter:
+        spec = <parameter>=<values>, the values either listed (4,6,9) or
+        an inclusive range with an optional step (4:9 or 4:12:2).
+
+    Return: The parameter name and its values.
+
+    Raises:
+        ValueError: If the spec is malformed or names an unknown parameter.
+        Values that conflict with another parameter (Louse.min_damage above
+        Louse.max_damage) are rejected by grid_points once the whole grid
+        is known.
+    """
+    name, separator, values = spec.partition("=")
+    if not separator or not values:
+        raise ValueError(f"expected <parameter>=<values>, got {spec!r}")
+    get_parameter(name)
+    try:
+        if ":" in values:
+            bounds = [int(value) for value in values.split(":")]
+            if len(bounds) not in (2, 3) or bounds[-1] == 0:
+                raise ValueError
+            step = bounds[2] if len(bounds) == 3 else 1
+            points = list(range(bounds[0], bounds[1] + (1 if step > 0
+                                                        else -1), step))
+        else:
+            points = [int(value) for value in values.split(",")]
+    except ValueError:
+        raise ValueError(f"invalid values for {name}: {values!r}") from None
+    if not points:
+        raise ValueError(f"no values for {name}: {values!r}")
+    return name, points
+
+
+def grid_points(grid: dict[str, list[int]]) -> list[Point]:
+    """
+    Returns every combination of the grid's values, the last parameter
+    changing fastest.
+
+    Raises:
+        ValueError: If a point would set a parameter of ORDERED_PARAMETERS
+        above its partner, whose current value is used when it isn't swept.
+    """
+    names = list(grid)
+    points = [tuple(zip(names, values))
+              for values in itertools.product(*grid.values())]
+    for low_name, high_name in ORDERED_PARAMETERS:
+        if low_name not in grid and high_name not in grid:
+            continue
+        for point in points:
+            values = dict(point)
+            low = values.get(low_name, get_parameter(low_name))
+            high = values.get(high_name, get_parameter(high_name))
+            if low > high:
+                raise ValueError(f"{low_name}={low} is above "
+                                 f"{high_name}={high}")
+    return points
+
+
+def wilson_interval(wins: int, games: int, z: float = DEFAULT_Z
+                    ) -> tuple[float, float]:
+    """
+    Returns the Wilson score interval of a win rate. Unlike the normal
+    approximation it does not shrink to nothing when every game is won or
+    every game is lost.
+    """
+    if not games:
+        return 0.0, 1.0
+    rate = wins / games
+    scale = 1 + z * z / games
+    centre = (rate + z * z / (2 * games)) / scale
+    spread = z * math.sqrt(rate * (1 - rate) / games
+                           + z * z / (4 * games * games)) / scale
+    return max(centre - spread, 0.0), min(centre + spread, 1.0)
+
+
+class SweepResult(NamedTuple):
+    """
+    Outcome of one grid point.
+
+    point = (parameter, value) pairs of the point.
+    stats = the games played at the point.
+    low, high = confidence interval of the win rate.
+    converged = True if the interval became narrow enough before the
+    game limit.
+    """
+    point: Point
+    stats: OutcomeStats
+    low: float
+    high: float
+    converged: bool
+
+    def as_row(self) -> dict[str, object]:
+        """
+        Returns the result as a flat row of columns.
+        """
+        stats = self.stats
+        return {**dict(self.point), "games": stats.get_games(),
+                "wins": stats.get_wins(), "win_rate": stats.win_rate(),
+                "ci_low": self.low, "ci_high": self.high,
+                "timeouts": stats.get_timeouts(),
+                "mean_turns_to_win": stats.mean_turns_to_win(),
+                "mean_hp_remaining": stats.mean_hp_remaining(),
+                "converged": self.converged}
+
+
+# Encounters of each game file opened by this process, kept across tasks.
+_ENCOUNTERS = {}
+
+
+def _run_point_chunk(
+    point: Point,
+    player_class: type[Player],
+    game_file: str,
+    policy: Policy,
+    file_seed: int,
+    start: int,
+    stop: int,
+    max_turns: int
+) -> OutcomeStats:
+    """
+    Worker entry point: plays games start to stop at a grid point. The
+    parameters are set for the chunk and put back afterwards, and the game
+    file is only opened once per worker. Game i uses stream i forked from
+    file_seed at every point, so points are compared on the same deals.
+    """
+    encounters = _ENCOUNTERS.get(game_file)
+    if encounters is None:
+        encounters = _ENCOUNTERS[game_file] = open_game(game_file,
+                                                        MONSTER_TYPES)
+    defaults = [(name, get_parameter(name)) for name, _ in point]
+    for name, value in point:
+        set_parameter(name, value)
+    try:
+        file_rng = GameRandom(file_seed)
+        stats = OutcomeStats()
+        for index in range(start, stop):
+            rng = file_rng.fork(index)
+            policy.reset(rng.fork(POLICY_STREAM).get_seed())
+            stats.add(play_game(player_class, encounters, policy, max_turns,
+                                rng))
+        return stats
+    finally:
+        for name, value in reversed(defaults):
+            set_parameter(name, value)
+
+
+def run_sweep(
+    player_class: type[Player],
+    game_file: str,
+    policy: Policy,
+    grid: dict[str, list[int]],
+    seed: int = DEFAULT_SEED,
+    workers: int | None = None,
+    round_size: int = DEFAULT_ROUND_SIZE,
+    max_games: int = DEFAULT_MAX_GAMES,
+    tolerance: float = DEFAULT_TOLERANCE,
+    z: float = DEFAULT_Z,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_turns: int = DEFAULT_MAX_TURNS
+) -> list[SweepResult]:
+    """
+    Estimates the win rate at every point of a grid across a process pool.
+    Games are played in rounds of round_size per point; a point stops once
+    half the width of its confidence interval is at most tolerance, or
+    after max_games.
+
+    Parameters:
+        player_class = the player type to play as (IronClad or Silent).
+        game_file = the game file to play, as text or compiled.
+        policy = chooses each move; each worker gets its own copy.
+        grid = values to try for each parameter (see parse_grid).
+        seed = master seed; the same seed always gives the same results,
+        and the point of default values matches run_monte_carlo's.
+        workers = number of worker processes (default: one per core).
+        round_size = number of games each unfinished point plays per round.
+        max_games = number of games after which a point stops regardless.
+        tolerance = half width of the confidence interval to stop at.
+        z = standard score of the confidence level (1.96 for 95%).
+        chunk_size = number of games each task plays.
+        max_turns = number of player turns after which a game is lost.
+
+    Return: The SweepResult of each point, in grid_points order.
+    """
+    file_seed = GameRandom(seed).fork(0).get_seed()
+    points = grid_points(grid)
+    stats = {point: OutcomeStats() for point in points}
+    converged = dict.fromkeys(points, False)
+    active = list(points)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while active:
+            futures = []
+            for point in active:
+                played = stats[point].get_games()
+                stop = min(played + round_size, max_games)
+                for start in range(played, stop, chunk_size):
+                    futures.append((point, pool.submit(
+                        _run_point_chunk, point, player_class, game_file,
+                        policy, file_seed, start,
+                        min(start + chunk_size, stop), max_turns)))
+            for point, future in futures:
+                stats[point].merge(future.result())
+            remaining = []
+            for point in active:
+                point_stats = stats[point]
+                low, high = wilson_interval(point_stats.get_wins(),
+                                            point_stats.get_games(), z)
+                if (high - low) / 2 <= tolerance:
+                    converged[point] = True
+                elif point_stats.get_games() < max_games:
+                    remaining.append(point)
+            active = remaining
+    results = []
+    for point in points:
+        point_stats = stats[point]
+        results.append(SweepResult(
+            point, point_stats,
+            *wilson_interval(point_stats.get_wins(), point_stats.get_games(),
+                             z), converged[point]))
+    return results
+
+
+def write_csv(results: list[SweepResult], filename: str) -> None:
+    """
+    Writes one row per grid point to a CSV file.
+    """
+    rows = [result.as_row() for result in results]
+    with open(filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_arrow(results: list[SweepResult], filename: str) -> None:
+    """
+    Writes one row per grid point to an Arrow IPC file. Needs pyarrow.
+    """
+    import pyarrow.ipc
+    rows = [result.as_row() for result in results]
+    table = pyarrow.table({column: [row[column] for row in rows]
+                           for column in rows[0]})
+    with pyarrow.OSFile(filename, 'wb') as sink:
+        with pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def write_results(results: list[SweepResult], filename: str) -> None:
+    """
+    Writes the results as Arrow IPC if filename ends in .arrow or .feather,
+    otherwise as CSV.
+    """
+    if filename.endswith((".arrow", ".feather")):
+        write_arrow(results, filename)
+    else:
+        write_csv(results, filename)
+
+
+def main() -> None:
+    """
+    Command line entry point: sweeps a grid and prints the win rate at each
+    point, e.g.
+
+        python sweep.py Strike.damage=4:9 Cultist.damage_ramp=1,2 --target 0.55
+    """
+    parser = argparse.ArgumentParser(description="Balance parameter sweep")
+    parser.add_argument(
+        "grid", nargs="+",
+        help="<parameter>=<a,b,c> or <parameter>=<lo:hi[:step]>, where "
+             "parameter is <Card>.<field> with field damage, block, cost, a "
+             "status the card applies (e.g. Neutralize.weak) or "
+             "self_<status> for one it gives the player (e.g. "
+             "Survivor.self_strength), or one of "
+             f"{list(MONSTER_PARAMETERS)}")
+    parser.add_argument("--game-file", default=DEFAULT_GAME_FILE)
+    parser.add_argument("--player", choices=PLAYER_TYPES, default="ironclad")
+    parser.add_argument("--policy", choices=["greedy", "random"],
+                        default="greedy")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--round-size", type=int, default=DEFAULT_ROUND_SIZE)
+    parser.add_argument("--max-games", type=int, default=DEFAULT_MAX_GAMES)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="stop a point once its 95%% confidence interval "
+                             "is within this of the win rate")
+    parser.add_argument("--target", type=float, default=None,
+                        help="also print the point closest to this win rate")
+    parser.add_argument("--output", default=None,
+                        help="write the results to this file: Arrow IPC for "
+                             ".arrow or .feather, otherwise CSV")
+    args = parser.parse_args()
+
+    grid = {}
+    for spec in args.grid:
+        try:
+            name, values = parse_grid(spec)
+        except ValueError as error:
+            parser.error(str(error))
+        grid[name] = values
+    try:
+        grid_points(grid)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.output is not None and args.output.endswith((".arrow",
+                                                         ".feather")):
+        try:
+            import pyarrow.ipc
+        except ImportError:
+            parser.error("writing Arrow files needs pyarrow")
+
+    policy = GreedyPolicy() if args.policy == "greedy" else RandomPolicy()
+    start = time.perf_counter()
+    results = run_sweep(PLAYER_TYPES[args.player], args.game_file, policy,
+                        grid, args.seed, args.workers, args.round_size,
+                        args.max_games, args.tolerance)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        values = " ".join(f"{name}={value}" for name, value in result.point)
+        print(f"{values}: {result.stats} "
+              f"[{result.low:.2%}, {result.high:.2%}]"
+              f"{'' if result.converged else ' (game limit)'}")
+    if args.target is not None:
+        best = min(results, key=lambda result:
+                   abs(result.stats.win_rate() - args.target))
+        values = " ".join(f"{name}={value}" for name, value in best.point)
+        print(f"closest to {args.target:.2%}: {values}")
+    total = sum(result.stats.get_games() for result in results)
+    print(f"{len(results)} points, {total} games in {elapsed:.2f}s "
+          f"({total / elapsed:.0f} games/s)")
+    if args.output is not None:
+        write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
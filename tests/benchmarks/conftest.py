@@ -0,0 +1,101 @@
+from pathlib import Path
+import json
+import platform
+import sys
+
+import pytest
+
+"""
+Shared fixtures of the benchmark suite, and the check of each benchmark
+against the baseline recorded in baseline.json.
+
+Run with pytest-benchmark installed, from the repository root; the suite
+is skipped unless one of these options asks for it (see tests/conftest.py):
+
+    python -m pytest tests/benchmarks --run-benchmarks    compare
+    python -m pytest tests/benchmarks --update-baseline   record
+
+A benchmark regresses when its best time is more than the threshold slower
+than its baseline; the run then fails and lists the regressions.
+"""
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+BASELINE_FILE = Path(__file__).with_name("baseline.json")
+
+_TIMES = pytest.StashKey[dict]()
+_REGRESSIONS = pytest.StashKey[list]()
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.stash[_TIMES] = {}
+    config.stash[_REGRESSIONS] = []
+
+
+@pytest.fixture
+def bench(benchmark, request: pytest.FixtureRequest):
+    """
+    The pytest-benchmark fixture, with the best time of the benchmark kept
+    for comparison with the baseline.
+    """
+    yield benchmark
+    stats = getattr(benchmark, "stats", None)
+    if stats is not None:
+        name = f"{request.node.path.name}::{request.node.name}"
+        request.config.stash[_TIMES][name] = stats.stats.min
+
+
+def _machine() -> dict[str, str]:
+    """
+    Returns a description of the machine the baseline was recorded on.
+    """
+    return {"python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "system": platform.system()}
+
+
+def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
+    config = session.config
+    times = config.stash.get(_TIMES, {})
+    if not times or not (config.getoption("--run-benchmarks") or
+                         config.getoption("--update-baseline")):
+        return
+    baseline = {"machine": _machine(), "times": {}}
+    if BASELINE_FILE.exists():
+        baseline = json.loads(BASELINE_FILE.read_text())
+    if config.getoption("--update-baseline"):
+        baseline["machine"] = _machine()
+        baseline["times"].update(times)
+        baseline["times"] = dict(sorted(baseline["times"].items()))
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=1) + "\n")
+        return
+    threshold = config.getoption("--regression-threshold")
+    regressions = config.stash[_REGRESSIONS]
+    for name, best in sorted(times.items()):
+        recorded = baseline["times"].get(name)
+        if recorded is not None and best > recorded * (1 + threshold):
+            regressions.append((name, recorded, best))
+    if regressions and session.exitstatus == 0:
+        session.exitstatus = 1
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus: int,
+                            config: pytest.Config) -> None:
+    regressions = config.stash.get(_REGRESSIONS, [])
+    if config.getoption("--update-baseline"):
+        if config.stash.get(_TIMES, {}):
+            terminalreporter.write_line(
+                f"baseline updated: {BASELINE_FILE.relative_to(ROOT)}")
+        return
+    if not regressions:
+        return
+    threshold = config.getoption("--regression-threshold")
+    terminalreporter.section(
+        f"regressions over {threshold:.0%} against the baseline", red=True)
+    for name, recorded, best in regressions:
+        terminalreporter.write_line(
+            f"{name:60} {recorded * 1e6:11.2f} us -> {best * 1e6:11.2f} us "
+            f"({best / recorded - 1:+.0%})")
@@ -0,0 +1,46 @@
+import pytest
+
+from simulate import *
+
+"""Benchmarks of drawing and playing cards"""
+
+DECK_SIZES = (10, 100, 1000, 10000)
+HAND_SIZES = (5, 1000)
+ROUNDS = 500
+
+
+def _deck(size: int) -> list[int]:
+    """
+    Returns a deck of card ids cycling through Strike, Defend and Bash.
+    """
+    return [(STRIKE, DEFEND, BASH)[i % 3] for i in range(size)]
+
+
+@pytest.mark.parametrize("size", DECK_SIZES)
+def test_select_cards(bench, size: int) -> None:
+    deck = _deck(size)
+    rng = GameRandom()
+    def setup() -> tuple[tuple, dict]:
+        return (list(deck), 5, rng), {}
+    bench.pedantic(select_cards, setup=setup, rounds=ROUNDS)
+
+
+@pytest.mark.parametrize("size", DECK_SIZES)
+def test_draw_cards(bench, size: int) -> None:
+    deck = _deck(size)
+    discard = _deck(size)
+    rng = GameRandom()
+    def setup() -> tuple[tuple, dict]:
+        return (list(deck), [], list(discard), rng), {}
+    bench.pedantic(draw_cards, setup=setup, rounds=ROUNDS)
+
+
+@pytest.mark.parametrize("size", HAND_SIZES)
+def test_play_card(bench, size: int) -> None:
+    player = Player(70, [])
+    hand = [(STRIKE, DEFEND, NEUTRALIZE)[i % 3] for i in range(size)]
+    def setup() -> tuple[tuple, dict]:
+        player._set_hand(list(hand))
+        return ("Neutralize",), {}
+    card = bench.pedantic(player.play_card, setup=setup, rounds=ROUNDS)
+    assert card is not None
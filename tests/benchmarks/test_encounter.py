@@ -0,0 +1,36 @@
+import pytest
+
+from simulate import *
+
+"""Benchmarks of playing a card and of the enemy turn in one encounter"""
+
+MONSTER_COUNTS = (1, 10, 100, 1000)
+ROUNDS = 300
+
+
+@pytest.mark.parametrize("count", MONSTER_COUNTS)
+def test_player_apply_card(bench, count: int) -> None:
+    player = Player(1000, [Strike() for _ in range(5)])
+    encounter = Encounter(player, [("Louse", 10 ** 6)] * count, GameRandom())
+    target_id = encounter.get_monsters()[-1].get_id()
+    state = encounter.snapshot()
+    def setup() -> tuple[tuple, dict]:
+        encounter.restore(state)
+        return ("Strike", target_id), {}
+    played = bench.pedantic(encounter.player_apply_card, setup=setup,
+                            rounds=ROUNDS)
+    assert played
+
+
+@pytest.mark.parametrize("count", MONSTER_COUNTS)
+def test_enemy_turn(bench, count: int) -> None:
+    kinds = ("Louse", "Cultist", "JawWorm")
+    player = Player(10 ** 9, [Defend() for _ in range(10)])
+    encounter = Encounter(player, [(kinds[i % 3], 50) for i in range(count)],
+                          GameRandom())
+    encounter.end_player_turn()
+    state = encounter.snapshot()
+    def setup() -> tuple[tuple, dict]:
+        encounter.restore(state)
+        return (), {}
+    bench.pedantic(encounter.enemy_turn, setup=setup, rounds=ROUNDS)
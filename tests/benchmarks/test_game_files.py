@@ -0,0 +1,33 @@
+import pytest
+
+from benchmarks import write_campaign_file
+from conftest import ROOT
+from simulate import *
+
+"""Benchmarks of reading game files"""
+
+GAME_FILES = sorted(str(path) for path in (ROOT / "games").glob("*.txt"))
+HUGE_ENCOUNTERS = 50000
+
+
+@pytest.fixture(scope="module")
+def huge_game_file(tmp_path_factory: pytest.TempPathFactory) -> str:
+    """
+    A generated game file of HUGE_ENCOUNTERS random encounters.
+    """
+    path = tmp_path_factory.mktemp("games") / "huge.txt"
+    write_campaign_file(str(path), HUGE_ENCOUNTERS)
+    return str(path)
+
+
+@pytest.mark.parametrize("game_file", GAME_FILES,
+                         ids=lambda path: path.rsplit("/", 1)[-1])
+def test_read_game_file(bench, game_file: str) -> None:
+    encounters = bench(read_game_file, game_file, MONSTER_TYPES)
+    assert encounters
+
+
+def test_read_huge_game_file(bench, huge_game_file: str) -> None:
+    encounters = bench.pedantic(read_game_file,
+                                (huge_game_file, MONSTER_TYPES), rounds=5)
+    assert len(encounters) == HUGE_ENCOUNTERS
@@ -0,0 +1,23 @@
+import pytest
+
+from conftest import ROOT
+from simulate import *
+
+"""Benchmarks of complete headless games"""
+
+GAME_FILES = sorted(str(path) for path in (ROOT / "games").glob("*.txt"))
+ROUNDS = 50
+
+
+@pytest.mark.parametrize("game_file", GAME_FILES,
+                         ids=lambda path: path.rsplit("/", 1)[-1])
+@pytest.mark.parametrize("player_class", [IronClad, Silent],
+                         ids=lambda player_class: player_class.__name__)
+def test_play_game(bench, player_class: type[Player], game_file: str) -> None:
+    encounters = read_game_file(game_file, MONSTER_TYPES)
+    policy = GreedyPolicy()
+    def setup() -> tuple[tuple, dict]:
+        return ((player_class, encounters, policy),
+                {"rng": GameRandom(DEFAULT_SEED)})
+    result = bench.pedantic(play_game, setup=setup, rounds=ROUNDS)
+    assert result.turns > 0
@@ -0,0 +1,51 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+"""
+Shared setup of the tests. Run from the repository root:
+
+    python -m pytest                                      unit tests
+    python -m pytest --run-benchmarks tests/benchmarks    benchmarks
+
+The benchmark suite in tests/benchmarks is timed against a baseline
+recorded on one machine, so it only runs when asked for.
+"""
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+BENCHMARKS = Path(__file__).resolve().parent / "benchmarks"
+DEFAULT_THRESHOLD = 0.25
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("benchmarks")
+    group.addoption("--run-benchmarks", action="store_true",
+                    help="run the benchmark suite in tests/benchmarks and "
+                         "check it against its baseline")
+    group.addoption("--update-baseline", action="store_true",
+                    help="run the benchmark suite and record its times in "
+                         "tests/benchmarks/baseline.json")
+    group.addoption("--regression-threshold", type=float,
+                    default=DEFAULT_THRESHOLD,
+                    help="fraction slower than the baseline that counts as "
+                         f"a regression (default: {DEFAULT_THRESHOLD})")
+
+
+def benchmarks_requested(config: pytest.Config) -> bool:
+    """
+    Returns True if the run asked for the benchmark suite.
+    """
+    return (config.getoption("--run-benchmarks") or
+            config.getoption("--update-baseline"))
+
+
+def pytest_ignore_collect(collection_path: Path,
+                          config: pytest.Config) -> bool | None:
+    if (not benchmarks_requested(config) and
+            (collection_path == BENCHMARKS or
+             BENCHMARKS in collection_path.parents)):
+        return True
+    return None
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from simulate import *
+
+"""Round trips of game files through the compiled format"""
+
+GAME_FILES = sorted(str(path) for path in
+                    (Path(__file__).resolve().parents[1] / "games")
+                    .glob("*.txt"))
+
+
+@pytest.mark.parametrize("game_file", GAME_FILES,
+                         ids=lambda path: path.rsplit("/", 1)[-1])
+def test_compiled_game_matches_text(game_file: str, tmp_path: Path) -> None:
+    target = str(tmp_path / "game.cg")
+    expected = read_game_file(game_file, MONSTER_TYPES)
+    assert compile_game_file(game_file, target, MONSTER_TYPES) == len(expected)
+    assert is_compiled_game(target) and not is_compiled_game(game_file)
+    with open_game(target, MONSTER_TYPES) as compiled:
+        assert list(compiled) == expected
+        assert compiled[-1] == expected[-1]
+    assert list(iter_game(target)) == expected
+
+
+def test_compiled_game_plays_the_same(tmp_path: Path) -> None:
+    game_file = GAME_FILES[1]
+    target = str(tmp_path / "game.cg")
+    compile_game_file(game_file, target)
+    assert (run_games(Silent, target, GreedyPolicy(), 20) ==
+            run_games(Silent, game_file, GreedyPolicy(), 20))
+
+
+def test_truncated_compiled_game_is_rejected(tmp_path: Path) -> None:
+    source = str(tmp_path / "game.cg")
+    compile_game_file(GAME_FILES[0], source)
+    with open(source, "rb") as file:
+        data = file.read()
+    target = tmp_path / "truncated.cg"
+    for size in range(len(data)):
+        target.write_bytes(data[:size])
+        with pytest.raises(GameFileError):
+            CompiledGame(str(target))
+
+
+@pytest.mark.parametrize("hp", ["²", "-3", "0", "1.5", "x"])
+def test_bad_hp_token_is_rejected(hp: str, tmp_path: Path) -> None:
+    game_file = tmp_path / "game.txt"
+    game_file.write_text(f"Encounter 1\nLouse 10\nCultist {hp}\n",
+                         encoding="utf-8")
+    with pytest.raises(GameFileError, match=":3: hp must be a positive"):
+        read_game_file(str(game_file))
+
+
+def test_overlong_name_leaves_no_file(tmp_path: Path) -> None:
+    game_file = tmp_path / "game.txt"
+    game_file.write_text(f"Encounter 1\n{'L' * 256} 10\n", encoding="utf-8")
+    target = tmp_path / "game.cg"
+    with pytest.raises(ValueError, match="too long"):
+        compile_game_file(str(game_file), str(target))
+    assert not target.exists()
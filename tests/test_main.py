@@ -0,0 +1,132 @@
+from pathlib import Path
+
+import pytest
+
+from main import *
+
+"""Entities, monster plugins and the game model in main.py"""
+
+
+class Slime(Monster):
+    """
+    Test plugin alternating between attacking and resting.
+    """
+    __slots__ = ('_phase',)
+
+    def __init__(self, max_hp: int) -> None:
+        super().__init__(max_hp)
+        self._phase = 0
+
+    def action(self) -> dict[str, int]:
+        self._phase = 1 - self._phase
+        return {'damage': 4 * self._phase}
+
+
+class UnslottedSlime(Slime):
+    """
+    Slime whose subclass forgot __slots__, so it has an instance __dict__.
+    """
+
+
+@pytest.fixture
+def slime_registered():
+    register_monster('Slime', Slime)
+    yield
+    del MONSTER_TYPES['Slime']
+
+
+def test_plugin_state_survives_snapshot(slime_registered) -> None:
+    encounter = Encounter(IronClad(), [('Slime', 20)], GameRandom(1))
+    state = encounter.snapshot()
+    encounter.end_player_turn()
+    encounter.enemy_turn()
+    slime = encounter.get_monsters()[0]
+    assert slime._phase == 1
+    encounter.restore(state)
+    assert encounter.get_monsters()[0]._phase == 0
+
+
+def test_unslotted_plugin_is_rejected() -> None:
+    with pytest.raises(TypeError, match="UnslottedSlime must declare"):
+        register_monster('UnslottedSlime', UnslottedSlime)
+    assert 'UnslottedSlime' not in MONSTER_TYPES
+    with pytest.raises(TypeError, match="UnslottedSlime must declare"):
+        UnslottedSlime(10).snapshot()
+
+
+def test_player_without_cards() -> None:
+    player = Player(50)
+    assert player.get_deck() is None
+    assert repr(player) == "Player(50, None)"
+
+
+def test_hit_through_block_stops_at_zero_hp() -> None:
+    entity = Entity(5)
+    entity.add_block(2)
+    entity.reduce_hp(10)
+    assert entity.get_hp() == 0
+    assert entity.is_defeated()
+
+
+def test_status_modifiers_split_by_recipient() -> None:
+    assert Neutralize().get_status_modifiers() == {'weak': 1, 'vulnerable': 2}
+    assert Neutralize().get_self_modifiers() == {}
+    assert Survivor().get_status_modifiers() == {}
+    assert Survivor().get_self_modifiers() == {'strength': 1}
+
+
+@pytest.mark.parametrize("line", ["damage ²", "cost -1",
+                                  "status weak ³ target"])
+def test_bad_card_amount_is_rejected(line: str, tmp_path: Path) -> None:
+    card_file = tmp_path / "cards.txt"
+    card_file.write_text(f"Card Poke\n{line}\n", encoding="utf-8")
+    with pytest.raises(GameFileError, match=":2: "):
+        load_card_file(str(card_file))
+    assert "Poke" not in CARD_TYPES
+
+
+def _fresh_text(encounter: Encounter) -> str:
+    """
+    Returns the board of an encounter rebuilt from its snapshot, so that no
+    cached text is reused.
+    """
+    clone = Encounter(type(encounter.get_player())(),
+                      [("Louse", 1)], GameRandom(0))
+    clone.restore(encounter.snapshot())
+    return format_encounter(clone)
+
+
+def test_displayed_text_follows_every_change() -> None:
+    encounter = Encounter(IronClad(), [("JawWorm", 40), ("Cultist", 30)],
+                          GameRandom(2))
+    player = encounter.get_player()
+    worm, cultist = encounter.get_monsters()
+    changes = [
+        lambda: worm.reduce_hp(7),
+        lambda: worm.add_block(4),
+        lambda: worm.reduce_hp(6),
+        lambda: cultist.add_strength(2),
+        lambda: cultist.add_weak(1),
+        lambda: cultist.add_vulnerable(2),
+        lambda: worm.action(),
+        lambda: worm.new_turn(),
+        lambda: player.add_block(5),
+        lambda: player.add_strength(1),
+        lambda: player.add_weak(2),
+        lambda: player.add_vulnerable(1),
+        lambda: player.reduce_hp(3),
+        lambda: player.new_turn(GameRandom(5)),
+        lambda: encounter.player_apply_card(player.get_hand()[0].get_name(),
+                                            worm.get_id()),
+        lambda: encounter.end_player_turn(),
+        lambda: encounter.enemy_turn(),
+    ]
+    start = encounter.snapshot()
+    initial = format_encounter(encounter)
+    for change in changes:
+        format_encounter(encounter)
+        change()
+        assert format_encounter(encounter) == _fresh_text(encounter)
+    assert format_encounter(encounter) != initial
+    encounter.restore(start)
+    assert format_encounter(encounter) == initial
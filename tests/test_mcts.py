@@ -0,0 +1,53 @@
+from mcts import *
+
+"""Moves chosen by the Monte Carlo tree search"""
+
+
+def _encounter() -> Encounter:
+    return Encounter(IronClad(), [("Louse", 20), ("Cultist", 30)],
+                     GameRandom(11))
+
+
+def test_chooses_a_legal_move() -> None:
+    encounter = _encounter()
+    move = MCTSPolicy(time_limit=None, iterations=50,
+                      seed=1).choose_move(encounter)
+    assert move in playable_moves(encounter) + [END_TURN]
+
+
+def test_same_seed_gives_same_move() -> None:
+    moves = []
+    for _ in range(2):
+        # Monster ids differ between encounters, so compare target positions.
+        encounter = _encounter()
+        ids = [monster.get_id() for monster in encounter.get_monsters()]
+        move = MCTSPolicy(time_limit=None, iterations=50,
+                          seed=4).choose_move(encounter)
+        if move is not END_TURN and move[1] is not None:
+            move = (move[0], ids.index(move[1]))
+        moves.append(move)
+    assert moves[0] == moves[1]
+
+
+def test_search_leaves_the_encounter_unchanged() -> None:
+    encounter = _encounter()
+    state = encounter.snapshot()
+    MCTSPolicy(time_limit=None, iterations=50, seed=2).choose_move(encounter)
+    assert encounter.snapshot() == state
+
+
+def test_search_keeps_the_callers_monsters() -> None:
+    encounter = _encounter()
+    monsters = encounter.get_monsters()
+    MCTSPolicy(time_limit=None, iterations=50, seed=2).choose_move(encounter)
+    for mine, theirs in zip(monsters, encounter.get_monsters(), strict=True):
+        assert mine is theirs
+
+
+def test_search_without_budget_still_moves() -> None:
+    for policy in (MCTSPolicy(time_limit=0.0, seed=3),
+                   MCTSPolicy(time_limit=None, iterations=0, seed=3)):
+        encounter = _encounter()
+        move = policy.choose_move(encounter)
+        assert move in playable_moves(encounter) + [END_TURN]
+        assert policy.get_last_stats().iterations == 1
@@ -0,0 +1,44 @@
+import random
+
+from profiler import *
+from simulate import GreedyPolicy, IronClad, run_games
+
+"""Latency histograms and the call profiler"""
+
+
+def test_buckets_cover_every_latency_once() -> None:
+    for nanoseconds in list(range(5000)) + [10 ** 6, 10 ** 9, 123456789]:
+        index = bucket_index(nanoseconds)
+        assert nanoseconds <= bucket_limit(index)
+        assert index == 0 or bucket_limit(index - 1) < nanoseconds
+        assert bucket_limit(index) - nanoseconds <= \
+            nanoseconds / SUB_BUCKETS
+
+
+def test_histogram_percentiles_are_close() -> None:
+    rng = random.Random(7)
+    latencies = sorted(int(rng.lognormvariate(8, 1.5)) for _ in range(20000))
+    counts = {}
+    for latency in latencies:
+        index = bucket_index(latency)
+        counts[index] = counts.get(index, 0) + 1
+    assert len(counts) < 300
+    for percent in (1, 50, 90, 99, 100):
+        exact = percentile(latencies, percent)
+        estimate = histogram_percentile(counts, len(latencies), percent)
+        assert exact <= estimate <= exact * (1 + 1 / SUB_BUCKETS) + 1
+
+
+def test_profiler_counts_calls() -> None:
+    with Profiler() as profiler:
+        run_games(IronClad, "games/game1.txt", GreedyPolicy(), 20)
+    assert not profiler.is_enabled()
+    stats = {stat.label(): stat for stat in profiler.get_stats()}
+    played = stats["player_apply_card"]
+    assert played.calls == sum(stat.calls for label, stat in stats.items()
+                               if label.startswith("player_apply_card["))
+    for stat in stats.values():
+        assert 0 < stat.p50 <= stat.p90 <= stat.p99 <= stat.max
+        assert stat.own <= stat.total
+    profiler.reset()
+    assert profiler.get_stats() == []
@@ -0,0 +1,85 @@
+import io
+
+import pytest
+
+from protocol import *
+from simulate import GreedyPolicy
+
+"""Command parsing, and round trips of the frame renderer's patch stream"""
+
+
+@pytest.mark.parametrize("text, command", [
+    ("play Strike 3", PlayCommand("Strike", 3)),
+    ("play Defend", PlayCommand("Defend", None)),
+    ("end turn", EndTurnCommand()),
+    ("inspect deck", InspectCommand("deck")),
+    ("describe Bash", DescribeCommand("Bash")),
+    ("inspect hand", None),
+    ("dance", None),
+])
+def test_parse_command(text: str, command: Command | None) -> None:
+    assert parse_command(text) == command
+
+
+def test_parse_command_rejects_bad_target() -> None:
+    command = parse_command("play Strike x")
+    assert isinstance(command, InvalidCommand)
+    assert command.text == "play Strike x"
+
+
+class _RecordingRenderer(FrameRenderer):
+    """
+    A FrameRenderer that also keeps every board it renders.
+    """
+
+    def __init__(self, file: io.StringIO, ansi: bool = False) -> None:
+        super().__init__(file, ansi)
+        self.boards = []
+
+    def _render(self, encounter: Encounter) -> None:
+        self.boards.append(encounter_lines(encounter))
+        super()._render(encounter)
+
+
+def _play(renderer: Renderer) -> Game:
+    """
+    Plays a seeded greedy game of Silent with the given renderer.
+    """
+    policy = GreedyPolicy()
+    game = Game(Silent(), [[("Louse", 20), ("Cultist", 30)],
+                           [("JawWorm", 40)]], GameRandom(7), renderer)
+    game.start()
+    failed = False
+    while not game.is_over():
+        move = None if failed else policy.choose_move(game.get_encounter())
+        failed = not game.dispatch(EndTurnCommand() if move is None
+                                   else PlayCommand(*move))
+    return game
+
+
+def test_frames_decode_to_every_board() -> None:
+    stream = io.StringIO()
+    renderer = _RecordingRenderer(stream)
+    _play(renderer)
+    stream.seek(0)
+    assert list(read_frames(stream)) == renderer.boards
+    assert len(renderer.boards) > 2
+
+
+def test_games_are_numbered_from_zero() -> None:
+    assert _play(Renderer()).is_over()
+    first = Game(Silent(), [[("Louse", 20), ("Louse", 20)]], GameRandom(1))
+    first.start()
+    assert [monster.get_id()
+            for monster in first.get_encounter().get_monsters()] == [0, 1]
+
+
+def test_game_reports_encounter_progress() -> None:
+    started = []
+    game = Game(Silent(), [[("Louse", 1)], [("Louse", 1)]], GameRandom(1),
+                progress=lambda index, elapsed: started.append(index))
+    game.start()
+    assert started == [1]
+    game.handle("play Strike " + str(
+        game.get_encounter().get_monsters()[0].get_id()))
+    assert started == [1, 2]
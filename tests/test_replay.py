@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from replay import *
+
+"""Round trips of games through an event log and a verified replay"""
+
+GAME_FILE = str(Path(__file__).resolve().parents[1] / "games" / "game2.txt")
+GAMES = 3
+
+
+@pytest.fixture
+def log_file(tmp_path: Path) -> str:
+    """
+    An event log of GAMES greedy games, with frequent keyframes.
+    """
+    path = str(tmp_path / "games.log")
+    with EventLog(path, keyframe_interval=4) as log:
+        run_games(IronClad, GAME_FILE, GreedyPolicy(), GAMES, log=log)
+    return path
+
+
+def test_replay_matches_log(log_file: str) -> None:
+    for game in range(GAMES):
+        with Replay(log_file, game) as replay:
+            assert replay.run() == len(replay) > 0
+            assert replay.step() is None
+
+
+def test_seek_matches_straight_replay(log_file: str) -> None:
+    with Replay(log_file, 1) as straight, Replay(log_file, 1) as seeking:
+        assert seeking.get_keyframe_count() > 1
+        for index in reversed(range(len(straight) + 1)):
+            encounter = seeking.seek(index)
+            assert seeking.get_position() == index
+            if encounter is not None:
+                straight.seek(index)
+                assert (encounter.snapshot() ==
+                        straight.get_encounter().snapshot())
+
+
+def test_tampered_log_is_detected(log_file: str, tmp_path: Path) -> None:
+    lines = Path(log_file).read_text().splitlines(keepends=True)
+    index = next(number for number, line in enumerate(lines)
+                 if line.startswith("T\t"))
+    fields = lines[index].split("\t")
+    fields[1] = str(int(fields[1]) + 1)
+    lines[index] = "\t".join(fields)
+    tampered = tmp_path / "tampered.log"
+    tampered.write_text("".join(lines))
+    with Replay(str(tampered)) as replay:
+        with pytest.raises(ReplayError):
+            replay.run()
+
+
+def test_replay_leaves_monster_ids_alone(log_file: str) -> None:
+    Monster.monster_count = 1000
+    with Replay(log_file, 2) as replay:
+        replay.run()
+        replay.seek(len(replay) // 2)
+    assert Monster.monster_count == 1000
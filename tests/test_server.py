@@ -0,0 +1,111 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from loadgen import *
+
+"""Sessions played against a live server over a Unix socket"""
+
+GAME_FILE = str(Path(__file__).resolve().parents[1] / "games" / "game2.txt")
+
+
+@pytest.mark.parametrize("format", ["text", "json", "frames"])
+def test_sessions_match_local_replica(tmp_path: Path, format: str) -> None:
+    path = str(tmp_path / "server.sock")
+    renderer_class = RENDERERS[format]
+
+    async def run() -> LoadResult:
+        server = GameServer([GAME_FILE], renderer_class=renderer_class)
+        listener = await server.start(path=path)
+        async with listener:
+            return await run_load(connector(path=path), "silent", GAME_FILE,
+                                  GreedyPolicy, sessions=20, concurrency=5,
+                                  renderer_class=renderer_class)
+
+    result = asyncio.run(run())
+    assert result.sessions == 20
+    assert result.mismatches == 0
+    assert result.commands > 0
+
+
+def test_bad_start_line_gets_an_error(tmp_path: Path) -> None:
+    path = str(tmp_path / "server.sock")
+
+    async def run() -> str:
+        server = GameServer([GAME_FILE])
+        listener = await server.start(path=path)
+        async with listener:
+            reader, writer = await connector(path=path)()
+            writer.write(b"start wizard game2.txt\n")
+            response = await read_frame(reader)
+            writer.close()
+            return response
+
+    assert asyncio.run(run()).startswith("error: unknown player type")
+
+
+def test_open_session_checks_the_start_line() -> None:
+    server = GameServer([GAME_FILE])
+    assert server.open_session("start silent game2.txt 5").start()
+    for line in ("start", "begin silent game2.txt",
+                 "start silent nowhere.txt", "start silent game2.txt x"):
+        with pytest.raises(ValueError):
+            server.open_session(line)
+
+
+def test_overlong_command_drops_only_that_client(tmp_path: Path) -> None:
+    path = str(tmp_path / "server.sock")
+    errors = []
+
+    async def run() -> tuple[bytes, ServerStats]:
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: errors.append(context))
+        server = GameServer([GAME_FILE])
+        listener = await server.start(path=path)
+        async with listener:
+            reader, writer = await connector(path=path)()
+            writer.write(b"start silent game2.txt\n")
+            await read_frame(reader)
+            writer.write(b"x" * 100000 + b"\n")
+            rest = await reader.read()
+            writer.close()
+            result = await run_load(connector(path=path), "silent",
+                                    GAME_FILE, GreedyPolicy, sessions=2,
+                                    concurrency=2)
+            assert result.mismatches == 0
+            return rest, server.get_stats()
+
+    rest, stats = asyncio.run(run())
+    assert rest == b""
+    assert stats.active == 0 and stats.finished == 2
+    assert errors == []
+
+
+def test_engine_errors_are_not_swallowed(tmp_path: Path,
+                                         monkeypatch: pytest.MonkeyPatch
+                                         ) -> None:
+    path = str(tmp_path / "server.sock")
+    errors = []
+
+    def handle(self, line: str) -> str:
+        raise ValueError("engine bug")
+    monkeypatch.setattr(GameSession, "handle", handle)
+
+    async def run() -> None:
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: errors.append(context))
+        server = GameServer([GAME_FILE])
+        listener = await server.start(path=path)
+        async with listener:
+            reader, writer = await connector(path=path)()
+            writer.write(b"start silent game2.txt\n")
+            await read_frame(reader)
+            writer.write(b"end turn\n")
+            assert await reader.read() == b""
+            writer.close()
+            await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert [str(context.get("exception")) for context in errors] == \
+        ["engine bug"]
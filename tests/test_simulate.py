@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from simulate import *
+
+"""Headless games and the policies that play them"""
+
+GAME_FILE = str(Path(__file__).resolve().parents[1] / "games" / "game1.txt")
+
+
+class _SeedRecorder(RandomPolicy):
+    """
+    A RandomPolicy that keeps the seed of every reset.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.seeds = []
+
+    def reset(self, seed: int) -> None:
+        self.seeds.append(seed)
+        super().reset(seed)
+
+
+def test_policy_seed_is_separate_from_the_game_seed() -> None:
+    policy = _SeedRecorder()
+    run_games(Silent, GAME_FILE, policy, 5, seed=9)
+    game_seeds = [GameRandom(9).fork(index).get_seed() for index in range(5)]
+    assert policy.seeds == [GameRandom(seed).fork(POLICY_STREAM).get_seed()
+                            for seed in game_seeds]
+    assert not set(policy.seeds) & set(game_seeds)
+
+
+def test_random_games_replay_for_a_seed() -> None:
+    runs = [run_games(Silent, GAME_FILE, RandomPolicy(), 20, seed=4)
+            for _ in range(2)]
+    assert runs[0] == runs[1]
@@ -0,0 +1,50 @@
+import math
+
+from solver import *
+
+"""The exact solver's draw probabilities and solved outcomes"""
+
+
+def test_draw_outcomes_sum_to_one() -> None:
+    deck = (STRIKE,) * 5 + (DEFEND,) * 4 + (BASH,)
+    outcomes = draw_outcomes(deck, ())
+    assert math.isclose(sum(chance for chance, *_ in outcomes), 1.0)
+    assert all(len(hand) == HAND_SIZE for _, _, hand, _ in outcomes)
+    assert len({hand for _, _, hand, _ in outcomes}) == len(outcomes)
+
+
+def test_short_deck_draws_the_discard_pile() -> None:
+    outcomes = draw_outcomes((STRIKE, STRIKE), (DEFEND,) * 4)
+    assert outcomes == [(1.0, (DEFEND,), (STRIKE, STRIKE, DEFEND, DEFEND,
+                                          DEFEND), ())]
+
+
+def test_solve_small_games() -> None:
+    outcome = solve_small([[("Louse", 6)]])
+    assert math.isclose(outcome.win_probability, 1.0)
+    assert outcome.expected_hp_loss == 0.0
+    outcome = solve_small([[("JawWorm", 12)]])
+    assert math.isclose(outcome.win_probability, 1.0)
+    assert outcome.expected_hp_loss == 0.0
+
+
+def solve_small(encounters: list[list[tuple[str, int]]]) -> Outcome:
+    """
+    Solves a game twice with one memo, checking the second solve is
+    answered from it.
+    """
+    solver = ExactSolver(IronClad, encounters)
+    outcome = solver.solve()
+    states = len(solver.get_table())
+    assert solver.solve() == outcome
+    assert len(solver.get_table()) == states
+    return outcome
+
+
+def test_memo_bound_keeps_the_outcome() -> None:
+    encounters = [[("Louse", 25)]]
+    outcome = ExactSolver(IronClad, encounters).solve()
+    solver = ExactSolver(IronClad, encounters, max_states=100)
+    assert solver.solve() == outcome
+    assert len(solver.get_table()) == 100
+    assert solver.get_table().get_evictions() > 0
@@ -0,0 +1,108 @@
+import pytest
+
+from solver import ExactSolver
+from sweep import *
+from vector_engine import compare_engines
+from zobrist import TranspositionTable
+
+"""Grid parsing, parameters and the balance sweep itself"""
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("Strike.damage=4,6,9", ("Strike.damage", [4, 6, 9])),
+    ("Louse.max_damage=7:9", ("Louse.max_damage", [7, 8, 9])),
+    ("Bash.vulnerable=1:5:2", ("Bash.vulnerable", [1, 3, 5])),
+    ("Cultist.base_damage=8:4:-2", ("Cultist.base_damage", [8, 6, 4])),
+])
+def test_parse_grid(spec: str, expected: tuple[str, list[int]]) -> None:
+    assert parse_grid(spec) == expected
+
+
+@pytest.mark.parametrize("spec", [
+    "Strike.damage", "Strike.damage=", "Strike.damage=a", "Strike.damage=1:",
+    "Strike.damage=1:5:0", "Strike.damage=5:1", "Strike.power=1",
+    "Dragon.damage=1",
+])
+def test_parse_grid_rejects(spec: str) -> None:
+    with pytest.raises(ValueError):
+        parse_grid(spec)
+
+
+@pytest.mark.parametrize("grid", [
+    {"Louse.min_damage": [5, 8]},
+    {"Louse.max_damage": [4]},
+    {"Louse.min_damage": [4, 6], "Louse.max_damage": [5, 9]},
+])
+def test_grid_rejects_louse_min_above_max(grid: dict[str, list[int]]) -> None:
+    with pytest.raises(ValueError, match="is above Louse.max_damage"):
+        grid_points(grid)
+
+
+def test_grid_allows_louse_bounds_moved_together() -> None:
+    grid = {"Louse.min_damage": [8, 9], "Louse.max_damage": [9, 12]}
+    assert len(grid_points(grid)) == 4
+
+
+def test_set_parameter_round_trip() -> None:
+    default = get_parameter("Strike.damage")
+    set_parameter("Strike.damage", default + 3)
+    try:
+        assert get_parameter("Strike.damage") == default + 3
+        assert Strike().get_damage_amount() == default + 3
+    finally:
+        set_parameter("Strike.damage", default)
+    assert Strike().get_damage_amount() == default
+
+
+def test_wilson_interval() -> None:
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high
+    low, high = wilson_interval(100, 100)
+    assert 0.9 < low < 1.0 and high == pytest.approx(1.0)
+
+
+def test_small_sweep_is_deterministic() -> None:
+    grid = {"Strike.damage": [6, 18]}
+    runs = [run_sweep(IronClad, "games/game2.txt", GreedyPolicy(), grid,
+                      seed=3, workers=1, round_size=20, max_games=40)
+            for _ in range(2)]
+    assert [result.as_row() for result in runs[0]] == \
+        [result.as_row() for result in runs[1]]
+    assert [result.stats.get_games() for result in runs[0]] == [40, 40]
+    assert get_parameter("Strike.damage") == 6
+
+
+PARAMETERS = {"Strike.damage": 9, "Defend.block": 3, "Bash.vulnerable": 1,
+              "Louse.min_damage": 3, "Louse.max_damage": 9,
+              "Cultist.base_damage": 4, "Cultist.damage_ramp": 3}
+
+
+@pytest.fixture
+def changed_parameters():
+    defaults = {name: get_parameter(name) for name in PARAMETERS}
+    for name, value in PARAMETERS.items():
+        set_parameter(name, value)
+    yield
+    for name, value in defaults.items():
+        set_parameter(name, value)
+
+
+@pytest.mark.parametrize("game_file", ["games/game1.txt", "games/game3.txt"])
+def test_vector_engine_follows_parameters(changed_parameters,
+                                          game_file: str) -> None:
+    for player_class in (IronClad, Silent):
+        mismatches, _, _ = compare_engines(player_class, game_file, 200)
+        assert mismatches == 0
+
+
+def test_solver_keeps_parameters_apart() -> None:
+    table = TranspositionTable()
+    ExactSolver(IronClad, [[("Louse", 6)]], table=table).solve()
+    states = len(table)
+    set_parameter("Strike.damage", 3)
+    try:
+        ExactSolver(IronClad, [[("Louse", 6)]], table=table).solve()
+    finally:
+        set_parameter("Strike.damage", 6)
+    assert len(table) > states
@@ -0,0 +1,50 @@
+from zobrist import *
+
+"""Zobrist hashes of encounter states, and the transposition table"""
+
+
+def _encounter() -> Encounter:
+    return Encounter(IronClad(), [("Louse", 20), ("JawWorm", 40)],
+                     GameRandom(3))
+
+
+def test_hash_follows_state() -> None:
+    hasher = ZobristHasher()
+    encounter = _encounter()
+    state = encounter.snapshot()
+    before = hasher.hash_encounter(encounter)
+    target = encounter.get_monsters()[0].get_id()
+    assert encounter.player_apply_card("Strike", target)
+    assert hasher.hash_encounter(encounter) != before
+    encounter.restore(state)
+    assert hasher.hash_encounter(encounter) == before
+
+
+def test_hash_ignores_card_order() -> None:
+    hasher = ZobristHasher()
+    encounter = _encounter()
+    player, monsters, intents, rng = encounter.snapshot()
+    shuffled = player[:7] + (tuple(reversed(player[7])),
+                             tuple(reversed(player[8])), player[9])
+    before = hasher.hash_encounter(encounter)
+    encounter.restore((shuffled, monsters, intents, rng))
+    assert hasher.hash_encounter(encounter) == before
+
+
+def test_hashers_with_one_seed_agree() -> None:
+    encounter = _encounter()
+    assert (ZobristHasher(5).hash_encounter(encounter) ==
+            ZobristHasher(5, cache_size=1).hash_encounter(encounter) !=
+            ZobristHasher(6).hash_encounter(encounter))
+
+
+def test_table_evicts_least_recently_used() -> None:
+    table = TranspositionTable(capacity=2)
+    table.put(1, "a")
+    table.put(2, "b")
+    assert table.get(1) == "a"
+    table.put(3, "c")
+    assert 2 not in table and 1 in table and 3 in table
+    assert table.get(2) is None
+    assert (table.get_hits(), table.get_misses(),
+            table.get_evictions()) == (1, 1, 1)
@@ -0,0 +1,395 @@
+import time
+
+import numpy as np
+
+from simulate import *
+
+"""Struct-of-arrays simulator running many encounters at once with NumPy"""
+
+MONSTER_KINDS = {"Louse": 0, "Cultist": 1, "JawWorm": 2}
+LOUSE, CULTIST, JAW_WORM = 0, 1, 2
+NO_MONSTER = -1
+MAX_HAND = 5
+
+
+def _status_array(statuses: list[dict[str, int]], status: str) -> np.ndarray:
+    """
+    Returns the amount of one status each card applies, indexed by card id.
+    """
+    return np.array([modifiers.get(status, 0) for modifiers in statuses])
+
+
+def _apply_multipliers(
+    damage: np.ndarray,
+    vulnerable: np.ndarray,
+    weak: np.ndarray
+) -> np.ndarray:
+    """
+    Applies the 1.5x vulnerable and 0.75x weak multipliers in the same order
+    and float precision as Encounter, then truncates like int().
+    """
+    calc = damage.astype(np.float64)
+    calc = np.where(vulnerable > 0, calc * 1.5, calc)
+    calc = np.where(weak > 0, calc * 0.75, calc)
+    return np.trunc(calc).astype(np.int64)
+
+
+def _reduce_hp(
+    hp: np.ndarray,
+    block: np.ndarray,
+    amount: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Batched Entity.reduce_hp. Damage is taken from block first, and hp is
+    clamped at 0, exactly as in Entity.
+
+    Return: The new (hp, block) arrays.
+    """
+    left = block - amount
+    return np.maximum(hp + np.minimum(left, 0), 0), np.maximum(left, 0)
+
+
+class VectorSimulator(object):
+    """
+    Plays many games of one game file at once, keeping the player and monster
+    state of every game in NumPy arrays (one row per game, one column per
+    monster slot). Moves follow GreedyPolicy, and card draws and Louse damage
+    use the same per-game GameRandom streams as simulate.run_games, so the
+    results match the object engine game for game.
+
+    Card values and monster damage are read from the card tables and the
+    monster classes when the simulator is built, so parameters changed with
+    update_card or on Louse and Cultist (see sweep.py) apply to it.
+    """
+
+    def __init__(
+        self,
+        player_class: type[Player],
+        encounters: list[list[tuple[str, int]]],
+        count: int,
+        seed: int = DEFAULT_SEED,
+        max_turns: int = DEFAULT_MAX_TURNS
+    ) -> None:
+        """
+        Parameters:
+            player_class = the player type to play as (IronClad or Silent).
+            encounters = the monsters in each encounter, as read_game_file
+            returns them.
+            count = number of games to play.
+            seed = master seed; game i uses stream i forked from it.
+            max_turns = number of player turns after which a game is lost.
+        """
+        template = player_class()
+        width = max(len(monsters) for monsters in encounters)
+        self._count = count
+        self._max_turns = max_turns
+        self._num_encounters = len(encounters)
+        self._kinds = np.full((len(encounters), width), NO_MONSTER)
+        self._start_hp = np.zeros((len(encounters), width), dtype=np.int64)
+        for row, monsters in enumerate(encounters):
+            for column, (name, max_hp) in enumerate(monsters):
+                self._kinds[row, column] = MONSTER_KINDS[name]
+                self._start_hp[row, column] = max_hp
+        self._louse_columns = [np.flatnonzero(kinds == LOUSE)
+                               for kinds in self._kinds]
+        self._priority = [CARD_IDS[name] for name in GreedyPolicy.priority]
+
+        self._card_cost = np.array(CARD_COST)
+        self._card_damage = np.array(CARD_DAMAGE)
+        self._card_block = np.array(CARD_BLOCK)
+        self._card_targeted = np.array(CARD_TARGET)
+        self._card_weak = _status_array(CARD_STATUS, 'weak')
+        self._card_vulnerable = _status_array(CARD_STATUS, 'vulnerable')
+        self._card_strength = _status_array(CARD_STATUS, 'strength')
+        self._card_self_weak = _status_array(CARD_SELF_STATUS, 'weak')
+        self._card_self_vulnerable = _status_array(CARD_SELF_STATUS,
+                                                   'vulnerable')
+        self._card_self_strength = _status_array(CARD_SELF_STATUS,
+                                                 'strength')
+        self._louse_damage = (Louse._min_damage, Louse._max_damage)
+        self._cultist_damage = (Cultist._base_damage, Cultist._damage_ramp)
+
+        master = GameRandom(seed)
+        self._rngs = [master.fork(index) for index in range(count)]
+        deck = template.get_deck_ids()
+        self._decks = [list(deck) for _ in range(count)]
+        self._hands = [[] for _ in range(count)]
+        self._discards = [[] for _ in range(count)]
+        self._hand_counts = np.zeros((count, len(CARDS)), dtype=np.int64)
+        self._plays = np.zeros((count, MAX_HAND), dtype=np.int64)
+        self._num_plays = np.zeros(count, dtype=np.int64)
+
+        self._hp = np.full(count, template.get_max_hp(), dtype=np.int64)
+        self._block = np.zeros(count, dtype=np.int64)
+        self._strength = np.zeros(count, dtype=np.int64)
+        self._weak = np.zeros(count, dtype=np.int64)
+        self._vulnerable = np.zeros(count, dtype=np.int64)
+        self._energy = np.zeros(count, dtype=np.int64)
+
+        shape = (count, width)
+        self._m_kind = np.full(shape, NO_MONSTER)
+        self._m_alive = np.zeros(shape, dtype=bool)
+        self._m_hp = np.zeros(shape, dtype=np.int64)
+        self._m_max_hp = np.zeros(shape, dtype=np.int64)
+        self._m_block = np.zeros(shape, dtype=np.int64)
+        self._m_strength = np.zeros(shape, dtype=np.int64)
+        self._m_weak = np.zeros(shape, dtype=np.int64)
+        self._m_vulnerable = np.zeros(shape, dtype=np.int64)
+        self._m_damage = np.zeros(shape, dtype=np.int64)
+        self._m_calls = np.zeros(shape, dtype=np.int64)
+
+        self._encounter = np.zeros(count, dtype=np.int64)
+        self._active = np.ones(count, dtype=bool)
+        self._won = np.zeros(count, dtype=bool)
+        self._timed_out = np.zeros(count, dtype=bool)
+        self._turns = np.zeros(count, dtype=np.int64)
+        self._encounters_won = np.zeros(count, dtype=np.int64)
+
+    def run(self) -> list[GameResult]:
+        """
+        Plays every game to completion.
+
+        Return: The GameResult of each game, in seed stream order.
+        """
+        self._start_encounter(np.arange(self._count))
+        while self._active.any():
+            self._play_phase()
+            alive = self._m_alive.any(axis=1)
+            cleared = np.flatnonzero(self._active & ~alive)
+            ended = np.flatnonzero(self._active & alive)
+            self._discard_hands(cleared)
+            self._discard_hands(ended)
+            self._enemy_phase(ended)
+            self._next_encounter(cleared)
+        return [GameResult(bool(self._won[game]), int(self._turns[game]),
+                           int(self._hp[game]),
+                           int(self._encounters_won[game]),
+                           bool(self._timed_out[game]))
+                for game in range(self._count)]
+
+    def _start_encounter(self, games: np.ndarray) -> None:
+        """
+        Builds the monsters of each game's current encounter and starts the
+        player's first turn, consuming random numbers in the same order as
+        Encounter.__init__.
+        """
+        if len(games) == 0:
+            return
+        rows = self._encounter[games]
+        self._m_kind[games] = self._kinds[rows]
+        self._m_alive[games] = self._kinds[rows] != NO_MONSTER
+        self._m_hp[games] = self._start_hp[rows]
+        self._m_max_hp[games] = self._start_hp[rows]
+        for array in (self._m_block, self._m_strength, self._m_weak,
+                      self._m_vulnerable, self._m_damage, self._m_calls):
+            array[games] = 0
+        for game, row in zip(games.tolist(), rows.tolist()):
+            rng = self._rngs[game]
+            for column in self._louse_columns[row]:
+                self._m_damage[game, column] = random_louse_amount(
+                    rng, *self._louse_damage)
+            self._decks[game].extend(self._discards[game])
+            self._discards[game].clear()
+        self._player_new_turn(games)
+
+    def _player_new_turn(self, games: np.ndarray) -> None:
+        """
+        Batched Player.new_turn: statuses tick down, energy resets and a new
+        hand is drawn with each game's own stream.
+        """
+        if len(games) == 0:
+            return
+        self._block[games] = 0
+        self._weak[games] = np.maximum(self._weak[games] - 1, 0)
+        self._vulnerable[games] = np.maximum(self._vulnerable[games] - 1, 0)
+        self._energy[games] = 3
+        self._num_plays[games] = 0
+        counts = []
+        for game in games.tolist():
+            hand = self._hands[game]
+            draw_cards(self._decks[game], hand, self._discards[game],
+                       self._rngs[game])
+            row = [0] * len(CARDS)
+            for card in hand:
+                row[card] += 1
+            counts.append(row)
+        self._hand_counts[games] = counts
+
+    def _play_phase(self) -> None:
+        """
+        Plays cards for every active game until each one ends its turn, as
+        GreedyPolicy and Encounter.player_apply_card would.
+        """
+        playing = self._active.copy()
+        while playing.any():
+            games = np.flatnonzero(playing)
+            energy = self._energy[games]
+            choice = np.full(len(games), -1)
+            for card in reversed(self._priority):
+                playable = ((self._hand_counts[games, card] > 0) &
+                            (self._card_cost[card] <= energy))
+                choice[playable] = card
+            ok = choice >= 0
+            playing[games[~ok]] = False
+            games, cards = games[ok], choice[ok]
+            if len(games) == 0:
+                break
+
+            self._energy[games] -= self._card_cost[cards]
+            self._hand_counts[games, cards] -= 1
+            self._plays[games, self._num_plays[games]] = cards
+            self._num_plays[games] += 1
+            self._block[games] += self._card_block[cards]
+            self._weak[games] += self._card_self_weak[cards]
+            self._vulnerable[games] += self._card_self_vulnerable[cards]
+            self._strength[games] += self._card_self_strength[cards]
+
+            # Targeted cards hit the first monster still alive.
+            targeted = self._card_targeted[cards]
+            games, cards = games[targeted], cards[targeted]
+            columns = self._m_alive[games].argmax(axis=1)
+            self._m_weak[games, columns] += self._card_weak[cards]
+            self._m_vulnerable[games, columns] += self._card_vulnerable[cards]
+            self._m_strength[games, columns] += self._card_strength[cards]
+            damage = _apply_multipliers(
+                self._card_damage[cards] + self._strength[games],
+                self._m_vulnerable[games, columns], self._weak[games])
+            hp, block = _reduce_hp(self._m_hp[games, columns],
+                                   self._m_block[games, columns], damage)
+            self._m_hp[games, columns] = hp
+            self._m_block[games, columns] = block
+            defeated = hp == 0
+            self._m_alive[games[defeated], columns[defeated]] = False
+            cleared = ~self._m_alive[games].any(axis=1)
+            playing[games[cleared]] = False
+
+    def _discard_hands(self, games: np.ndarray) -> None:
+        """
+        Moves played cards (in play order) and then the rest of the hand to
+        the discard pile, matching Player.play_card and Player.end_turn.
+        """
+        for game in games.tolist():
+            hand = self._hands[game]
+            discarded = self._discards[game]
+            for card in self._plays[game, :self._num_plays[game]].tolist():
+                hand.remove(card)
+                discarded.append(card)
+            discarded.extend(hand)
+            hand.clear()
+
+    def _enemy_phase(self, games: np.ndarray) -> None:
+        """
+        Batched Encounter.end_player_turn and Encounter.enemy_turn for games
+        whose player ended their turn.
+        """
+        if len(games) == 0:
+            return
+        alive = self._m_alive[games]
+        kind = self._m_kind[games]
+        self._m_block[games] = 0
+        self._m_weak[games] = np.maximum(self._m_weak[games] - 1, 0)
+        self._m_vulnerable[games] = np.maximum(
+            self._m_vulnerable[games] - 1, 0)
+
+        # Intent phase: each monster acts exactly once per turn.
+        taken = self._m_max_hp[games] - self._m_hp[games]
+        jaw = alive & (kind == JAW_WORM)
+        self._m_block[games] = np.where(jaw, (taken + 1) // 2,
+                                        self._m_block[games])
+        calls = self._m_calls[games]
+        cultist = alive & (kind == CULTIST)
+        self._m_calls[games] = np.where(cultist, calls + 1, calls)
+        self._weak[games] += np.where(cultist, calls % 2, 0).sum(axis=1)
+        base, ramp = self._cultist_damage
+        damage = np.select(
+            [kind == LOUSE, kind == CULTIST],
+            [self._m_damage[games], np.where(calls > 0, base + ramp * calls,
+                                             0)],
+            taken // 2)
+        damage = _apply_multipliers(
+            damage + self._m_strength[games],
+            self._vulnerable[games][:, None], self._m_weak[games])
+
+        hp, block = self._hp[games], self._block[games]
+        for column in range(alive.shape[1]):
+            hit_hp, hit_block = _reduce_hp(hp, block, damage[:, column])
+            hp = np.where(alive[:, column], hit_hp, hp)
+            block = np.where(alive[:, column], hit_block, block)
+        self._hp[games] = hp
+        self._block[games] = block
+
+        self._turns[games] += 1
+        defeated = hp == 0
+        finished = defeated | (self._turns[games] >= self._max_turns)
+        self._active[games[finished]] = False
+        self._timed_out[games[finished & ~defeated]] = True
+        self._player_new_turn(games[~finished])
+
+    def _next_encounter(self, games: np.ndarray) -> None:
+        """
+        Moves games that cleared their encounter on to the next one.
+        """
+        if len(games) == 0:
+            return
+        self._encounters_won[games] += 1
+        self._encounter[games] += 1
+        done = self._encounter[games] >= self._num_encounters
+        self._won[games[done]] = True
+        self._active[games[done]] = False
+        self._start_encounter(games[~done])
+
+
+def run_vector_games(
+    player_class: type[Player],
+    game_file: str,
+    count: int,
+    max_turns: int = DEFAULT_MAX_TURNS,
+    seed: int = DEFAULT_SEED
+) -> list[GameResult]:
+    """
+    Plays count greedy games of a game file with the vectorized engine.
+    Equivalent to simulate.run_games with a GreedyPolicy.
+
+    Parameters:
+        player_class = the player type to play as (IronClad or Silent).
+        game_file = the name of the game file to play, as text or compiled.
+        count = number of games to play.
+        max_turns = number of player turns after which a game is lost.
+        seed = master seed of the batch.
+
+    Return: A list of the GameResult of each game.
+    """
+    simulator = VectorSimulator(player_class,
+                                open_game(game_file, MONSTER_KINDS),
+                                count, seed, max_turns)
+    return simulator.run()
+
+
+def compare_engines(
+    player_class: type[Player],
+    game_file: str,
+    count: int,
+    seed: int = DEFAULT_SEED
+) -> tuple[int, float, float]:
+    """
+    Runs the same seeded batch of greedy games through the object engine and
+    the vectorized engine.
+
+    Parameters:
+        player_class = the player type to play as (IronClad or Silent).
+        game_file = the name of the game file to play, as text or compiled.
+        count = number of games to play.
+        seed = master seed of the batch.
+
+    Return: A tuple of (games whose results differ, object engine games per
+    second, vectorized engine games per second).
+    """
+    start = time.perf_counter()
+    expected = run_games(player_class, game_file, GreedyPolicy(), count,
+                         seed=seed)
+    object_rate = count / (time.perf_counter() - start)
+    start = time.perf_counter()
+    actual = run_vector_games(player_class, game_file, count, seed=seed)
+    vector_rate = count / (time.perf_counter() - start)
+    mismatches = sum(a != b for a, b in zip(expected, actual))
+    return mismatches, object_rate, vector_rate
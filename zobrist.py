@@ -0,0 +1,250 @@
+from collections import Counter, OrderedDict
+import sys
+import zlib
+
+from a2_support import _mix_seed
+from main import *
+
+"""Zobrist hashing of encounter states and a shared transposition table"""
+
+DEFAULT_TABLE_CAPACITY = 100000
+DEFAULT_CACHE_SIZE = 100000
+
+# Feature codes for the parts of the player's state.
+_PLAYER = 0
+_DECK = 1
+_HAND = 2
+_DISCARD = 3
+
+
+class ZobristHasher(object):
+    """
+    Hashes encounter states as the XOR of a fixed random key for every
+    feature: each player scalar, each (card, count) in the deck, hand and
+    discard multisets, and each slot of each monster (keyed by monster id,
+    so defeated monsters simply drop out).
+
+    Every hash is computed from the full state rather than updated move by
+    move, but the hash of each player and monster state is cached, so
+    rehashing an encounter after a move only recomputes the entities whose
+    state the move changed. Keys derive from the seed alone, so hashes agree
+    across processes and runs.
+    """
+
+    def __init__(
+        self,
+        seed: int = DEFAULT_SEED,
+        cache_size: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        """
+        Parameters:
+            seed = seed the feature keys are derived from.
+            cache_size = number of entity hashes kept before the cache is
+            cleared.
+        """
+        self._seed = seed
+        self._cache_size = cache_size
+        self._keys = {}
+        self._type_codes = {}
+        self._entity_hashes = {}
+
+    def _key(self, feature: tuple[int, ...]) -> int:
+        """
+        Returns the 64-bit key of a feature, given as a tuple of ints.
+        """
+        key = self._keys.get(feature)
+        if key is None:
+            # The seed of GameRandom(key).fork(part), without seeding a
+            # generator for every part.
+            key = self._seed
+            for part in feature:
+                key = _mix_seed(key, part)
+            self._keys[feature] = key
+        return key
+
+    def _type_code(self, kind: type) -> int:
+        """
+        Returns a stable code for an entity type (unlike hash(), which
+        changes between processes).
+        """
+        code = self._type_codes.get(kind)
+        if code is None:
+            code = self._type_codes[kind] = zlib.crc32(kind.__name__.encode())
+        return code
+
+    def _cache(self, state: tuple, value: int) -> int:
+        """
+        Stores an entity hash, clearing the cache first if it is full.
+        """
+        if len(self._entity_hashes) >= self._cache_size:
+            self._entity_hashes.clear()
+        self._entity_hashes[state] = value
+        return value
+
+    def hash_player(self, player: Player) -> int:
+        """
+        Returns the hash of a player's hp, block, statuses, energy and deck,
+        hand and discard multisets. Card order doesn't change the hash.
+
+        Parameter:
+            player = the player to hash.
+        """
+        state = (_PLAYER, self._type_code(type(player))) + player.snapshot()
+        value = self._entity_hashes.get(state)
+        if value is not None:
+            return value
+        key = self._key
+        value = 0
+        scalars = state[2:-3]
+        for index, scalar in enumerate(scalars):
+            value ^= key((_PLAYER, index, scalar))
+        for zone, ids in zip((_DECK, _HAND, _DISCARD), state[-3:]):
+            for card_id, count in Counter(ids or ()).items():
+                value ^= key((zone, card_id, count))
+        return self._cache(state, value)
+
+    def hash_monster(self, monster: Monster) -> int:
+        """
+        Returns the hash of a monster's id, hp, block, statuses and intent
+        counters (such as Cultist's call count).
+
+        Parameter:
+            monster = the monster to hash.
+        """
+        code = self._type_code(type(monster))
+        state = (code,) + monster.snapshot()
+        value = self._entity_hashes.get(state)
+        if value is not None:
+            return value
+        key = self._key
+        monster_id = monster.get_id()
+        value = 0
+        for index, slot in enumerate(state[1:]):
+            value ^= key((code, monster_id, index, slot))
+        return self._cache(state, value)
+
+    def hash_encounter(self, encounter: Encounter) -> int:
+        """
+        Returns the hash of an encounter's player and remaining monsters.
+
+        Parameter:
+            encounter = the encounter to hash.
+        """
+        value = self.hash_player(encounter.get_player())
+        for monster in encounter.get_monsters():
+            value ^= self.hash_monster(monster)
+        return value
+
+
+class TranspositionTable(object):
+    """
+    A bounded map from state hashes to search results that evicts the least
+    recently used entry when full. One table can be shared by several
+    search agents in the same process.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_TABLE_CAPACITY) -> None:
+        """
+        Parameters:
+            capacity = largest number of entries kept.
+            hits = number of lookups that found an entry.
+            misses = number of lookups that found nothing.
+            evictions = number of entries dropped to stay within capacity.
+        """
+        self._capacity = capacity
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: int, default=None):
+        """
+        Returns the entry stored for key, or default, and marks the entry as
+        recently used.
+
+        Parameters:
+            key = the state hash to look up.
+            default = returned when there is no entry.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return default
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: int, entry) -> None:
+        """
+        Stores an entry for key, evicting the least recently used entry if
+        the table is full.
+
+        Parameters:
+            key = the state hash to store under.
+            entry = the value to store (anything but None).
+        """
+        entries = self._entries
+        entries[key] = entry
+        entries.move_to_end(key)
+        if len(entries) > self._capacity:
+            entries.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self) -> None:
+        """
+        Removes every entry, keeping the metrics.
+        """
+        self._entries.clear()
+
+    def get_capacity(self) -> int:
+        """
+        Returns the largest number of entries kept.
+        """
+        return self._capacity
+
+    def get_hits(self) -> int:
+        """
+        Returns the number of lookups that found an entry.
+        """
+        return self._hits
+
+    def get_misses(self) -> int:
+        """
+        Returns the number of lookups that found nothing.
+        """
+        return self._misses
+
+    def get_evictions(self) -> int:
+        """
+        Returns the number of entries dropped to stay within capacity.
+        """
+        return self._evictions
+
+    def hit_rate(self) -> float:
+        """
+        Returns the fraction of lookups that found an entry.
+        """
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups else 0.0
+
+    def memory_bytes(self) -> int:
+        """
+        Returns the approximate bytes held by the table: the map itself plus
+        the shallow size of every key and entry.
+        """
+        size = sys.getsizeof(self._entries)
+        for key, entry in self._entries.items():
+            size += sys.getsizeof(key) + sys.getsizeof(entry)
+        return size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._entries
+
+    def __str__(self) -> str:
+        return (f"{len(self)}/{self._capacity} entries, "
+                f"hit rate {self.hit_rate():.2%}, "
+                f"{self._evictions} evictions, "
+                f"{self.memory_bytes() / 1024:.0f} KiB")